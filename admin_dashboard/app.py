@@ -2,6 +2,8 @@ import streamlit as st
 import requests
 import pandas as pd
 import time
+import base64
+import json
 
 API_URL = "http://backend:8000"
 PUBLIC_API_URL = "http://localhost:8000"
@@ -21,14 +23,57 @@ url_email = query_params.get("email", [None])[0]
 
 if 'token' not in st.session_state: st.session_state.token = url_token
 if 'user_email' not in st.session_state: st.session_state.user_email = url_email
+# Refresh token in session state only, never in the URL
+if 'refresh_token' not in st.session_state: st.session_state.refresh_token = None
 if 'is_admin' not in st.session_state: st.session_state.is_admin = True if url_token else False 
 
 def get_headers():
     return {"Authorization": f"Bearer {st.session_state.token}"}
 
+# --- TOKEN REFRESH ---
+# Access tokens are short-lived; swap the refresh token for a new pair
+# instead of asking for the password (a bcrypt login) again.
+def token_expired(token, leeway=30):
+    try:
+        payload = token.split(".")[1]
+        payload += "=" * (-len(payload) % 4)
+        return json.loads(base64.urlsafe_b64decode(payload))["exp"] - leeway < time.time()
+    except Exception:
+        return True
+
+def remember_tokens(access_token, refresh_token):
+    st.session_state.token = access_token
+    st.session_state.refresh_token = refresh_token
+    st.experimental_set_query_params(token=access_token, email=st.session_state.user_email)
+
+def refresh_session():
+    """True once a fresh access token is in place; logs out if the refresh
+    token is gone or revoked."""
+    if st.session_state.get("refresh_token"):
+        try:
+            r = requests.post(f"{API_URL}/auth/refresh", json={"refresh_token": st.session_state.refresh_token})
+            if r.status_code == 200:
+                data = r.json()
+                if not data.get("is_admin"):
+                    logout()
+                remember_tokens(data["access_token"], data.get("refresh_token"))
+                return True
+            if r.status_code == 503: return False  # token store down, keep the session
+        except requests.RequestException:
+            return False
+    logout()
+
+def authed(method, url, **kwargs):
+    """requests.request with the bearer token, refreshed when needed."""
+    if token_expired(st.session_state.token): refresh_session()
+    r = requests.request(method, url, headers=get_headers(), **kwargs)
+    if r.status_code == 401 and refresh_session():
+        r = requests.request(method, url, headers=get_headers(), **kwargs)
+    return r
+
 def fetch_challenges():
     try:
-        r = requests.get(f"{API_URL}/challenges/list")
+        r = authed("GET", f"{API_URL}/challenges/list")
         if r.status_code == 200: return r.json()
     except: return []
     return []
@@ -41,10 +86,9 @@ def login(email, password):
             if not data.get('is_admin'):
                 st.error("⛔ Access Denied: You are not an Admin.")
                 return
-            st.session_state.token = data.get("access_token")
             st.session_state.is_admin = True
             st.session_state.user_email = email
-            st.experimental_set_query_params(token=st.session_state.token, email=email)
+            remember_tokens(data.get("access_token"), data.get("refresh_token"))
             st.success("Welcome back, Commander.")
             time.sleep(0.5)
             st.experimental_rerun()
@@ -59,11 +103,18 @@ def signup(email, password):
     except Exception as e: st.error(f"Connection Error: {e}")
 
 def logout():
+    if st.session_state.get("refresh_token"):
+        try: requests.post(f"{API_URL}/auth/logout", json={"refresh_token": st.session_state.refresh_token})
+        except requests.RequestException: pass
     st.session_state.token = None
+    st.session_state.refresh_token = None
     st.experimental_set_query_params() 
     st.experimental_rerun()
 
 # --- APP ---
+if st.session_state.token and token_expired(st.session_state.token):
+    refresh_session()
+
 if not st.session_state.token:
     st.title("🛡️ Admin Restricted Area")
     t1, t2 = st.tabs(["🔑 Login", "📝 Register"])
@@ -177,7 +228,7 @@ else:
                                 "password": new_pass,
                                 "is_admin": is_admin_check
                             }
-                            r = requests.post(f"{API_URL}/auth/users", json=payload, headers=get_headers())
+                            r = authed("POST", f"{API_URL}/auth/users", json=payload)
                             if r.status_code == 200:
                                 st.success(f"User {new_email} created successfully!")
                                 time.sleep(1)
@@ -189,11 +240,43 @@ else:
                     else:
                         st.warning("Email and Password are required.")
 
+        with st.expander("📥 Bulk Import (CSV)"):
+            st.caption("Columns: email,password[,is_admin]. Emails that already exist are skipped, so a failed import can simply be re-run.")
+            with st.form("import_users_form"):
+                csv_file = st.file_uploader("Users CSV", type=["csv"])
+                start_row = st.number_input("Start at row", min_value=1, value=1, step=1)
+                if st.form_submit_button("Import Users"):
+                    if csv_file:
+                        try:
+                            r = authed("POST", f"{API_URL}/auth/users/import", params={"start_row": int(start_row)},
+                                       files={"file": (csv_file.name, csv_file.getvalue(), "text/csv")})
+                            if r.status_code == 200:
+                                lines = [json.loads(l) for l in r.text.splitlines() if l.strip()]
+                                rows = [l for l in lines if "row" in l]
+                                summary = next((l for l in lines if "summary" in l), None)
+                                if summary:
+                                    s = summary["summary"]
+                                    st.success(f"Created {s['created']}, already existed {s['exists']}, "
+                                               f"duplicates {s['duplicate']}, invalid {s['invalid']}.")
+                                else:
+                                    resume = rows[-1]["row"] + 1 if rows else int(start_row)
+                                    st.warning(f"Import interrupted. Re-run with start row {resume}.")
+                                for l in lines:
+                                    if "error" in l and "row" not in l: st.warning(l["error"])
+                                problems = [l for l in rows if l["status"] in ("invalid", "duplicate")]
+                                if problems: st.dataframe(pd.DataFrame(problems), use_container_width=True)
+                            else:
+                                st.error(f"Error: {r.json().get('detail')}")
+                        except Exception as e:
+                            st.error(f"Import failed: {e}")
+                    else:
+                        st.warning("Choose a CSV file first.")
+
         st.divider()
         st.subheader("Existing Users")
         
         try:
-            ur = requests.get(f"{API_URL}/auth/users", headers=get_headers())
+            ur = authed("GET", f"{API_URL}/auth/users")
             
             if ur.status_code != 200:
                 st.error("⚠️ Session Invalid. Please Re-login.")
@@ -218,14 +301,14 @@ else:
                         deduct_amt = st.number_input("Points to Remove", min_value=0, value=0, step=10)
                         if st.button("🔴 Deduct Points", type="primary"):
                             new_score = max(0, current - deduct_amt)
-                            r = requests.put(f"{API_URL}/auth/users/{target['id']}/score", json={"score": new_score}, headers=get_headers())
+                            r = authed("PUT", f"{API_URL}/auth/users/{target['id']}/score", json={"score": new_score})
                             if r.status_code==200: st.success(f"Deducted! New Score: {new_score}"); time.sleep(1); st.experimental_rerun()
                     
                     with c2:
                         st.info("💾 Adjustment")
                         set_amt = st.number_input("Set Exact Score", min_value=0, value=current)
                         if st.button("💾 Save Score"):
-                            r = requests.put(f"{API_URL}/auth/users/{target['id']}/score", json={"score": set_amt}, headers=get_headers())
+                            r = authed("PUT", f"{API_URL}/auth/users/{target['id']}/score", json={"score": set_amt})
                             if r.status_code==200: st.success("Score Updated!"); time.sleep(1); st.experimental_rerun()
                     
                     st.divider()
@@ -233,7 +316,7 @@ else:
                     with st.expander("Danger Zone (Delete User)"):
                         st.warning(f"You are about to delete **{target['email']}**.")
                         if st.button("🗑️ Confirm Delete"):
-                            r = requests.delete(f"{API_URL}/auth/users/{target['id']}", headers=get_headers())
+                            r = authed("DELETE", f"{API_URL}/auth/users/{target['id']}")
                             if r.status_code == 200:
                                 st.success("User Deleted.")
                                 time.sleep(1)
@@ -245,10 +328,29 @@ else:
 
     elif mode == "OSINT Scanner":
         st.title("🕵️ OSINT Tools")
-        mod = st.selectbox("Module", ["whois_module", "dns_module"])
+        try:
+            modules = requests.get(f"{API_URL}/api/modules").json().get("modules", [])
+        except: modules = ["whois_module", "dns_module"]
+        mod = st.selectbox("Module", modules)
         tgt = st.text_input("Target")
         if st.button("Run"):
             try:
-                requests.post(f"{API_URL}/api/run", json={"module":mod, "target":tgt})
-                st.success("Job Sent.")
+                # Interactive priority: skips ahead of any bulk scans in progress
+                r = requests.post(f"{API_URL}/api/run", json={"module":mod, "target":tgt, "priority":"interactive"})
+                if r.status_code == 200:
+                    st.session_state.last_run_id = r.json()["run_id"]
+                    st.success("Job Sent.")
+                else: st.error(r.text)
             except: st.error("Backend Offline")
+
+        if st.session_state.get("last_run_id"):
+            st.caption(f"Run: {st.session_state.last_run_id}")
+            if st.button("🔄 Check Result"):
+                try:
+                    run = requests.get(f"{API_URL}/api/run/{st.session_state.last_run_id}").json()
+                    st.info(f"Status: {run.get('status')}")
+                    if run.get("result"): st.json(run["result"])
+                    # Long runs (subdomain enumeration) stream their rows separately
+                    items = requests.get(f"{API_URL}/api/run/{st.session_state.last_run_id}/items").json().get("items", [])
+                    if items: st.dataframe(pd.DataFrame(items), use_container_width=True)
+                except: st.error("Backend Offline")
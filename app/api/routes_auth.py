@@ -1,4 +1,5 @@
-from fastapi import APIRouter, HTTPException, Depends, status
+from fastapi import APIRouter, HTTPException, Depends, Query, UploadFile, File, status
+from fastapi.responses import StreamingResponse
 from fastapi.security import OAuth2PasswordBearer
 from pydantic import BaseModel, EmailStr
 from sqlmodel.ext.asyncio.session import AsyncSession
@@ -6,8 +7,12 @@ from sqlmodel import select, delete
 from jose import JWTError, jwt
 from app.db.database import get_async_session
 from app.models import User, Solve
-from app.core.security import get_password_hash, verify_password, create_access_token, SECRET_KEY, ALGORITHM
-from typing import List
+from app.core.security import get_password_hash_async, verify_password_async, create_access_token, SECRET_KEY, ALGORITHM
+from app.core import leaderboard, principals, refresh_tokens
+from app import user_import
+from typing import List, Optional
+import json
+import redis
 import uuid
 
 router = APIRouter()
@@ -31,6 +36,10 @@ class Token(BaseModel):
     access_token: str
     token_type: str
     is_admin: bool
+    refresh_token: Optional[str] = None  # None if the token store is down
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
 
 class UserScoreUpdate(BaseModel):
     score: int
@@ -53,10 +62,16 @@ async def get_current_user(token: str = Depends(oauth2_scheme), session: AsyncSe
         email: str = payload.get("sub")
         if email is None: raise credentials_exception
     except JWTError: raise credentials_exception
-        
+
+    # Cached principals are detached Users carrying only id/email/is_admin/is_active
+    cached = await principals.get(email)
+    if cached is not None:
+        return User(**{**cached, "id": uuid.UUID(cached["id"])})
+
     result = await session.execute(select(User).where(User.email == email))
     user = result.scalar_one_or_none()
     if user is None: raise credentials_exception
+    await principals.put(user)
     return user
 
 # --- USER MANAGEMENT ---
@@ -81,14 +96,31 @@ async def create_user_by_admin(new_user: UserCreateAdmin, current_user: User = D
     # Create
     user = User(
         email=new_user.email,
-        hashed_password=get_password_hash(new_user.password),
+        hashed_password=await get_password_hash_async(new_user.password),
         is_admin=new_user.is_admin
     )
     session.add(user)
     await session.commit()
     session.refresh(user)
+    if not user.is_admin:
+        await leaderboard.add_players([user.email])
     return user
 
+@router.post("/users/import")
+async def import_users(file: UploadFile = File(...), start_row: int = Query(1, ge=1), current_user: User = Depends(get_current_user)):
+    """Bulk-create users from a CSV (email,password[,is_admin]) or JSONL
+    upload. Streams one NDJSON outcome per row, then a summary whose
+    ``next_row`` can be passed back as ``start_row`` to resume."""
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Admin access required")
+    fmt = "jsonl" if (file.filename or "").lower().endswith((".jsonl", ".ndjson")) else "csv"
+
+    async def outcomes():
+        async for outcome in user_import.import_users(user_import.text_lines(file.file), fmt, start_row):
+            yield json.dumps(outcome) + "\n"
+
+    return StreamingResponse(outcomes(), media_type="application/x-ndjson")
+
 @router.put("/users/{user_id}/score")
 async def update_user_score(user_id: uuid.UUID, update: UserScoreUpdate, current_user: User = Depends(get_current_user), session: AsyncSession = Depends(get_async_session)):
     if not current_user.is_admin:
@@ -100,6 +132,8 @@ async def update_user_score(user_id: uuid.UUID, update: UserScoreUpdate, current
     target_user.score = update.score
     session.add(target_user)
     await session.commit()
+    if not target_user.is_admin:
+        await leaderboard.set_score(target_user.email, target_user.score)
     return {"ok": True, "new_score": target_user.score}
 
 @router.delete("/users/{user_id}")
@@ -117,10 +151,18 @@ async def delete_user(user_id: uuid.UUID, current_user: User = Depends(get_curre
     await session.execute(delete(Solve).where(Solve.user_id == user_id))
     await session.delete(target_user)
     await session.commit()
+    await principals.invalidate(target_user.email)
+    await refresh_tokens.revoke_all(target_user.email)
+    await leaderboard.remove(target_user.email)
     
     return {"ok": True, "message": "User deleted"}
 
 # --- PUBLIC AUTH ---
+async def issue_tokens(email: str, is_admin: bool) -> dict:
+    access_token = create_access_token(data={"sub": email})
+    return {"access_token": access_token, "token_type": "bearer", "is_admin": is_admin,
+            "refresh_token": await refresh_tokens.issue(email)}
+
 @router.post("/signup", response_model=Token)
 async def signup(user: UserCreate, session: AsyncSession = Depends(get_async_session)):
     result = await session.execute(select(User).where(User.email == user.email))
@@ -129,22 +171,53 @@ async def signup(user: UserCreate, session: AsyncSession = Depends(get_async_ses
 
     new_user = User(
         email=user.email,
-        hashed_password=get_password_hash(user.password),
+        hashed_password=await get_password_hash_async(user.password),
         is_admin=False
     )
     session.add(new_user)
     await session.commit()
+    await leaderboard.add_players([new_user.email])
     
-    access_token = create_access_token(data={"sub": new_user.email})
-    return {"access_token": access_token, "token_type": "bearer", "is_admin": False}
+    return await issue_tokens(new_user.email, False)
 
 @router.post("/login", response_model=Token)
 async def login(user: UserLogin, session: AsyncSession = Depends(get_async_session)):
     result = await session.execute(select(User).where(User.email == user.email))
     db_user = result.scalar_one_or_none()
     
-    if not db_user or not verify_password(user.password, db_user.hashed_password):
+    if not db_user or not await verify_password_async(user.password, db_user.hashed_password):
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
-    access_token = create_access_token(data={"sub": db_user.email})
-    return {"access_token": access_token, "token_type": "bearer", "is_admin": db_user.is_admin}
+    return await issue_tokens(db_user.email, db_user.is_admin)
+
+@router.post("/refresh", response_model=Token)
+async def refresh(req: RefreshRequest, session: AsyncSession = Depends(get_async_session)):
+    """New access token (and rotated refresh token) without a password."""
+    invalid = HTTPException(status_code=401, detail="Invalid refresh token")
+    try:
+        rotated = await refresh_tokens.rotate(req.refresh_token)
+    except refresh_tokens.RefreshTokenReused:
+        raise HTTPException(status_code=401, detail="Refresh token reuse detected, please log in again")
+    except redis.RedisError:
+        raise HTTPException(status_code=503, detail="Token store unavailable")
+    if rotated is None:
+        raise invalid
+    email, new_refresh = rotated
+
+    # The user may have been deleted or demoted since the last refresh
+    principal = await principals.get(email)
+    if principal is None:
+        user = (await session.execute(select(User).where(User.email == email))).scalar_one_or_none()
+        if user is None:
+            await refresh_tokens.revoke(new_refresh)
+            raise invalid
+        principal = await principals.put(user)
+
+    access_token = create_access_token(data={"sub": email})
+    return {"access_token": access_token, "token_type": "bearer", "is_admin": principal["is_admin"],
+            "refresh_token": new_refresh}
+
+@router.post("/logout")
+async def logout(req: RefreshRequest):
+    await refresh_tokens.revoke(req.refresh_token)
+    return {"ok": True}
@@ -1,10 +1,19 @@
-from fastapi import APIRouter, HTTPException, Depends, UploadFile, File
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, UploadFile, File
 from pydantic import BaseModel
 from sqlmodel.ext.asyncio.session import AsyncSession
 from sqlmodel import select, delete
+from sqlalchemy import insert, literal, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
 from app.db.database import get_async_session
 from app.models import Challenge, User, Solve
+from fastapi.responses import Response
+from app.core import catalogue, flags, leaderboard, metrics, ratelimit
+from app.core.config import settings
+from app.api.routes_auth import get_current_user
 from typing import List, Optional
+from datetime import datetime
+import math
 import uuid
 import shutil
 import os
@@ -29,7 +38,8 @@ class ChallengeUpdate(BaseModel):
     points: Optional[int] = None
 
 class FlagSubmission(BaseModel):
-    user_email: str
+    # The player is the authenticated caller; a ``user_email`` that older
+    # clients still send is ignored
     challenge_id: uuid.UUID
     flag: str
 
@@ -55,13 +65,30 @@ async def create_challenge(challenge: ChallengeCreate, session: AsyncSession = D
     new_challenge = Challenge(**challenge.dict())
     session.add(new_challenge)
     await session.commit()
+    await catalogue.bump()
     session.refresh(new_challenge)
     return new_challenge
 
+async def catalogue_response(request: Request, session: AsyncSession, view: str) -> Response:
+    etag, body = await catalogue.get(session, view)
+    # no-cache: clients keep the copy but revalidate it every time
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    presented = {t.strip().removeprefix("W/") for t in request.headers.get("if-none-match", "").split(",")}
+    if etag in presented or "*" in presented:
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
 @router.get("/list", response_model=List[Challenge])
-async def list_challenges(session: AsyncSession = Depends(get_async_session)):
-    result = await session.execute(select(Challenge).order_by(Challenge.level, Challenge.title))
-    return result.scalars().all()
+async def list_challenges(request: Request, current_user: User = Depends(get_current_user), session: AsyncSession = Depends(get_async_session)):
+    """Every challenge with its flag, for admins."""
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Admin access required")
+    return await catalogue_response(request, session, "admin")
+
+@router.get("/catalogue")
+async def player_catalogue(request: Request, session: AsyncSession = Depends(get_async_session)):
+    """The challenge list without flags, for players."""
+    return await catalogue_response(request, session, "player")
 
 @router.delete("/{challenge_id}")
 async def delete_challenge(challenge_id: uuid.UUID, session: AsyncSession = Depends(get_async_session)):
@@ -74,6 +101,8 @@ async def delete_challenge(challenge_id: uuid.UUID, session: AsyncSession = Depe
     # 2. DELETE THE CHALLENGE
     await session.delete(challenge)
     await session.commit()
+    flags.invalidate(challenge_id)
+    await catalogue.bump()
     return {"ok": True}
 
 @router.put("/{challenge_id}", response_model=Challenge)
@@ -84,47 +113,123 @@ async def update_challenge(challenge_id: uuid.UUID, data: ChallengeUpdate, sessi
         setattr(challenge, key, value)
     session.add(challenge)
     await session.commit()
+    flags.invalidate(challenge_id)
+    await catalogue.bump()
     session.refresh(challenge)
     return challenge
 
 # --- VERIFICATION ---
-@router.post("/verify")
-async def verify_flag(sub: FlagSubmission, session: AsyncSession = Depends(get_async_session)):
-    challenge = await session.get(Challenge, sub.challenge_id)
-    if not challenge: raise HTTPException(status_code=404, detail="Challenge not found")
-    
-    result = await session.execute(select(User).where(User.email == sub.user_email))
-    user = result.scalar_one_or_none()
-    if not user: raise HTTPException(status_code=404, detail="User not found")
-
-    if sub.flag.strip() == challenge.flag.strip():
-        solved_check = await session.execute(
-            select(Solve).where(Solve.user_id == user.id, Solve.challenge_id == challenge.id)
-        )
-        if solved_check.scalar_one_or_none():
-            return {"correct": True, "message": "Already solved!", "new_total_score": user.score}
-
-        user.score += challenge.points
-        new_solve = Solve(user_id=user.id, challenge_id=challenge.id)
-        
-        session.add(user)
-        session.add(new_solve)
+def solve_insert(dialect: str, email: str, challenge_id: uuid.UUID):
+    """INSERT INTO solve SELECT ... FROM user WHERE email, skipping a solve
+    that already exists where the dialect can say so."""
+    cols = Solve.__table__.c
+    row = select(literal(uuid.uuid4(), cols.id.type), User.id, literal(challenge_id, cols.challenge_id.type),
+                 literal(datetime.utcnow(), cols.timestamp.type)).where(User.email == email)
+    names = ["id", "user_id", "challenge_id", "timestamp"]
+    if dialect == "postgresql":
+        return postgresql.insert(Solve).from_select(names, row).on_conflict_do_nothing(index_elements=["user_id", "challenge_id"])
+    if dialect == "sqlite":
+        return sqlite.insert(Solve).from_select(names, row).on_conflict_do_nothing(index_elements=["user_id", "challenge_id"])
+    return insert(Solve).from_select(names, row)
+
+async def award_solve(session: AsyncSession, email: str, challenge_id: uuid.UUID, points: int) -> Optional[int]:
+    """Record the solve and add its points in one transaction. Returns the
+    new total, or None when there was nothing to award (already solved, or
+    no such user). The unique (user_id, challenge_id) constraint makes
+    concurrent submits award points once. Raises LookupError when the
+    challenge was deleted after its flag was read."""
+    dialect = session.bind.dialect.name
+    add_points = update(User).values(score=User.score + points).returning(User.score) \
+        .execution_options(synchronize_session=False)
+    try:
+        if dialect == "postgresql":
+            # One round trip: WITH solved AS (INSERT ... RETURNING user_id) UPDATE ... FROM solved
+            solved = solve_insert(dialect, email, challenge_id).returning(Solve.user_id).cte("solved")
+            total = (await session.execute(add_points.where(User.id == solved.c.user_id))).scalar_one_or_none()
+        else:
+            inserted = (await session.execute(solve_insert(dialect, email, challenge_id))).rowcount
+            total = (await session.execute(add_points.where(User.email == email))).scalar_one() if inserted else None
         await session.commit()
-        session.refresh(user) 
-        
-        return {"correct": True, "message": f"Correct! +{challenge.points} Points!", "new_total_score": user.score}
-    else:
-        return {"correct": False, "message": "Incorrect flag.", "new_total_score": user.score}
+    except IntegrityError:
+        # Either the solve exists (dialects without ON CONFLICT) or the
+        # challenge is gone (foreign key)
+        await session.rollback()
+        if await session.get(Challenge, challenge_id) is None:
+            raise LookupError(challenge_id)
+        return None
+    return total
+
+TRUSTED_PROXIES = {p.strip() for p in settings.VERIFY_TRUSTED_PROXIES.split(",") if p.strip()}
 
-# --- LEADERBOARD (UPDATED TO HIDE ADMINS) ---
+def client_ip(request: Request) -> Optional[str]:
+    """The submitting player's address, or None if it can't be told apart
+    from other players'. X-Forwarded-For is only believed from a trusted
+    proxy, and then only its last hop that isn't one of ours."""
+    peer = request.client.host if request.client else None
+    if peer not in TRUSTED_PROXIES:
+        return peer
+    hops = [h.strip() for h in request.headers.get("x-forwarded-for", "").split(",") if h.strip()]
+    for hop in reversed(hops):
+        if hop not in TRUSTED_PROXIES:
+            return hop
+    return None
+
+async def throttle_verify(sub: FlagSubmission, request: Request, current_user: User = Depends(get_current_user)):
+    """Token buckets per player, player+challenge, challenge (all players
+    together, against guessing with many accounts) and client IP. A
+    dependency of the route itself, so throttled guesses never reach the
+    challenge or solve tables; the principal usually comes from its cache."""
+    email = current_user.email
+    buckets = {
+        f"throttle:verify:user:{email}": (settings.VERIFY_USER_RATE, settings.VERIFY_USER_BURST),
+        f"throttle:verify:challenge:{email}:{sub.challenge_id}": (settings.VERIFY_CHALLENGE_RATE, settings.VERIFY_CHALLENGE_BURST),
+        f"throttle:verify:global:{sub.challenge_id}": (settings.VERIFY_GLOBAL_RATE, settings.VERIFY_GLOBAL_BURST),
+    }
+    ip = client_ip(request)
+    if ip is not None:
+        buckets[f"throttle:verify:ip:{ip}"] = (settings.VERIFY_IP_RATE, settings.VERIFY_IP_BURST)
+    limited = await ratelimit.take(buckets)
+    if limited:
+        wait_ms, key = limited
+        metrics.VERIFY_THROTTLED.labels(key.split(":")[2]).inc()
+        raise HTTPException(status_code=429, detail="Too many submissions, slow down",
+                            headers={"Retry-After": str(max(1, math.ceil(wait_ms / 1000)))})
+
+@router.post("/verify", dependencies=[Depends(throttle_verify)])
+async def verify_flag(sub: FlagSubmission, current_user: User = Depends(get_current_user), session: AsyncSession = Depends(get_async_session)):
+    challenge = await flags.get(session, sub.challenge_id)
+    if not challenge: raise HTTPException(status_code=404, detail="Challenge not found")
+    flag, points = challenge
+    correct = sub.flag.strip() == flag
+    email = current_user.email
+
+    if correct:
+        try:
+            total = await award_solve(session, email, sub.challenge_id, points)
+        except LookupError:
+            flags.invalidate(sub.challenge_id)
+            raise HTTPException(status_code=404, detail="Challenge not found")
+        if total is not None:
+            await leaderboard.record_solve(email, total)
+            return {"correct": True, "message": f"Correct! +{points} Points!", "new_total_score": total}
+
+    # Wrong flag, repeat solve or a user deleted since the token was issued:
+    # one lookup for the score
+    score = (await session.execute(select(User.score).where(User.email == email))).scalar_one_or_none()
+    if score is None: raise HTTPException(status_code=404, detail="User not found")
+    if correct:
+        return {"correct": True, "message": "Already solved!", "new_total_score": score}
+    return {"correct": False, "message": "Incorrect flag.", "new_total_score": score}
+
+# --- LEADERBOARD (ADMINS ARE NOT RANKED) ---
 @router.get("/leaderboard")
-async def get_leaderboard(session: AsyncSession = Depends(get_async_session)):
-    # Select Users where is_admin is FALSE, order by Score
-    result = await session.execute(
-        select(User)
-        .where(User.is_admin == False)  # <--- THIS IS THE FIX
-        .order_by(User.score.desc())
-        .limit(10)
-    )
-    users = result.scalars().all()
-    return [{"email": u.email.split('@')[0], "score": u.score} for u in users]
+async def get_leaderboard(limit: int = Query(10, ge=1, le=100), session: AsyncSession = Depends(get_async_session)):
+    return await leaderboard.top(session, limit)
+
+@router.get("/leaderboard/me")
+async def get_my_standing(around: int = Query(0, ge=0, le=25), current_user: User = Depends(get_current_user), session: AsyncSession = Depends(get_async_session)):
+    """Rank and score of the caller, with ``around`` players above and below."""
+    standing = await leaderboard.standing(session, current_user, around)
+    if standing is None:
+        raise HTTPException(status_code=404, detail="Admins are not ranked")
+    return standing
@@ -1,11 +1,22 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query, UploadFile, File
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import Dict
-from sqlmodel import select
+from typing import Dict, List, Literal, Optional
+from sqlmodel import select, func
+from sqlalchemy import tuple_
 from sqlmodel.ext.asyncio.session import AsyncSession
-from app.runner import list_modules, enqueue_run
+from app.runner import enqueue_run_async, enqueue_batch_async, cancel_run_async
+from app.modules.registry import registry
+from app.core.config import settings
+from app.core import dns_cache, whois_cache, events
 from app.db.database import AsyncSessionLocal
-from app.models import Run
+from app.models import Run, RunItem
+from contextlib import aclosing
+from datetime import datetime
+import base64
+import json
+import os
+import uuid
 
 router = APIRouter()
 
@@ -18,24 +29,155 @@ class RunRequest(BaseModel):
     module: str
     target: str
     options: Dict = {}
+    max_age_s: Optional[int] = None  # reuse a successful identical run this recent
+    priority: Literal["interactive", "normal", "bulk"] = "normal"
+
+class BatchRunRequest(BaseModel):
+    modules: List[str]
+    targets: List[str]
+    options: Dict = {}
+    priority: Literal["interactive", "normal", "bulk"] = "bulk"
+
+def sse(event) -> str:
+    if event is None:
+        return ": keepalive\n\n"
+    name = event.get("status") or "progress"
+    return f"event: {name}\ndata: {json.dumps(event, default=str)}\n\n"
+
+def event_stream(gen):
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    return StreamingResponse(gen, media_type="text/event-stream", headers=headers)
 
 @router.get("/health")
 async def health():
     return {"status": "ok"}
 
+@router.get("/cache/stats")
+async def cache_stats():
+    return {"dns": await dns_cache.shared_stats(), "whois": await whois_cache.shared_stats()}
+
+def check_options(module: str, options: dict):
+    problems = registry.get(module).validate_options(options)
+    if problems:
+        raise HTTPException(status_code=400, detail=f"Invalid options for '{module}': {'; '.join(problems)}")
+
+@router.post("/wordlists")
+async def upload_wordlist(file: UploadFile = File(...)):
+    """Store a newline-separated wordlist for the subdomain module; pass the
+    returned id as its ``wordlist`` option."""
+    os.makedirs(settings.WORDLIST_DIR, exist_ok=True)
+    wordlist_id = uuid.uuid4().hex
+    path = os.path.join(settings.WORDLIST_DIR, f"{wordlist_id}.txt")
+    size = 0
+    with open(path, "wb") as buffer:
+        while chunk := await file.read(1024 * 1024):
+            size += len(chunk)
+            if size > settings.WORDLIST_MAX_BYTES:
+                buffer.close()
+                os.remove(path)
+                raise HTTPException(status_code=413, detail="Wordlist too large")
+            buffer.write(chunk)
+    return {"wordlist": wordlist_id, "bytes": size}
+
 @router.get("/modules")
 async def modules():
-    return {"modules": list_modules()}
+    return {"modules": registry.names(), "details": registry.describe()}
 
 @router.post("/run")
 async def run(req: RunRequest):
-    modules = list_modules()
-    if req.module not in modules:
+    if req.module not in registry:
         raise HTTPException(status_code=400, detail=f"Module '{req.module}' not found")
+    check_options(req.module, req.options)
     
-    # Enqueue (creates DB row synchronously in runner for safety)
-    run_id = enqueue_run(req.module, req.target, req.options)
-    return {"run_id": run_id, "status": "queued"}
+    run_id, cached = await enqueue_run_async(req.module, req.target, req.options, req.max_age_s, req.priority)
+    if cached:
+        return {"run_id": run_id, "status": "success", "cached": True}
+    return {"run_id": run_id, "status": "queued", "cached": False}
+
+@router.post("/run/batch")
+async def run_batch(req: BatchRunRequest):
+    unknown = [m for m in req.modules if m not in registry]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Module(s) not found: {', '.join(unknown)}")
+    for m in req.modules:
+        check_options(m, req.options)
+
+    # Drop blanks and duplicates but keep submission order
+    targets = list(dict.fromkeys(t.strip() for t in req.targets if t.strip()))
+    names = list(dict.fromkeys(req.modules))
+    total = len(targets) * len(names)
+    if total == 0:
+        raise HTTPException(status_code=400, detail="Batch is empty")
+    if total > settings.BATCH_MAX_RUNS:
+        raise HTTPException(status_code=400, detail=f"Batch too large ({total} runs, max {settings.BATCH_MAX_RUNS})")
+
+    batch_id, count = await enqueue_batch_async(names, targets, req.options, req.priority)
+    return {"batch_id": batch_id, "total": count, "status": "queued"}
+
+@router.get("/run/batch/{batch_id}")
+async def get_batch(batch_id: uuid.UUID, session: AsyncSession = Depends(get_session)):
+    result = await session.execute(
+        select(Run.status, func.count()).where(Run.batch_id == batch_id).group_by(Run.status)
+    )
+    by_status = {status: count for status, count in result.all()}
+    if not by_status:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    total = sum(by_status.values())
+    done = sum(by_status.get(s, 0) for s in events.TERMINAL_STATUSES)
+    return {"batch_id": batch_id, "total": total, "done": done, "by_status": by_status}
+
+def encode_cursor(created_at: datetime, run_id: uuid.UUID) -> str:
+    raw = json.dumps([created_at.isoformat(), str(run_id)])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_cursor(cursor: str):
+    try:
+        created_at, run_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(created_at), uuid.UUID(run_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+@router.get("/runs")
+async def list_runs(
+    module: Optional[str] = None,
+    status: Optional[str] = None,
+    target: Optional[str] = None,
+    target_prefix: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500),
+    include_result: bool = False,
+    session: AsyncSession = Depends(get_session),
+):
+    """Newest first. Pass ``next_cursor`` from the previous page as ``cursor``."""
+    columns = [Run.id, Run.module, Run.target, Run.status, Run.batch_id, Run.created_at, Run.started_at, Run.finished_at]
+    if include_result:
+        columns.append(Run.result)
+    query = select(*columns)
+
+    if module:
+        query = query.where(Run.module == module)
+    if status:
+        query = query.where(Run.status == status)
+    if target:
+        query = query.where(Run.target == target)
+    if target_prefix:
+        query = query.where(Run.target.like(escape_like(target_prefix) + "%", escape="\\"))
+    if cursor:
+        created_at, run_id = decode_cursor(cursor)
+        query = query.where(tuple_(Run.created_at, Run.id) < tuple_(created_at, run_id))
+
+    query = query.order_by(Run.created_at.desc(), Run.id.desc()).limit(limit + 1)
+    rows = (await session.execute(query)).mappings().all()
+
+    items = [dict(row) for row in rows[:limit]]
+    next_cursor = None
+    if len(rows) > limit:
+        last = items[-1]
+        next_cursor = encode_cursor(last["created_at"], last["id"])
+    return {"items": items, "next_cursor": next_cursor}
 
 @router.get("/run/{run_id}")
 async def get_run(run_id: str, session: AsyncSession = Depends(get_session)):
@@ -43,3 +185,71 @@ async def get_run(run_id: str, session: AsyncSession = Depends(get_session)):
     if not run_obj:
         raise HTTPException(status_code=404, detail="Run not found")
     return run_obj
+
+@router.get("/run/{run_id}/items")
+async def list_run_items(
+    run_id: uuid.UUID,
+    after: int = 0,
+    limit: int = Query(500, ge=1, le=5000),
+    session: AsyncSession = Depends(get_session),
+):
+    """Rows a run streamed out (e.g. subdomains found), in the order they were
+    stored. Pass ``next_after`` from the previous page as ``after``."""
+    rows = (await session.execute(
+        select(RunItem.id, RunItem.data).where(RunItem.run_id == run_id, RunItem.id > after)
+        .order_by(RunItem.id).limit(limit)
+    )).all()
+    return {"items": [data for _, data in rows], "next_after": rows[-1][0] if len(rows) == limit else None}
+
+@router.delete("/run/{run_id}")
+async def delete_run(run_id: uuid.UUID, session: AsyncSession = Depends(get_session)):
+    """Cancel a queued or running run. A queued task is dropped when a worker
+    receives it; a running one has its worker process terminated."""
+    if not await cancel_run_async(run_id):
+        run_obj = await session.get(Run, run_id)
+        if not run_obj:
+            raise HTTPException(status_code=404, detail="Run not found")
+        raise HTTPException(status_code=409, detail=f"Run already {run_obj.status}")
+    return {"run_id": run_id, "status": "cancelled"}
+
+@router.get("/run/{run_id}/events")
+async def run_events(run_id: uuid.UUID):
+    """Server-sent events: every status transition of a run, ending with the
+    final result. Served from Redis; Postgres is read only if Redis has
+    forgotten the run."""
+    async def gen():
+        async with aclosing(events.stream_run(str(run_id))) as stream:
+            async for event in stream:
+                if event is not None and event.get("status") is None:
+                    async with AsyncSessionLocal() as session:
+                        run_obj = await session.get(Run, run_id)
+                    if not run_obj:
+                        yield sse({"run_id": str(run_id), "status": "not_found"})
+                        return
+                    event = {"run_id": str(run_id), "status": run_obj.status,
+                             "batch_id": run_obj.batch_id, "result": run_obj.result}
+                    yield sse(event)
+                    if run_obj.status in events.TERMINAL_STATUSES:
+                        return
+                    continue
+                yield sse(event)
+    return event_stream(gen())
+
+@router.get("/run/batch/{batch_id}/events")
+async def batch_events(batch_id: uuid.UUID):
+    """Server-sent events for every run of a batch until all have finished."""
+    async def gen():
+        async with aclosing(events.stream_batch(str(batch_id))) as stream:
+            async for event in stream:
+                if event is not None and "total" in event and event["total"] is None:
+                    # Unknown to Redis (expired or never seen): report counts once
+                    async with AsyncSessionLocal() as session:
+                        result = await session.execute(
+                            select(Run.status, func.count()).where(Run.batch_id == batch_id).group_by(Run.status)
+                        )
+                        by_status = {status: count for status, count in result.all()}
+                    total = sum(by_status.values())
+                    done = sum(by_status.get(s, 0) for s in events.TERMINAL_STATUSES)
+                    event = {"batch_id": str(batch_id), "total": total, "done": done, "by_status": by_status}
+                yield sse(event)
+    return event_stream(gen())
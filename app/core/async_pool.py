@@ -0,0 +1,72 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Optional
+from .config import settings
+
+class AsyncExecutionPool:
+    """One asyncio event loop per worker process, on a background thread.
+
+    Celery task threads hand their module coroutine to ``run`` and block on
+    the result, while the loop interleaves up to ``max_inflight`` of them.
+    Meant for ``celery worker -P threads -c N``: N cheap waiting threads
+    instead of N prefork processes each doing one lookup at a time.
+    """
+
+    def __init__(self, max_inflight: int):
+        self.max_inflight = max_inflight
+        self.loop = asyncio.new_event_loop()
+        self._ready = threading.Event()
+        self._thread = threading.Thread(target=self._serve, name="async-pool", daemon=True)
+        self._thread.start()
+        self._ready.wait()
+
+    def _serve(self):
+        asyncio.set_event_loop(self.loop)
+        self._sem = asyncio.Semaphore(self.max_inflight)
+        self._ready.set()
+        self.loop.run_forever()
+
+    async def _guarded(self, coro: Awaitable):
+        async with self._sem:
+            return await coro
+
+    def run(self, coro: Awaitable, timeout: Optional[float] = None) -> Any:
+        """Run ``coro`` on the pool's loop and wait for its result. If the wait
+        ends early (timeout, soft time limit) the coroutine is cancelled."""
+        future = asyncio.run_coroutine_threadsafe(self._guarded(coro), self.loop)
+        try:
+            return future.result(timeout)
+        except BaseException:
+            future.cancel()
+            raise
+
+    def stop(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout=5)
+
+_pool: Optional[AsyncExecutionPool] = None
+_pool_lock = threading.Lock()
+_sync_threads: Optional[ThreadPoolExecutor] = None
+
+def get_async_pool() -> AsyncExecutionPool:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = AsyncExecutionPool(settings.WORKER_ASYNC_MAX_INFLIGHT)
+        return _pool
+
+def stop_async_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.stop()
+            _pool = None
+
+def get_sync_threads() -> ThreadPoolExecutor:
+    """Threads that run sync ``OSINTModule.run`` for ``arun`` callers."""
+    global _sync_threads
+    with _pool_lock:
+        if _sync_threads is None:
+            _sync_threads = ThreadPoolExecutor(settings.WORKER_SYNC_THREADS, thread_name_prefix="module-sync")
+        return _sync_threads
@@ -0,0 +1,92 @@
+import hashlib
+import json
+import logging
+import time
+from typing import Dict, Optional, Tuple
+import redis
+from fastapi.encoders import jsonable_encoder
+from sqlmodel import select
+from .config import settings
+from .redis_client import get_async_redis
+from app.models import Challenge
+
+logger = logging.getLogger(__name__)
+
+# The challenge list, serialized once per catalogue version instead of per
+# request. Every create/update/delete bumps a version counter in Redis;
+# each API process keeps the bytes it built for the version it last saw.
+# ETags are a hash of those bytes, so they stay correct even if the counter
+# is lost.
+#
+# Two views: "admin" is the full row (flags included), "player" leaves the
+# flags out.
+#
+# A bump that fails because Redis is unreachable is retried by this process
+# on its next read, and every process rebuilds after CATALOGUE_LOCAL_TTL_S
+# regardless, so a lost bump can't leave the others serving stale rows.
+
+VERSION_KEY = "challenges:version"
+PLAYER_FIELDS = ("id", "title", "description", "resources", "level", "points")
+
+# view -> (version, etag, body, built at (monotonic))
+_built: Dict[str, Tuple[str, str, bytes, float]] = {}
+# A bump that hasn't reached Redis yet
+_bump_pending = False
+
+def _seed() -> int:
+    # A fresh counter starts at the clock rather than 1, so after a Redis
+    # flush it can't come back to a version some process still has cached
+    return time.time_ns()
+
+async def current_version() -> Optional[str]:
+    if _bump_pending and not await bump():
+        return None
+    try:
+        r = get_async_redis()
+        version = await r.get(VERSION_KEY)
+        if version is None:
+            await r.set(VERSION_KEY, _seed(), nx=True)
+            version = await r.get(VERSION_KEY)
+        return version
+    except redis.RedisError as e:
+        logger.warning("Catalogue version unavailable, rebuilding per request: %s", e)
+        return None
+
+async def bump() -> bool:
+    global _bump_pending
+    try:
+        pipe = get_async_redis().pipeline(transaction=True)
+        pipe.set(VERSION_KEY, _seed(), nx=True)
+        pipe.incr(VERSION_KEY)
+        await pipe.execute()
+    except redis.RedisError as e:
+        logger.warning("Could not bump the catalogue version, will retry: %s", e)
+        _built.clear()
+        _bump_pending = True
+        return False
+    _bump_pending = False
+    return True
+
+def _serialize(challenges, view: str) -> bytes:
+    if view == "player":
+        rows = [{field: getattr(c, field) for field in PLAYER_FIELDS} for c in challenges]
+    else:
+        rows = [c.dict() for c in challenges]
+    return json.dumps(jsonable_encoder(rows), separators=(",", ":")).encode()
+
+async def get(session, view: str) -> Tuple[str, bytes]:
+    """``(etag, body)`` of ``view``, rebuilt only when the version moved."""
+    # Read the version before the rows: a write landing in between is at
+    # worst cached under the older version and rebuilt on the next call
+    version = await current_version()
+    built = _built.get(view)
+    if (version is not None and built is not None and built[0] == version
+            and time.monotonic() - built[3] < settings.CATALOGUE_LOCAL_TTL_S):
+        return built[1], built[2]
+
+    result = await session.execute(select(Challenge).order_by(Challenge.level, Challenge.title))
+    body = _serialize(result.scalars().all(), view)
+    etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+    if version is not None:
+        _built[view] = (version, etag, body, time.monotonic())
+    return etag, body
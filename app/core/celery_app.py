@@ -1,4 +1,5 @@
 from celery import Celery
+from kombu import Queue
 from .config import settings
 
 celery_app = Celery(
@@ -8,9 +9,34 @@ celery_app = Celery(
     include=["app.runner"]
 )
 
+# Priority classes map to queues; workers list them most urgent first
+PRIORITY_QUEUES = {
+    "interactive": "interactive",
+    "normal": "default",
+    "bulk": "bulk",
+}
+
 # Configure Celery to use the default queue
 celery_app.conf.update(
     task_default_queue='default',
     task_default_exchange='default',
     task_default_routing_key='default',
+    task_queues=[Queue(name) for name in PRIORITY_QUEUES.values()],
+    # Drain queues in the order the worker lists them (-Q interactive,default,bulk)
+    # instead of round-robin, so interactive runs never wait behind bulk ones
+    broker_transport_options={"queue_order_strategy": "priority"},
+    # Don't let one worker hoard a pile of bulk messages it can't start yet
+    worker_prefetch_multiplier=1,
+    # Periodic jobs (needs a `celery beat` process)
+    beat_schedule={
+        "reap-stuck-runs": {"task": "reap_stuck_runs", "schedule": settings.REAPER_INTERVAL_S},
+    },
 )
+
+def queue_for(module: str, priority: str) -> str:
+    """Queue for a run: the priority queue, prefixed with the module's queue
+    group when MODULE_QUEUES routes it to a dedicated pool
+    (e.g. {"subdomain": "enum"} sends bulk enumerations to 'enum.bulk')."""
+    queue = PRIORITY_QUEUES[priority]
+    group = settings.MODULE_QUEUES.get(module)
+    return f"{group}.{queue}" if group else queue
@@ -1,3 +1,4 @@
+from typing import Dict
 from pydantic import BaseSettings
 
 class Settings(BaseSettings):
@@ -5,7 +6,148 @@ class Settings(BaseSettings):
     DATABASE_URL_SYNC: str = "postgresql://ciphereye:cipherpass@db:5432/ciphereyedb"
     CELERY_BROKER_URL: str = "redis://redis:6379/0"
     CELERY_RESULT_BACKEND: str = "redis://redis:6379/0"
+    REDIS_URL: str = "redis://redis:6379/0"
     SECRET_KEY: str = "your-secret-key-change-this-in-production-use-openssl-rand-hex-32"
+
+    # Batch run submission
+    BATCH_MAX_RUNS: int = 100000
+    BATCH_PUBLISH_CHUNK: int = 500
+    PUBLISH_THREADS: int = 8  # API-side threads for blocking broker publishes
+
+    # Run memoization: per-module freshness window in seconds, e.g.
+    # RUN_FRESHNESS_S='{"whois": 3600}'. Requests may override with max_age_s.
+    RUN_FRESHNESS_S: Dict[str, int] = {}
+
+    # Run status streaming (Redis pub/sub)
+    RUN_STATE_TTL_S: int = 86400
+    EVENTS_KEEPALIVE_S: float = 15.0
+
+    # Per-module queue groups, e.g. MODULE_QUEUES='{"subdomain": "enum"}'
+    # routes subdomain runs to enum.interactive / enum.default / enum.bulk
+    MODULE_QUEUES: Dict[str, str] = {}
+
+    # Politeness scheduler: per-module overrides of max_concurrency,
+    # rate_limit and rate_burst, e.g. MODULE_LIMITS='{"whois": {"rate_limit": 0.5}}'
+    SCHEDULER_ENABLED: bool = True
+    MODULE_LIMITS: Dict[str, Dict[str, float]] = {}
+    SCHEDULER_LEASE_S: int = 600  # lease for modules without a time limit
+    # Back-off when a module is at its concurrency cap, doubling per retry
+    SCHEDULER_RETRY_S: float = 2.0
+    SCHEDULER_RETRY_MAX_S: float = 60.0
+    # A deferred run reserves its rate token at most this far ahead; past
+    # that it checks back after this long without reserving
+    SCHEDULER_RESERVE_HORIZON_S: float = 600.0
+    # Fail a run that has been deferred this long instead of retrying forever
+    SCHEDULER_MAX_DEFER_S: int = 86400
+    # Re-deferrals only rewrite Run.deferred_until (for the reaper) once it
+    # is this far behind the run's new due time
+    SCHEDULER_DEFER_WRITE_S: float = 300.0
+
+    # Run time limits, overridable per module through MODULE_LIMITS
+    # (soft_time_limit / time_limit). The soft limit fails the run cleanly,
+    # the hard one kills the worker process.
+    RUN_SOFT_TIME_LIMIT_S: int = 120
+    RUN_TIME_LIMIT_S: int = 150
+    # Reaper: fails running runs past their deadline, and queued runs no
+    # worker has looked at (picked up or deferred) for RUN_QUEUED_MAX_AGE_S
+    REAPER_INTERVAL_S: float = 60.0
+    RUN_QUEUED_MAX_AGE_S: int = 86400
+
+    # Async worker mode: run modules' arun() on one event loop per process.
+    # Pair with a thread pool worker (celery worker -P threads -c N).
+    WORKER_ASYNC_MODE: bool = False
+    WORKER_ASYNC_MAX_INFLIGHT: int = 200
+    WORKER_SYNC_THREADS: int = 32  # thread-pool adapter for sync-only modules
+
+    # Worker-side buffered result writer; thread pool workers only (-P
+    # threads), prefork workers write each result directly
+    RESULT_WRITER_ENABLED: bool = False
+    RESULT_WRITER_BATCH_SIZE: int = 200
+    RESULT_WRITER_MAX_STALENESS_S: float = 2.0
+
+    # Rotating refresh tokens (Redis); access tokens last ACCESS_TOKEN_EXPIRE_MINUTES
+    REFRESH_TOKEN_TTL_S: int = 14 * 86400
+
+    # bcrypt runs on a small per-process pool; beyond THREADS running and
+    # QUEUE waiting, password endpoints answer 503 instead of piling up
+    PASSWORD_HASH_THREADS: int = 2
+    PASSWORD_HASH_QUEUE: int = 32
+
+    # Challenge flags cached per API process for /challenges/verify, reloaded
+    # when the catalogue version moves; the TTL bounds them while it can't
+    # be read
+    FLAG_CACHE_TTL_S: float = 30.0
+    FLAG_CACHE_MAX_ENTRIES: int = 1000
+
+    # Serialized challenge list kept per API process; rebuilt at least this
+    # often even if the version in Redis didn't move (a bump that failed
+    # while Redis was unreachable)
+    CATALOGUE_LOCAL_TTL_S: float = 30.0
+
+    # Flag submission throttle: token buckets (RATE per second, BURST) per
+    # player, per player+challenge, per challenge across all players
+    # (GLOBAL) and per client IP; a 0 RATE disables one.
+    # The player dashboard calls the API from its own container, so the
+    # peer address is the dashboard's for every player: the IP bucket is
+    # off unless players reach the API directly or through a proxy listed
+    # in VERIFY_TRUSTED_PROXIES (comma-separated peer IPs whose
+    # X-Forwarded-For is believed).
+    VERIFY_USER_RATE: float = 1.0
+    VERIFY_USER_BURST: int = 10
+    VERIFY_IP_RATE: float = 0.0  # if enabled, keep it generous: event networks put many players behind one NAT
+    VERIFY_IP_BURST: int = 50
+    VERIFY_TRUSTED_PROXIES: str = ""
+    VERIFY_CHALLENGE_RATE: float = 0.2
+    VERIFY_CHALLENGE_BURST: int = 5
+    VERIFY_GLOBAL_RATE: float = 20.0
+    VERIFY_GLOBAL_BURST: int = 200
+
+    # Bulk user import (POST /auth/users/import); 0 PROCESSES = one per CPU
+    USER_IMPORT_PROCESSES: int = 0
+    USER_IMPORT_CHUNK: int = 500
+    USER_IMPORT_MAX_ROWS: int = 50000
+
+    # Authenticated-user cache (0 TTL disables it); SHARED adds a Redis tier
+    PRINCIPAL_CACHE_TTL_S: float = 30.0
+    PRINCIPAL_CACHE_MAX_ENTRIES: int = 10000
+    PRINCIPAL_CACHE_SHARED: bool = False
+
+    # Prometheus metrics: /metrics on the API, an exporter in the worker.
+    # /metrics wants "Authorization: Bearer <METRICS_TOKEN>"; without a token
+    # set it only answers loopback clients. The worker exporter has no auth,
+    # so it listens on WORKER_METRICS_ADDR only
+    METRICS_ENABLED: bool = True
+    METRICS_TOKEN: str = ""
+    WORKER_METRICS_ADDR: str = "127.0.0.1"
+    WORKER_METRICS_PORT: int = 9808
+
+    # DNS module
+    DNS_NAMESERVERS: str = ""  # comma-separated, empty = system resolv.conf
+    DNS_PORT: int = 53
+    DNS_QUERY_TIMEOUT_S: float = 3.0
+    DNS_CONCURRENT: bool = True
+    DNS_CACHE_ENABLED: bool = True
+    DNS_CACHE_SHARED: bool = True  # share answers across workers through Redis
+    DNS_CACHE_MAX_ENTRIES: int = 10000
+    DNS_CACHE_MAX_TTL_S: int = 86400
+    DNS_NEGATIVE_TTL_S: int = 300
+
+    # Subdomain enumeration module
+    SUBDOMAIN_CONCURRENCY: int = 100
+    SUBDOMAIN_PROGRESS_EVERY_S: float = 5.0
+    SUBDOMAIN_WILDCARD_TTL_S: int = 3600
+    WORDLIST_DIR: str = "app/data/wordlists"  # uploaded wordlists
+    WORDLIST_MAX_BYTES: int = 50 * 1024 * 1024
+
+    # WHOIS module
+    WHOIS_CACHE_ENABLED: bool = True
+    WHOIS_CACHE_TTL_S: int = 86400
+    WHOIS_LOCK_TTL_S: int = 60  # upper bound on one upstream lookup
+    WHOIS_COALESCE_WAIT_S: float = 90.0
+    WHOIS_COALESCE_POLL_S: float = 0.25
+    WHOIS_ERROR_TTL_S: int = 10
+    WHOIS_SERVER: str = ""  # host[:port] to query instead of the per-TLD server
+    WHOIS_QUERY_TIMEOUT_S: float = 10.0
     
     class Config:
         env_file = ".env"
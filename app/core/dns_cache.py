@@ -0,0 +1,169 @@
+import json
+import logging
+import time
+from typing import Dict, Iterable, Optional
+import redis
+from .cache import LRUTTLCache
+from .config import settings
+from .redis_client import get_redis, get_async_redis
+
+logger = logging.getLogger(__name__)
+
+STATS_KEY = "dns:cache:stats"
+
+def _key(qname: str, rtype: str) -> str:
+    return f"dns:{qname}:{rtype}"
+
+def normalize_qname(qname: str) -> str:
+    return qname.strip().lower().rstrip(".")
+
+class DNSCache:
+    """DNS answer cache with two tiers: a per-process LRU in front of Redis,
+    so every worker process shares answers and NXDOMAIN/NODATA results.
+
+    An entry is ``{"records": [...], "error": None | "nxdomain" | "no_answer",
+    "message": ..., "expires_at": <unix ts>}``. Entries live for the record TTL (negative
+    entries for the SOA minimum), clamped to ``DNS_CACHE_MAX_TTL_S``.
+    """
+
+    def __init__(self, maxsize: int, use_redis: bool = True):
+        self.local = LRUTTLCache(maxsize)
+        self.use_redis = use_redis
+        self.hits = 0
+        self.misses = 0
+        # Counters not yet pushed to Redis; flushed with the next write
+        self._pending_hits = 0
+        self._pending_misses = 0
+
+    # get_many/put_many are for sync callers; aget_many/aput_many do the same
+    # over the asyncio client, for modules running on the worker's event loop
+
+    def get_many(self, qname: str, rtypes: Iterable[str]) -> Dict[str, dict]:
+        qname, rtypes, found, missing = self._lookup_local(qname, rtypes)
+        if missing and self.use_redis:
+            try:
+                raw = get_redis().mget([_key(qname, rtype) for rtype in missing])
+            except redis.RedisError as e:
+                logger.warning("DNS cache read failed: %s", e)
+                raw = [None] * len(missing)
+            self._merge_shared(qname, missing, raw, found)
+        return self._count(rtypes, found)
+
+    async def aget_many(self, qname: str, rtypes: Iterable[str]) -> Dict[str, dict]:
+        qname, rtypes, found, missing = self._lookup_local(qname, rtypes)
+        if missing and self.use_redis:
+            try:
+                raw = await get_async_redis().mget([_key(qname, rtype) for rtype in missing])
+            except redis.RedisError as e:
+                logger.warning("DNS cache read failed: %s", e)
+                raw = [None] * len(missing)
+            self._merge_shared(qname, missing, raw, found)
+        return self._count(rtypes, found)
+
+    def has_all(self, qname: str, rtypes: Iterable[str]) -> bool:
+        """Whether ``get_many`` would answer every one of ``rtypes`` (a
+        pre-check; not counted as hits or misses). Shared entries found on
+        the way are kept locally for the lookup that follows."""
+        qname, rtypes, found, missing = self._lookup_local(qname, rtypes)
+        if missing and self.use_redis:
+            try:
+                raw = get_redis().mget([_key(qname, rtype) for rtype in missing])
+            except redis.RedisError:
+                return False
+            self._merge_shared(qname, missing, raw, found)
+        return len(found) == len(rtypes)
+
+    def put_many(self, qname: str, entries: Dict[str, dict]):
+        """Store fresh answers (``{rtype: {"records", "error", "ttl"}}``) and
+        push pending hit/miss counters, all in one Redis pipeline."""
+        qname, to_store = self._store_local(qname, entries)
+        if not self._needs_write(to_store):
+            return
+        try:
+            self._fill_pipeline(get_redis().pipeline(transaction=False), qname, to_store).execute()
+            self._pending_hits = self._pending_misses = 0
+        except redis.RedisError as e:
+            logger.warning("DNS cache write failed: %s", e)
+
+    async def aput_many(self, qname: str, entries: Dict[str, dict]):
+        qname, to_store = self._store_local(qname, entries)
+        if not self._needs_write(to_store):
+            return
+        # Taken before the await so hits counted meanwhile aren't lost
+        hits, misses = self._pending_hits, self._pending_misses
+        try:
+            await self._fill_pipeline(get_async_redis().pipeline(transaction=False), qname, to_store).execute()
+            self._pending_hits -= hits
+            self._pending_misses -= misses
+        except redis.RedisError as e:
+            logger.warning("DNS cache write failed: %s", e)
+
+    def _lookup_local(self, qname: str, rtypes: Iterable[str]):
+        qname = normalize_qname(qname)
+        rtypes = list(rtypes)
+        found = {}
+        for rtype in rtypes:
+            entry = self.local.get((qname, rtype))
+            if entry is not None:
+                found[rtype] = entry
+        return qname, rtypes, found, [rtype for rtype in rtypes if rtype not in found]
+
+    def _merge_shared(self, qname: str, missing: list, raw: list, found: dict):
+        now = time.time()
+        for rtype, value in zip(missing, raw):
+            if value is None:
+                continue
+            entry = json.loads(value)
+            if entry["expires_at"] > now:
+                found[rtype] = entry
+                self.local.set((qname, rtype), entry, entry["expires_at"] - now)
+
+    def _count(self, rtypes: list, found: dict) -> Dict[str, dict]:
+        hits = len(found)
+        self.hits += hits
+        self.misses += len(rtypes) - hits
+        self._pending_hits += hits
+        self._pending_misses += len(rtypes) - hits
+        return found
+
+    def _store_local(self, qname: str, entries: Dict[str, dict]):
+        qname = normalize_qname(qname)
+        now = time.time()
+        to_store = {}
+        for rtype, entry in entries.items():
+            ttl = min(int(entry["ttl"]), settings.DNS_CACHE_MAX_TTL_S)
+            if ttl <= 0:
+                continue
+            stored = {"records": entry["records"], "error": entry["error"],
+                      "message": entry.get("message"), "expires_at": now + ttl}
+            self.local.set((qname, rtype), stored, ttl)
+            to_store[rtype] = (stored, ttl)
+        return qname, to_store
+
+    def _needs_write(self, to_store: dict) -> bool:
+        return self.use_redis and bool(to_store or self._pending_hits or self._pending_misses)
+
+    def _fill_pipeline(self, pipe, qname: str, to_store: dict):
+        for rtype, (stored, ttl) in to_store.items():
+            pipe.set(_key(qname, rtype), json.dumps(stored), ex=ttl)
+        if self._pending_hits:
+            pipe.hincrby(STATS_KEY, "hits", self._pending_hits)
+        if self._pending_misses:
+            pipe.hincrby(STATS_KEY, "misses", self._pending_misses)
+        return pipe
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "local_entries": len(self.local)}
+
+async def shared_stats() -> dict:
+    """Hit/miss counters summed over every worker process."""
+    raw = await get_async_redis().hgetall(STATS_KEY)
+    return {"hits": int(raw.get("hits", 0)), "misses": int(raw.get("misses", 0))}
+
+_cache: Optional[DNSCache] = None
+
+def get_dns_cache() -> DNSCache:
+    global _cache
+    if _cache is None:
+        _cache = DNSCache(settings.DNS_CACHE_MAX_ENTRIES, use_redis=settings.DNS_CACHE_SHARED)
+    return _cache
@@ -0,0 +1,17 @@
+import tldextract
+
+# Bundled public suffix list snapshot only: never fetch it over the network
+_extract = tldextract.TLDExtract(cache_dir=None, suffix_list_urls=())
+
+def normalize_host(target: str) -> str:
+    return target.strip().lower().rstrip(".")
+
+def registrable_domain(target: str) -> str:
+    """``www.Example.co.uk.`` -> ``example.co.uk``; IPs and bare hosts are
+    returned normalized but otherwise unchanged."""
+    host = normalize_host(target)
+    return _extract(host).registered_domain or host
+
+def public_suffix(target: str) -> str:
+    """``www.example.co.uk`` -> ``co.uk``; empty for IPs and bare hosts."""
+    return _extract(normalize_host(target)).suffix
@@ -0,0 +1,127 @@
+import json
+import logging
+from typing import AsyncIterator, Iterable, Optional
+import redis
+from .config import settings
+from .redis_client import get_redis, get_async_redis
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STATUSES = ("success", "failed", "cancelled")
+
+# Redis layout:
+#   run:<id>:state     latest event for a run (JSON), so late subscribers
+#                      can catch up without reading Postgres
+#   run:<id>:events    pub/sub channel with every status transition
+#   run:<id>:final     set by the first terminal event; later ones (a worker
+#                      finishing a run that was cancelled) are dropped
+#   batch:<id>:total   number of runs in the batch
+#   batch:<id>:done    number of runs that reached a terminal status
+#   batch:<id>:events  pub/sub channel with every run event of the batch
+
+def _state_key(run_id: str) -> str:
+    return f"run:{run_id}:state"
+
+def record_queued(run_ids: Iterable[str], batch_id: Optional[str] = None):
+    """Seed the state of freshly enqueued runs (one pipeline per call)."""
+    run_ids = list(run_ids)
+    ttl = settings.RUN_STATE_TTL_S
+    try:
+        pipe = get_redis().pipeline(transaction=False)
+        for run_id in run_ids:
+            state = {"run_id": run_id, "status": "queued", "batch_id": batch_id}
+            pipe.set(_state_key(run_id), json.dumps(state), ex=ttl)
+        if batch_id:
+            pipe.set(f"batch:{batch_id}:total", len(run_ids), ex=ttl)
+            pipe.set(f"batch:{batch_id}:done", 0, ex=ttl)
+        pipe.execute()
+    except redis.RedisError as e:
+        logger.warning("Could not record queued runs: %s", e)
+
+def is_final(run_id: str) -> bool:
+    """Whether the run already reached a terminal status (cancelled, reaped,
+    ...). False when Redis can't tell; callers then check Postgres."""
+    try:
+        return bool(get_redis().exists(f"run:{run_id}:final"))
+    except redis.RedisError as e:
+        logger.warning("Could not read final state of run %s: %s", run_id, e)
+        return False
+
+def publish_run_event(run_id: str, status: str, batch_id: Optional[str] = None, result: Optional[dict] = None,
+                      progress: Optional[dict] = None):
+    """Store and broadcast a status transition. Never raises: a missed event
+    only means subscribers fall back to polling."""
+    event = {"run_id": run_id, "status": status, "batch_id": batch_id}
+    if result is not None:
+        event["result"] = result
+    if progress is not None:
+        event["progress"] = progress
+    ttl = settings.RUN_STATE_TTL_S
+    try:
+        r = get_redis()
+        if status in TERMINAL_STATUSES:
+            if not r.set(f"run:{run_id}:final", status, nx=True, ex=ttl):
+                return
+            if batch_id:
+                event["batch_done"] = r.incr(f"batch:{batch_id}:done")
+        payload = json.dumps(event)
+        pipe = r.pipeline(transaction=False)
+        pipe.set(_state_key(run_id), payload, ex=ttl)
+        pipe.publish(f"run:{run_id}:events", payload)
+        if batch_id:
+            pipe.publish(f"batch:{batch_id}:events", payload)
+        pipe.execute()
+    except redis.RedisError as e:
+        logger.warning("Could not publish event for run %s: %s", run_id, e)
+
+async def _listen(channel: str, initial, is_final) -> AsyncIterator[Optional[dict]]:
+    """Subscribe first, then let ``initial`` read the current state, so no
+    transition can fall between the two. Yields None as a keepalive tick."""
+    pubsub = get_async_redis().pubsub()
+    await pubsub.subscribe(channel)
+    try:
+        done = False
+        async for event in initial():
+            yield event
+            done = done or is_final(event)
+        while not done:
+            msg = await pubsub.get_message(ignore_subscribe_messages=True, timeout=settings.EVENTS_KEEPALIVE_S)
+            if msg is None:
+                yield None
+                continue
+            event = json.loads(msg["data"])
+            yield event
+            done = is_final(event)
+    finally:
+        await pubsub.aclose()
+
+def stream_run(run_id: str) -> AsyncIterator[Optional[dict]]:
+    """Events of one run until it finishes. If Redis has no state for the
+    run (e.g. it expired), the first event has ``status`` None and the
+    caller is expected to load the row itself."""
+    async def initial():
+        raw = await get_async_redis().get(_state_key(run_id))
+        yield json.loads(raw) if raw else {"run_id": run_id, "status": None}
+
+    return _listen(f"run:{run_id}:events", initial, lambda e: e.get("status") in TERMINAL_STATUSES)
+
+def stream_batch(batch_id: str) -> AsyncIterator[Optional[dict]]:
+    """Run events of a batch until every run in it has finished. The first
+    event is ``{"batch_id", "total", "done"}``; ``total`` is None when Redis
+    does not know the batch."""
+    r = get_async_redis()
+    progress = {"batch_id": batch_id, "total": None, "done": 0}
+
+    async def initial():
+        total, done = await r.mget(f"batch:{batch_id}:total", f"batch:{batch_id}:done")
+        if total is not None:
+            progress.update(total=int(total), done=int(done or 0))
+        yield dict(progress)
+
+    def is_final(event):
+        if progress["total"] is None:
+            return True
+        progress["done"] = max(progress["done"], event.get("batch_done", event.get("done", 0)))
+        return progress["done"] >= progress["total"]
+
+    return _listen(f"batch:{batch_id}:events", initial, is_final)
@@ -0,0 +1,29 @@
+import uuid
+from typing import Optional, Tuple
+from . import catalogue
+from .cache import LRUTTLCache
+from .config import settings
+from app.models import Challenge
+
+# Flag and points per challenge, so a submission doesn't reload the
+# challenge row. Entries are tagged with the catalogue version they were
+# loaded under: an edit or delete in any API process bumps it, and every
+# process reloads on its next submission. FLAG_CACHE_TTL_S only matters
+# while the version can't be read (Redis down).
+
+_local = LRUTTLCache(settings.FLAG_CACHE_MAX_ENTRIES)
+
+async def get(session, challenge_id: uuid.UUID) -> Optional[Tuple[str, int]]:
+    """``(flag, points)``, or None if the challenge doesn't exist."""
+    version = await catalogue.current_version()
+    entry = _local.get(challenge_id)
+    if entry is None or (version is not None and entry[0] != version):
+        challenge = await session.get(Challenge, challenge_id)
+        if challenge is None:
+            return None
+        entry = (version, challenge.flag.strip(), challenge.points)
+        _local.set(challenge_id, entry, settings.FLAG_CACHE_TTL_S)
+    return entry[1], entry[2]
+
+def invalidate(challenge_id: uuid.UUID):
+    _local.delete(challenge_id)
@@ -0,0 +1,132 @@
+import logging
+from typing import List, Optional
+import redis
+from sqlalchemy import func
+from sqlmodel import select
+from .redis_client import get_async_redis
+from app.models import User
+
+logger = logging.getLogger(__name__)
+
+# Player scores mirrored into a Redis sorted set (member = email), so top-N,
+# rank and neighbourhood are O(log n) instead of a scan of the user table.
+# Postgres stays the source of truth: the set is rebuilt from it whenever
+# the READY marker is missing (first use, Redis restart or flush), and
+# reads fall back to SQL while Redis is down. Admins are never members.
+#
+# Solves only ever raise a score, so they write the committed total with
+# ZADD GT: concurrent solves may land in any order and still converge on
+# the highest (latest) total. Admin edits can lower a score and overwrite
+# it outright.
+
+KEY = "leaderboard"
+READY = "leaderboard:ready"
+REBUILD_BATCH = 5000
+
+def _player(email: str, score: float, rank: int) -> dict:
+    # Public name only, as the leaderboard has always shown
+    return {"rank": rank, "email": email.split("@")[0], "score": int(score)}
+
+async def _load(r, session, key: str, gt: bool):
+    result = await session.stream(select(User.email, User.score).where(User.is_admin == False))
+    async for rows in result.partitions(REBUILD_BATCH):
+        await r.zadd(key, {email: score for email, score in rows}, gt=gt)
+
+async def _ensure(r, session):
+    if await r.exists(READY):
+        return
+    # Merge into the live set rather than replace it: anything a solve
+    # wrote meanwhile is at least as new as what we read
+    await _load(r, session, KEY, gt=True)
+    await r.set(READY, 1)
+
+async def rebuild(session):
+    """Replace the set wholesale, dropping members Redis kept but Postgres
+    no longer has (for manage.py; normal reads self-heal)."""
+    r = get_async_redis()
+    tmp = f"{KEY}:rebuild"
+    await r.delete(tmp)
+    await _load(r, session, tmp, gt=False)
+    pipe = r.pipeline(transaction=True)
+    if await r.exists(tmp):
+        pipe.rename(tmp, KEY)
+    else:
+        pipe.delete(KEY)
+    pipe.set(READY, 1)
+    await pipe.execute()
+
+async def record_solve(email: str, total: int):
+    try:
+        await get_async_redis().zadd(KEY, {email: total}, gt=True)
+    except redis.RedisError as e:
+        logger.warning("Leaderboard update for %s failed: %s", email, e)
+
+async def set_score(email: str, score: int):
+    try:
+        await get_async_redis().zadd(KEY, {email: score})
+    except redis.RedisError as e:
+        logger.warning("Leaderboard update for %s failed: %s", email, e)
+
+async def add_players(emails: List[str]):
+    """New players start at 0; existing members are left alone."""
+    if not emails:
+        return
+    try:
+        await get_async_redis().zadd(KEY, {email: 0 for email in emails}, nx=True)
+    except redis.RedisError as e:
+        logger.warning("Leaderboard update failed: %s", e)
+
+async def remove(email: str):
+    try:
+        await get_async_redis().zrem(KEY, email)
+    except redis.RedisError as e:
+        logger.warning("Leaderboard removal of %s failed: %s", email, e)
+
+async def top(session, n: int) -> List[dict]:
+    try:
+        r = get_async_redis()
+        await _ensure(r, session)
+        rows = await r.zrevrange(KEY, 0, n - 1, withscores=True)
+    except redis.RedisError as e:
+        logger.warning("Leaderboard unavailable, reading Postgres: %s", e)
+        result = await session.execute(
+            select(User.email, User.score).where(User.is_admin == False).order_by(User.score.desc()).limit(n)
+        )
+        rows = result.all()
+    return [_player(email, score, i + 1) for i, (email, score) in enumerate(rows)]
+
+async def standing(session, user: User, around: int = 0) -> Optional[dict]:
+    """``user``'s rank and score, plus ``around`` players either side.
+    None for admins. Without Redis the neighbourhood is left empty."""
+    if user.is_admin:
+        return None
+    try:
+        r = get_async_redis()
+        await _ensure(r, session)
+        pipe = r.pipeline(transaction=False)
+        pipe.zrevrank(KEY, user.email)
+        pipe.zcard(KEY)
+        index, players = await pipe.execute()
+        if index is None:
+            # A write was lost while Redis was away; put the player back
+            score = (await session.execute(select(User.score).where(User.id == user.id))).scalar_one()
+            await r.zadd(KEY, {user.email: score}, gt=True)
+            index, players = await r.zrevrank(KEY, user.email), players + 1
+        start = max(0, index - around)
+        rows = await r.zrevrange(KEY, start, index + around, withscores=True)
+    except redis.RedisError as e:
+        logger.warning("Leaderboard unavailable, reading Postgres: %s", e)
+        score = (await session.execute(select(User.score).where(User.id == user.id))).scalar_one()
+        ahead = (await session.execute(
+            select(func.count()).select_from(User).where(User.is_admin == False, User.score > score)
+        )).scalar_one()
+        players = (await session.execute(
+            select(func.count()).select_from(User).where(User.is_admin == False)
+        )).scalar_one()
+        return {"rank": ahead + 1, "score": score, "players": players, "around": []}
+
+    neighbours = [_player(email, s, start + i + 1) for i, (email, s) in enumerate(rows)]
+    me = neighbours[index - start]
+    me["me"] = True
+    return {"rank": me["rank"], "score": me["score"], "players": players,
+            "around": neighbours if around else []}
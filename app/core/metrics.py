@@ -0,0 +1,138 @@
+import logging
+import os
+import time
+from prometheus_client import (
+    CollectorRegistry, Counter, Histogram, REGISTRY, generate_latest, start_http_server,
+)
+from prometheus_client.core import GaugeMetricFamily
+from prometheus_client.multiprocess import MultiProcessCollector
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+import redis
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+# Prometheus metrics for the API and the Celery worker. Both run several
+# processes (uvicorn --workers, prefork children), so set
+# PROMETHEUS_MULTIPROC_DIR to a per-service directory that is emptied before
+# the service starts; the API's /metrics and the worker exporter then report
+# the sum over all processes.
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+RUN_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 900, 3600)
+
+RUN_DURATION = Histogram(
+    "ciphereye_run_duration_seconds", "Module run duration as reported by the module",
+    ["module"], buckets=RUN_BUCKETS,
+)
+RUNS = Counter("ciphereye_runs_total", "Finished runs", ["module", "status"])
+RUNS_REAPED = Counter("ciphereye_runs_reaped_total", "Runs failed by the reaper", ["reason"])
+QUEUE_WAIT = Histogram(
+    "ciphereye_run_queue_wait_seconds", "Time from Run.created_at to the task starting",
+    ["module"], buckets=RUN_BUCKETS,
+)
+DB_ACQUIRE = Histogram(
+    "ciphereye_db_acquire_seconds", "Time for a session to get a pooled connection",
+    buckets=LATENCY_BUCKETS,
+)
+DB_COMMIT = Histogram("ciphereye_db_commit_seconds", "Session commit latency", buckets=LATENCY_BUCKETS)
+VERIFY_THROTTLED = Counter(
+    "ciphereye_verify_throttled_total", "Flag submissions rejected by the throttle", ["scope"],
+)
+HTTP_LATENCY = Histogram(
+    "ciphereye_http_request_duration_seconds", "Request latency by route template",
+    ["method", "route", "status"], buckets=LATENCY_BUCKETS,
+)
+
+_broker = None
+
+class QueueDepthCollector:
+    """Messages waiting in each Celery queue (LLEN on the Redis broker),
+    read at scrape time."""
+
+    def describe(self):
+        # Known up front, so registering doesn't trigger a Redis round trip
+        return [GaugeMetricFamily("ciphereye_queue_depth", "Messages waiting per queue", labels=["queue"])]
+
+    def collect(self):
+        global _broker
+        from .celery_app import PRIORITY_QUEUES
+        if not settings.CELERY_BROKER_URL.startswith(("redis://", "rediss://")):
+            return
+        names = set(PRIORITY_QUEUES.values())
+        for group in set(settings.MODULE_QUEUES.values()):
+            names.update(f"{group}.{q}" for q in PRIORITY_QUEUES.values())
+        names = sorted(names)
+        depth = GaugeMetricFamily("ciphereye_queue_depth", "Messages waiting per queue", labels=["queue"])
+        try:
+            if _broker is None:
+                _broker = redis.Redis.from_url(settings.CELERY_BROKER_URL)
+            pipe = _broker.pipeline(transaction=False)
+            for name in names:
+                pipe.llen(name)
+            for name, length in zip(names, pipe.execute()):
+                depth.add_metric([name], length)
+        except redis.RedisError as e:
+            logger.warning("Could not read queue depths: %s", e)
+        yield depth
+
+MULTIPROCESS = bool(os.environ.get("PROMETHEUS_MULTIPROC_DIR"))
+if not MULTIPROCESS:
+    REGISTRY.register(QueueDepthCollector())
+
+def build_registry() -> CollectorRegistry:
+    """What to expose: this process's metrics, or in multiprocess mode the
+    merged files of every process of the service."""
+    if not MULTIPROCESS:
+        return REGISTRY
+    registry = CollectorRegistry()
+    MultiProcessCollector(registry)
+    registry.register(QueueDepthCollector())
+    return registry
+
+def render() -> bytes:
+    return generate_latest(build_registry())
+
+def start_worker_exporter():
+    """HTTP exporter for the worker, started once in the main worker process."""
+    if settings.METRICS_ENABLED:
+        start_http_server(settings.WORKER_METRICS_PORT, addr=settings.WORKER_METRICS_ADDR, registry=build_registry())
+
+# --- DB SESSION TIMINGS ---
+# Registered on the ORM Session class, so they cover the sync sessions of
+# the worker and the AsyncSessions of the API alike. A session connects
+# lazily: the clock starts at the first statement or flush of a transaction
+# and stops once the transaction has its connection.
+
+def _mark_acquire(session):
+    session.info.setdefault("acquire_started", time.perf_counter())
+
+@event.listens_for(Session, "do_orm_execute")
+def _acquire_start_execute(orm_execute_state):
+    _mark_acquire(orm_execute_state.session)
+
+@event.listens_for(Session, "before_flush")
+def _acquire_start_flush(session, flush_context, instances):
+    _mark_acquire(session)
+
+@event.listens_for(Session, "after_begin")
+def _acquire_end(session, transaction, connection):
+    started = session.info.pop("acquire_started", None)
+    if started is not None:
+        DB_ACQUIRE.observe(time.perf_counter() - started)
+
+@event.listens_for(Session, "after_transaction_end")
+def _acquire_reset(session, transaction):
+    # Statements after the connection was taken leave a stale mark behind
+    session.info.pop("acquire_started", None)
+
+@event.listens_for(Session, "before_commit")
+def _commit_start(session):
+    session.info["commit_started"] = time.perf_counter()
+
+@event.listens_for(Session, "after_commit")
+def _commit_end(session):
+    started = session.info.pop("commit_started", None)
+    if started is not None:
+        DB_COMMIT.observe(time.perf_counter() - started)
@@ -0,0 +1,90 @@
+import asyncio
+import json
+import logging
+from typing import Optional
+import redis
+from .cache import LRUTTLCache
+from .config import settings
+from .redis_client import get_async_redis
+
+logger = logging.getLogger(__name__)
+
+# Authenticated users by token subject (email), so most requests skip the
+# user lookup. Entries hold only what authorization needs (no password hash,
+# no score). A user that is deleted, promoted or demoted must be passed to
+# ``invalidate``: it drops the local entry and the shared one, and tells the
+# other API processes to drop theirs over pub/sub. The short TTL bounds
+# staleness if that message is missed.
+
+CHANNEL = "principal:invalidate"
+FIELDS = ("id", "email", "is_admin", "is_active")
+
+_local = LRUTTLCache(settings.PRINCIPAL_CACHE_MAX_ENTRIES)
+_listener: Optional[asyncio.Task] = None
+
+def _key(email: str) -> str:
+    return f"principal:{email}"
+
+async def get(email: str) -> Optional[dict]:
+    principal = _local.get(email)
+    if principal is not None or not settings.PRINCIPAL_CACHE_SHARED:
+        return principal
+    try:
+        raw = await get_async_redis().get(_key(email))
+    except redis.RedisError as e:
+        logger.warning("Shared principal cache unavailable: %s", e)
+        return None
+    if raw is None:
+        return None
+    principal = json.loads(raw)
+    _local.set(email, principal, settings.PRINCIPAL_CACHE_TTL_S)
+    return principal
+
+async def put(user) -> dict:
+    principal = {field: getattr(user, field) for field in FIELDS}
+    principal["id"] = str(principal["id"])
+    _local.set(user.email, principal, settings.PRINCIPAL_CACHE_TTL_S)
+    if settings.PRINCIPAL_CACHE_SHARED and settings.PRINCIPAL_CACHE_TTL_S > 0:
+        try:
+            await get_async_redis().set(_key(user.email), json.dumps(principal), ex=int(settings.PRINCIPAL_CACHE_TTL_S) or 1)
+        except redis.RedisError as e:
+            logger.warning("Shared principal cache unavailable: %s", e)
+    return principal
+
+async def invalidate(email: str):
+    _local.delete(email)
+    try:
+        r = get_async_redis()
+        pipe = r.pipeline(transaction=False)
+        pipe.delete(_key(email))
+        pipe.publish(CHANNEL, email)
+        await pipe.execute()
+    except redis.RedisError as e:
+        logger.warning("Could not broadcast principal invalidation for %s: %s", email, e)
+
+async def _listen():
+    while True:
+        pubsub = get_async_redis().pubsub()
+        try:
+            await pubsub.subscribe(CHANNEL)
+            # Anything published while we weren't subscribed is lost
+            _local.clear()
+            async for msg in pubsub.listen():
+                if msg["type"] == "message":
+                    _local.delete(msg["data"])
+        except redis.RedisError as e:
+            logger.warning("Principal invalidation listener disconnected: %s", e)
+            await asyncio.sleep(5)
+        finally:
+            await pubsub.aclose()
+
+def start_listener():
+    global _listener
+    if _listener is None and settings.PRINCIPAL_CACHE_TTL_S > 0:
+        _listener = asyncio.get_running_loop().create_task(_listen())
+
+async def stop_listener():
+    global _listener
+    if _listener is not None:
+        _listener.cancel()
+        _listener = None
@@ -0,0 +1,145 @@
+import logging
+from typing import Dict, Optional, Tuple
+import redis
+from .redis_client import get_async_redis, get_redis
+
+logger = logging.getLogger(__name__)
+
+# Atomically take a concurrency lease and a rate-limit token.
+#
+# KEYS[1]  ZSET of lease holders (member -> lease expiry, ms)
+# KEYS[2]  HASH token bucket {tokens, ts}
+# ARGV     member, concurrency limit (0 = none), lease ms,
+#          rate in tokens/s (0 = none), burst, reservation horizon ms
+#
+# Returns 0 when granted and -1 when the concurrency limit is reached.
+# With no token left, the caller reserves the next free one instead: the
+# bucket goes into debt by one token and the ms until that token is due
+# are returned, so N waiting callers get ETAs 1/rate apart rather than all
+# polling for the same token. -2 means the next free token is beyond the
+# horizon; nothing is reserved then. Uses the Redis clock so workers with
+# skewed clocks share one bucket correctly.
+_ACQUIRE = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local member = ARGV[1]
+local limit = tonumber(ARGV[2])
+local lease = tonumber(ARGV[3])
+local rate = tonumber(ARGV[4])
+local burst = tonumber(ARGV[5])
+local horizon = tonumber(ARGV[6])
+
+if limit > 0 then
+    redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now)
+    if not redis.call('ZSCORE', KEYS[1], member) and redis.call('ZCARD', KEYS[1]) >= limit then
+        return -1
+    end
+end
+
+if rate > 0 then
+    local b = redis.call('HMGET', KEYS[2], 'tokens', 'ts')
+    local tokens = tonumber(b[1]) or burst
+    local ts = tonumber(b[2]) or now
+    tokens = math.min(burst, tokens + (now - ts) * rate / 1000)
+    local due = 0
+    if tokens < 1 then
+        due = math.ceil((1 - tokens) * 1000 / rate)
+        if horizon > 0 and due > horizon then
+            return -2
+        end
+    end
+    redis.call('HSET', KEYS[2], 'tokens', tokens - 1, 'ts', now)
+    redis.call('PEXPIRE', KEYS[2], math.ceil((burst - tokens + 1) * 1000 / rate) + 1000)
+    if due > 0 then
+        return due
+    end
+end
+
+if limit > 0 then
+    redis.call('ZADD', KEYS[1], now + lease, member)
+    redis.call('PEXPIRE', KEYS[1], lease)
+end
+return 0
+"""
+
+# Take one token from each of several buckets, all or nothing.
+#
+# KEYS     HASH token buckets {tokens, ts}
+# ARGV     rate in tokens/s and burst, per key
+#
+# Returns {0, 0} when granted, else {ms until the scarcest bucket has a
+# token, its 1-based index}; nothing is taken from any bucket then.
+_TAKE = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local levels = {}
+local wait, which = 0, 0
+for i, key in ipairs(KEYS) do
+    local rate = tonumber(ARGV[2 * i - 1])
+    local burst = tonumber(ARGV[2 * i])
+    local b = redis.call('HMGET', key, 'tokens', 'ts')
+    local tokens = tonumber(b[1]) or burst
+    local ts = tonumber(b[2]) or now
+    tokens = math.min(burst, tokens + (now - ts) * rate / 1000)
+    levels[i] = tokens
+    if tokens < 1 then
+        local ms = math.ceil((1 - tokens) * 1000 / rate)
+        if ms > wait then wait, which = ms, i end
+    end
+end
+if which > 0 then
+    return {wait, which}
+end
+for i, key in ipairs(KEYS) do
+    local rate = tonumber(ARGV[2 * i - 1])
+    local burst = tonumber(ARGV[2 * i])
+    redis.call('HSET', key, 'tokens', levels[i] - 1, 'ts', now)
+    redis.call('PEXPIRE', key, math.ceil(burst * 1000 / rate) + 1000)
+end
+return {0, 0}
+"""
+
+CONCURRENCY_FULL = -1
+BACKLOG_FULL = -2
+
+def acquire(lease_key: str, bucket_key: str, member: str, limit: int = 0, lease_s: float = 0,
+            rate: float = 0, burst: int = 1, horizon_s: float = 0) -> int:
+    """Take a lease on ``lease_key`` (at most ``limit`` holders) and a token
+    from ``bucket_key`` in one round trip. Returns 0 when granted,
+    ``CONCURRENCY_FULL``, ``BACKLOG_FULL``, or the ms until the token
+    reserved for ``member`` is due (no lease is taken then). Fails open
+    when Redis is unreachable."""
+    try:
+        return int(get_redis().eval(
+            _ACQUIRE, 2, lease_key, bucket_key,
+            member, int(limit or 0), int(lease_s * 1000), float(rate or 0), int(burst or 1),
+            int(horizon_s * 1000),
+        ))
+    except redis.RedisError as e:
+        logger.warning("Rate limiter unavailable, letting %s through: %s", member, e)
+        return 0
+
+def release(lease_key: Optional[str], member: str):
+    if not lease_key:
+        return
+    try:
+        get_redis().zrem(lease_key, member)
+    except redis.RedisError as e:
+        logger.warning("Could not release lease %s on %s: %s", member, lease_key, e)
+
+async def take(buckets: Dict[str, Tuple[float, int]]):
+    """Take a token from every ``key: (rate, burst)`` bucket in one round
+    trip, or from none. Returns None when granted, else ``(wait_ms, key)``
+    for the bucket that is furthest from a token. Buckets with a zero rate
+    are skipped. Fails open when Redis is unreachable."""
+    buckets = {key: limits for key, limits in buckets.items() if limits[0] > 0}
+    if not buckets:
+        return None
+    keys = list(buckets)
+    args = [v for rate, burst in buckets.values() for v in (float(rate), max(1, int(burst)))]
+    try:
+        wait_ms, which = await get_async_redis().eval(_TAKE, len(keys), *keys, *args)
+    except redis.RedisError as e:
+        logger.warning("Rate limiter unavailable, letting %s through: %s", keys[0], e)
+        return None
+    return (int(wait_ms), keys[int(which) - 1]) if which else None
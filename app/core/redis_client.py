@@ -0,0 +1,27 @@
+import asyncio
+import weakref
+import redis
+import redis.asyncio as aioredis
+from .config import settings
+
+# Lazily created so each worker process (after fork) and each API process
+# gets its own connection pool.
+_client = None
+# asyncio connections belong to the loop that opened them. The API has one
+# loop, but a worker may run the async pool's loop alongside sync modules
+# that call asyncio.run, so there is one async client per loop.
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, aioredis.Redis]" = weakref.WeakKeyDictionary()
+
+def get_redis() -> redis.Redis:
+    global _client
+    if _client is None:
+        _client = redis.Redis.from_url(settings.REDIS_URL, decode_responses=True)
+    return _client
+
+def get_async_redis() -> aioredis.Redis:
+    """Client for the running event loop (call from a coroutine)."""
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = _async_clients[loop] = aioredis.Redis.from_url(settings.REDIS_URL, decode_responses=True)
+    return client
@@ -0,0 +1,102 @@
+import hashlib
+import logging
+import secrets
+from typing import Optional
+import redis
+from .config import settings
+from .redis_client import get_async_redis
+
+logger = logging.getLogger(__name__)
+
+# Rotating refresh tokens, one Redis hash per login session ("family"):
+#
+#   refresh:<family>        {email, current: sha256 of the live secret}, TTL
+#   refresh:user:<email>    SET of the user's families, for revoke-all
+#
+# A token is "<family>.<secret>". Each refresh swaps the secret for a new
+# one; presenting a secret that was already rotated away means the token
+# leaked, so the whole family is revoked.
+
+# KEYS[1] family hash; ARGV: presented hash, new hash, ttl.
+# Returns the email on success, 0 on reuse (family revoked), nil if unknown.
+_ROTATE = """
+local current = redis.call('HGET', KEYS[1], 'current')
+if not current then
+    return nil
+end
+if current ~= ARGV[1] then
+    redis.call('DEL', KEYS[1])
+    return 0
+end
+redis.call('HSET', KEYS[1], 'current', ARGV[2])
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+local email = redis.call('HGET', KEYS[1], 'email')
+redis.call('EXPIRE', 'refresh:user:' .. email, ARGV[3])
+return email
+"""
+
+class RefreshTokenReused(Exception):
+    pass
+
+def _hash(secret: str) -> str:
+    return hashlib.sha256(secret.encode()).hexdigest()
+
+def _split(token: str):
+    family, _, secret = token.partition(".")
+    return (family, secret) if family and secret else (None, None)
+
+async def issue(email: str) -> Optional[str]:
+    """Start a new family for ``email``. None when Redis is unavailable, in
+    which case the client just logs in again when its access token expires."""
+    family, secret = secrets.token_urlsafe(12), secrets.token_urlsafe(32)
+    ttl = settings.REFRESH_TOKEN_TTL_S
+    try:
+        pipe = get_async_redis().pipeline(transaction=True)
+        pipe.hset(f"refresh:{family}", mapping={"email": email, "current": _hash(secret)})
+        pipe.expire(f"refresh:{family}", ttl)
+        pipe.sadd(f"refresh:user:{email}", family)
+        pipe.expire(f"refresh:user:{email}", ttl)
+        await pipe.execute()
+    except redis.RedisError as e:
+        logger.warning("Could not issue refresh token: %s", e)
+        return None
+    return f"{family}.{secret}"
+
+async def rotate(token: str):
+    """Returns ``(email, new_token)``, or None for an unknown or expired
+    token. Raises RefreshTokenReused (after revoking the family) when an
+    already-rotated token is presented."""
+    family, secret = _split(token)
+    if family is None:
+        return None
+    new_secret = secrets.token_urlsafe(32)
+    email = await get_async_redis().eval(
+        _ROTATE, 1, f"refresh:{family}", _hash(secret), _hash(new_secret), settings.REFRESH_TOKEN_TTL_S,
+    )
+    if email is None:
+        return None
+    if email == 0:
+        raise RefreshTokenReused()
+    return email, f"{family}.{new_secret}"
+
+async def revoke(token: str):
+    family, _ = _split(token)
+    if family is None:
+        return
+    try:
+        await get_async_redis().delete(f"refresh:{family}")
+    except redis.RedisError as e:
+        logger.warning("Could not revoke refresh token: %s", e)
+
+async def revoke_all(email: str):
+    """Log ``email`` out everywhere (user deleted)."""
+    try:
+        r = get_async_redis()
+        families = await r.smembers(f"refresh:user:{email}")
+        pipe = r.pipeline(transaction=False)
+        for family in families:
+            pipe.delete(f"refresh:{family}")
+        pipe.delete(f"refresh:user:{email}")
+        await pipe.execute()
+    except redis.RedisError as e:
+        logger.warning("Could not revoke refresh tokens of %s: %s", email, e)
@@ -0,0 +1,101 @@
+import logging
+import threading
+import time
+import uuid
+from typing import Dict, Optional
+from celery.concurrency import get_implementation
+from celery.concurrency.thread import TaskPool as ThreadTaskPool
+from sqlalchemy import update
+from sqlmodel import Session
+from app.core.config import settings
+from app.db.database import engine_sync
+from app.models import Run
+
+logger = logging.getLogger(__name__)
+
+class ResultWriter:
+    """Buffers finished-run updates in a worker process and writes them in
+    bulk: one transaction and one executemany UPDATE by primary key per
+    flush, instead of a SELECT + UPDATE transaction per task.
+
+    A flush happens when ``max_batch`` results are pending, when the oldest
+    pending result is ``max_staleness_s`` old (background thread), and on
+    ``close()`` at worker shutdown. Only rows still ``running`` are
+    updated, so a run cancelled or reaped meanwhile keeps that status.
+    """
+
+    def __init__(self, engine, max_batch: int, max_staleness_s: float):
+        self.engine = engine
+        self.max_batch = max_batch
+        self.max_staleness_s = max_staleness_s
+        self._buffer: Dict[uuid.UUID, dict] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="result-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, run_id, **values):
+        run_id = uuid.UUID(str(run_id))
+        with self._lock:
+            self._buffer[run_id] = {"id": run_id, **values}
+            full = len(self._buffer) >= self.max_batch
+        if full:
+            self.flush()
+
+    def flush(self):
+        with self._flush_lock:
+            with self._lock:
+                batch, self._buffer = self._buffer, {}
+            if not batch:
+                return
+            started = time.time()
+            try:
+                with Session(self.engine) as session:
+                    stmt = update(Run).where(Run.status == "running").execution_options(synchronize_session=None)
+                    session.execute(stmt, list(batch.values()))
+                    session.commit()
+                logger.debug("Flushed %d run results in %.3fs", len(batch), time.time() - started)
+            except Exception as e:
+                logger.error("Result flush of %d runs failed, will retry: %s", len(batch), e)
+                with self._lock:
+                    # Keep anything newer that arrived while we were flushing
+                    for run_id, values in batch.items():
+                        self._buffer.setdefault(run_id, values)
+
+    def _run(self):
+        while not self._stop.wait(self.max_staleness_s):
+            self.flush()
+
+    def close(self):
+        self._stop.set()
+        self.flush()
+
+_writer: Optional[ResultWriter] = None
+# Buffering is only safe in a worker whose pool runs tasks on threads. A
+# prefork child is SIGKILLed by the hard time limit and by a cancel
+# (revoke(terminate=True)), taking the results it buffered for runs that
+# were already acknowledged with it; the reaper would then fail runs that
+# succeeded. Thread pools enforce neither, and flush on warm shutdown.
+_thread_pool = False
+
+def use_worker_pool(pool_cls):
+    """Called once per worker with its pool (``-P``), before any fork."""
+    global _thread_pool
+    _thread_pool = issubclass(get_implementation(pool_cls), ThreadTaskPool)
+    if settings.RESULT_WRITER_ENABLED and not _thread_pool:
+        logger.warning("RESULT_WRITER_ENABLED needs a thread pool worker (-P threads); writing results directly")
+
+def get_result_writer() -> Optional[ResultWriter]:
+    """The process-wide writer, or None when buffering is disabled or the
+    worker isn't a thread pool. Created lazily, on first use."""
+    global _writer
+    if _writer is None and settings.RESULT_WRITER_ENABLED and _thread_pool:
+        _writer = ResultWriter(engine_sync, settings.RESULT_WRITER_BATCH_SIZE, settings.RESULT_WRITER_MAX_STALENESS_S)
+    return _writer
+
+def close_result_writer():
+    global _writer
+    if _writer is not None:
+        _writer.close()
+        _writer = None
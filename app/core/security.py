@@ -1,3 +1,6 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import jwt
@@ -17,12 +20,47 @@ def verify_password(plain_password, hashed_password):
 def get_password_hash(password):
     return pwd_context.hash(password)
 
+# --- ASYNC HASHING (for the FastAPI event loop) ---
+# bcrypt costs 100+ ms of CPU and releases the GIL, so it runs on a bounded
+# thread pool instead of stalling every other request on the event loop.
+
+class PasswordHasherBusy(Exception):
+    """Every hashing thread is busy and the wait queue is full."""
+
+_hash_pool: Optional[ThreadPoolExecutor] = None
+_pending = 0
+_pending_lock = threading.Lock()
+
+def _get_hash_pool() -> ThreadPoolExecutor:
+    global _hash_pool
+    if _hash_pool is None:
+        _hash_pool = ThreadPoolExecutor(settings.PASSWORD_HASH_THREADS, thread_name_prefix="bcrypt")
+    return _hash_pool
+
+async def _offload(fn, *args):
+    global _pending
+    with _pending_lock:
+        if _pending >= settings.PASSWORD_HASH_THREADS + settings.PASSWORD_HASH_QUEUE:
+            raise PasswordHasherBusy()
+        _pending += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_get_hash_pool(), fn, *args)
+    finally:
+        with _pending_lock:
+            _pending -= 1
+
+async def verify_password_async(plain_password, hashed_password) -> bool:
+    return await _offload(verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password) -> str:
+    return await _offload(get_password_hash, password)
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
     else:
-        expire = datetime.utcnow() + timedelta(minutes=15)
+        expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     
     to_encode.update({"exp": expire})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
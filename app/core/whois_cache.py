@@ -0,0 +1,104 @@
+import json
+import logging
+import time
+import uuid
+from datetime import date, datetime
+from typing import Callable, Optional, Tuple
+import redis
+from .config import settings
+from .redis_client import get_redis, get_async_redis
+
+logger = logging.getLogger(__name__)
+
+STATS_KEY = "whois:cache:stats"
+
+# Delete the lock only if we still own it
+_RELEASE_LOCK = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+class WhoisLookupError(Exception):
+    pass
+
+def _json_default(obj):
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    return str(obj)
+
+class WhoisCache:
+    """Redis-backed WHOIS cache with singleflight coalescing.
+
+    The first worker to miss takes ``whois:lock:<domain>`` and does the
+    upstream lookup; every other worker asking for the same domain meanwhile
+    polls for the result instead of firing its own query. Failures are stored
+    for ``WHOIS_ERROR_TTL_S`` so waiters fail together instead of retrying
+    one after another against a rate-limiting server.
+    """
+
+    def __init__(self, ttl: int):
+        self.ttl = ttl
+
+    def has(self, domain: str) -> bool:
+        """Whether ``lookup`` would answer ``domain`` without an upstream
+        query (a cached result or a cached failure)."""
+        try:
+            return bool(get_redis().exists(f"whois:{domain}", f"whois:err:{domain}"))
+        except redis.RedisError:
+            return False
+
+    def lookup(self, domain: str, fetch: Callable[[str], dict]) -> Tuple[dict, bool]:
+        """Return ``(data, from_cache)`` for ``domain``."""
+        r = get_redis()
+        data_key, lock_key, err_key = f"whois:{domain}", f"whois:lock:{domain}", f"whois:err:{domain}"
+        try:
+            cached, error = r.mget(data_key, err_key)
+        except redis.RedisError as e:
+            logger.warning("WHOIS cache unavailable, querying directly: %s", e)
+            return fetch(domain), False
+
+        token = uuid.uuid4().hex
+        deadline = time.time() + settings.WHOIS_COALESCE_WAIT_S
+        waited = False
+
+        while True:
+            if cached is not None:
+                r.hincrby(STATS_KEY, "coalesced" if waited else "hits", 1)
+                return json.loads(cached), True
+            if error is not None:
+                raise WhoisLookupError(error)
+
+            if r.set(lock_key, token, nx=True, ex=settings.WHOIS_LOCK_TTL_S):
+                r.hincrby(STATS_KEY, "misses", 1)
+                try:
+                    try:
+                        data = fetch(domain)
+                    except Exception as e:
+                        r.set(err_key, str(e), ex=settings.WHOIS_ERROR_TTL_S)
+                        raise
+                    # Publish the result before letting go of the lock so
+                    # nobody slips in and repeats the lookup
+                    r.set(data_key, json.dumps(data, default=_json_default), ex=self.ttl)
+                finally:
+                    r.eval(_RELEASE_LOCK, 1, lock_key, token)
+                return data, False
+
+            if time.time() >= deadline:
+                raise WhoisLookupError(f"Timed out waiting for in-flight WHOIS lookup of {domain}")
+            waited = True
+            time.sleep(settings.WHOIS_COALESCE_POLL_S)
+            cached, error = r.mget(data_key, err_key)
+
+async def shared_stats() -> dict:
+    raw = await get_async_redis().hgetall(STATS_KEY)
+    return {k: int(raw.get(k, 0)) for k in ("hits", "misses", "coalesced")}
+
+_cache: Optional[WhoisCache] = None
+
+def get_whois_cache() -> WhoisCache:
+    global _cache
+    if _cache is None:
+        _cache = WhoisCache(settings.WHOIS_CACHE_TTL_S)
+    return _cache
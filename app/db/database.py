@@ -1,8 +1,9 @@
-from sqlmodel import SQLModel, create_engine
+from sqlmodel import create_engine
 from sqlmodel.ext.asyncio.session import AsyncSession
 from sqlalchemy.ext.asyncio import create_async_engine
 from sqlalchemy.orm import sessionmaker
 from app.core.config import settings
+from app.db import schema
 
 # Async Engine (for FastAPI)
 engine = create_async_engine(settings.DATABASE_URL, echo=False)
@@ -14,14 +15,19 @@ AsyncSessionLocal = sessionmaker(
 # Handles the case where the URL might already be sync
 if "postgresql+asyncpg" in settings.DATABASE_URL:
     SYNC_DATABASE_URL = settings.DATABASE_URL.replace("postgresql+asyncpg", "postgresql")
+elif "sqlite+aiosqlite" in settings.DATABASE_URL:
+    SYNC_DATABASE_URL = settings.DATABASE_URL.replace("sqlite+aiosqlite", "sqlite")
 else:
     SYNC_DATABASE_URL = settings.DATABASE_URL
 
-engine_sync = create_engine(SYNC_DATABASE_URL, echo=False)
+# psycopg2 sends executemany UPDATEs (the worker's bulk result writes) in
+# pages of statements per round trip instead of one round trip per row
+_sync_options = {"executemany_mode": "values_plus_batch"} if SYNC_DATABASE_URL.startswith("postgresql") else {}
+engine_sync = create_engine(SYNC_DATABASE_URL, echo=False, **_sync_options)
 
 async def init_db():
     async with engine.begin() as conn:
-        await conn.run_sync(SQLModel.metadata.create_all)
+        await conn.run_sync(schema.upgrade)
 
 # --- THIS IS THE MISSING FUNCTION CAUSING THE CRASH ---
 async def get_async_session():
@@ -0,0 +1,69 @@
+import logging
+from sqlalchemy import inspect, text
+from sqlalchemy.schema import CreateColumn
+from sqlmodel import SQLModel
+import app.models  # noqa: F401  (registers the tables)
+
+logger = logging.getLogger(__name__)
+
+# create_all only creates tables that are missing; it never changes one
+# that exists. The steps here bring a database created by an older release
+# up to the models, and are safe to run on every start: each one checks
+# the live schema first.
+
+def _add_missing_columns(conn):
+    """Columns added to a model since its table was created (all of them
+    nullable, so existing rows need no value)."""
+    insp = inspect(conn)
+    for table in SQLModel.metadata.sorted_tables:
+        existing = {c["name"] for c in insp.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            if not column.nullable:
+                raise RuntimeError(f"{table.name}.{column.name} is NOT NULL without a default; add it by hand")
+            spec = CreateColumn(column).compile(dialect=conn.dialect)
+            conn.execute(text(f"ALTER TABLE {conn.dialect.identifier_preparer.format_table(table)} ADD COLUMN {spec}"))
+            logger.info("Added column %s.%s", table.name, column.name)
+
+def _create_missing_indexes(conn):
+    # Plain CREATE INDEX: on a large run table this blocks writes to it
+    # while it builds. Create the big ones CONCURRENTLY by hand first (same
+    # names) to avoid that; they are then skipped here.
+    for table in SQLModel.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(conn, checkfirst=True)
+
+def _solve_unique(conn):
+    """One solve per (user, challenge), which ``award_solve``'s ON CONFLICT
+    relies on. Duplicates recorded before the constraint existed would stop
+    it from being added, so all but the earliest of each are deleted."""
+    insp = inspect(conn)
+    if any(c["name"] == "uq_solve_user_challenge" for c in insp.get_unique_constraints("solve")) \
+            or any(i["name"] == "uq_solve_user_challenge" for i in insp.get_indexes("solve")):
+        return
+    deleted = conn.execute(text(
+        'DELETE FROM solve WHERE EXISTS (SELECT 1 FROM solve AS first '
+        'WHERE first.user_id = solve.user_id AND first.challenge_id = solve.challenge_id '
+        'AND (first."timestamp" < solve."timestamp" '
+        'OR (first."timestamp" = solve."timestamp" AND first.id < solve.id)))'
+    )).rowcount
+    if deleted:
+        logger.warning("Deleted %d duplicate solves before adding uq_solve_user_challenge", deleted)
+    if conn.dialect.name == "sqlite":
+        # SQLite can't add a constraint to an existing table; ON CONFLICT
+        # accepts a unique index just the same
+        conn.execute(text("CREATE UNIQUE INDEX uq_solve_user_challenge ON solve (user_id, challenge_id)"))
+    else:
+        conn.execute(text("ALTER TABLE solve ADD CONSTRAINT uq_solve_user_challenge UNIQUE (user_id, challenge_id)"))
+
+def upgrade(conn):
+    """Create missing tables, then upgrade existing ones (sync connection,
+    inside one transaction: ``await conn.run_sync(upgrade)``)."""
+    if conn.dialect.name == "postgresql":
+        # Every API process runs this on start; one at a time
+        conn.execute(text("SELECT pg_advisory_xact_lock(hashtext('ciphereye:schema'))"))
+    SQLModel.metadata.create_all(conn)
+    _add_missing_columns(conn)
+    _create_missing_indexes(conn)
+    _solve_unique(conn)
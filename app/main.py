@@ -1,10 +1,18 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import JSONResponse
 from fastapi.staticfiles import StaticFiles
+from prometheus_client import CONTENT_TYPE_LATEST
 from app.api.routes_osint import router as osint_router
 from app.api.routes_auth import router as auth_router
 from app.api.routes_challenges import router as challenges_router
 from app.db.database import init_db
+from app.modules.registry import registry
+from app.core import metrics, principals
+from app.core.config import settings
+from app.core.security import PasswordHasherBusy
+import hmac
 import os
+import time
 
 os.makedirs("app/static/uploads", exist_ok=True)
 
@@ -16,9 +24,49 @@ app.include_router(osint_router, prefix="/api")
 app.include_router(auth_router, prefix="/auth")
 app.include_router(challenges_router, prefix="/challenges")
 
+@app.exception_handler(PasswordHasherBusy)
+async def password_hasher_busy(request: Request, exc: PasswordHasherBusy):
+    return JSONResponse({"detail": "Too many sign-ins at once, try again shortly"}, status_code=503,
+                        headers={"Retry-After": "1"})
+
+TIMED_PREFIXES = ("/api", "/auth", "/challenges")
+
+@app.middleware("http")
+async def record_latency(request: Request, call_next):
+    started = time.perf_counter()
+    response = await call_next(request)
+    if request.url.path.startswith(TIMED_PREFIXES):
+        # Label by route template (/api/run/{run_id}), not the raw path
+        route = request.scope.get("route")
+        path = route.path if route is not None else "unmatched"
+        metrics.HTTP_LATENCY.labels(request.method, path, response.status_code).observe(time.perf_counter() - started)
+    return response
+
+LOOPBACK = {"127.0.0.1", "::1"}
+
+def metrics_allowed(request: Request) -> bool:
+    if not settings.METRICS_TOKEN:
+        return request.client is not None and request.client.host in LOOPBACK
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    return scheme.lower() == "bearer" and hmac.compare_digest(token.encode(), settings.METRICS_TOKEN.encode())
+
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics(request: Request):
+    if not settings.METRICS_ENABLED:
+        return Response(status_code=404)
+    if not metrics_allowed(request):
+        return Response(status_code=401, headers={"WWW-Authenticate": "Bearer"})
+    return Response(metrics.render(), media_type=CONTENT_TYPE_LATEST)
+
 @app.on_event("startup")
 async def on_startup():
+    registry.load()
+    principals.start_listener()
     try:
         await init_db()
     except Exception as e:
         print(f"DB init error: {e}")
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    await principals.stop_listener()
@@ -1,7 +1,8 @@
 import asyncio
 import sys
 from sqlmodel import select
-from app.db.database import AsyncSessionLocal
+from app.db.database import AsyncSessionLocal, init_db
+from app.core import leaderboard, principals
 from app.models import User
 
 async def promote_user(email):
@@ -16,12 +17,31 @@ async def promote_user(email):
         user.is_admin = True
         session.add(user)
         await session.commit()
+        await principals.invalidate(email)
+        await leaderboard.remove(email)
         print(f"✅ SUCCESS: {email} is now an ADMIN.")
 
+async def rebuild_leaderboard():
+    async with AsyncSessionLocal() as session:
+        await leaderboard.rebuild(session)
+    print("✅ Leaderboard rebuilt from the database.")
+
+async def upgrade_db():
+    await init_db()
+    print("✅ Database schema is up to date.")
+
 if __name__ == "__main__":
     if len(sys.argv) < 2:
-        print("Usage: python manage.py <email>")
+        print("Usage: python manage.py <email> | --rebuild-leaderboard | --upgrade-db")
         sys.exit(1)
     
+    if sys.argv[1] == "--rebuild-leaderboard":
+        asyncio.run(rebuild_leaderboard())
+        sys.exit(0)
+
+    if sys.argv[1] == "--upgrade-db":
+        asyncio.run(upgrade_db())
+        sys.exit(0)
+
     target_email = sys.argv[1]
     asyncio.run(promote_user(target_email))
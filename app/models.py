@@ -2,24 +2,54 @@ from typing import Optional, Dict
 from sqlmodel import SQLModel, Field, Relationship
 from datetime import datetime
 import uuid
-from sqlalchemy import Column, JSON
+from sqlalchemy import Column, JSON, Index, UniqueConstraint, text
 
 class Run(SQLModel, table=True):
+    __table_args__ = (
+        # Memoization lookup: latest successful run for a fingerprint
+        Index("ix_run_fingerprint_fresh", "fingerprint", "finished_at",
+              postgresql_where=text("status = 'success'")),
+        # Run history: keyset pagination over (created_at, id), per filter
+        Index("ix_run_created", "created_at", "id"),
+        Index("ix_run_module_created", "module", "created_at", "id"),
+        Index("ix_run_status_created", "status", "created_at", "id"),
+        # text_pattern_ops lets LIKE 'prefix%' use the index under any collation
+        Index("ix_run_target_created", "target", "created_at", "id",
+              postgresql_ops={"target": "text_pattern_ops"}),
+        # Reaper: running runs past their deadline
+        Index("ix_run_running_deadline", "deadline_at",
+              postgresql_where=text("status = 'running'")),
+    )
+
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
     module: str
     target: str
-    status: str = "queued"
+    status: str = "queued"  # queued, running, success, failed, cancelled
+    batch_id: Optional[uuid.UUID] = Field(default=None, index=True)
+    fingerprint: Optional[str] = None  # sha256 of module + target + options
     result: Optional[Dict] = Field(default=None, sa_column=Column(JSON))
     created_at: datetime = Field(default_factory=datetime.utcnow)
+    deferred_until: Optional[datetime] = None  # set each time the scheduler re-queues it
+    started_at: Optional[datetime] = None
+    deadline_at: Optional[datetime] = None  # started_at + hard time limit
     finished_at: Optional[datetime] = None
 
+class RunItem(SQLModel, table=True):
+    """Rows a long run streams out as it goes (e.g. each subdomain found),
+    appended by ``report_progress`` instead of rewritten into Run.result."""
+    __table_args__ = (Index("ix_runitem_run_id", "run_id", "id"),)
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    run_id: uuid.UUID = Field(foreign_key="run.id")
+    data: Dict = Field(sa_column=Column(JSON, nullable=False))
+
 class User(SQLModel, table=True):
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
     email: str = Field(unique=True, index=True)
     hashed_password: str
     is_active: bool = True
     is_admin: bool = Field(default=False)
-    score: int = Field(default=0)  # NEW: Track Score
+    score: int = Field(default=0, index=True)  # NEW: Track Score
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
 class Challenge(SQLModel, table=True):
@@ -34,6 +64,10 @@ class Challenge(SQLModel, table=True):
 
 # NEW TABLE: Tracks who solved what
 class Solve(SQLModel, table=True):
+    # One solve per player and challenge; verification relies on it to
+    # award points exactly once under concurrent submits
+    __table_args__ = (UniqueConstraint("user_id", "challenge_id", name="uq_solve_user_challenge"),)
+
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
     user_id: uuid.UUID = Field(foreign_key="user.id")
     challenge_id: uuid.UUID = Field(foreign_key="challenge.id")
@@ -1,10 +1,52 @@
+import asyncio
+import functools
 from abc import ABC, abstractmethod
-from typing import Any, Dict
+from typing import Any, Dict, Optional
+from app.core.async_pool import get_sync_threads
+from app.core.domains import registrable_domain
 
 class OSINTModule(ABC):
     name: str = "base"
     description: str = "Base OSINT module"
+    # Accepted run options: {"option": {"type": "string|integer|number|boolean|array", "description": ...}}
+    options_schema: Dict[str, Dict[str, Any]] = {}
+    # Scheduling hints (overridable per deployment through MODULE_LIMITS):
+    # runs of this module in flight across all workers, and requests per
+    # second / burst allowed against any single upstream (see upstream_key)
+    max_concurrency: Optional[int] = None
+    rate_limit: Optional[float] = None
+    rate_burst: int = 1
+    # Seconds before the run is interrupted (soft) and its worker process is
+    # killed (hard); None uses RUN_SOFT_TIME_LIMIT_S / RUN_TIME_LIMIT_S
+    soft_time_limit: Optional[int] = None
+    time_limit: Optional[int] = None
+    # Long-running modules set this to receive a ``progress`` callback in
+    # their kwargs. ``progress(partial, items)`` stores the partial result on
+    # the Run row and appends ``items`` (new rows only) as RunItems, so the
+    # module can drop them once reported
+    supports_progress: bool = False
 
     @abstractmethod
     def run(self, target: str, **kwargs) -> Dict[str, Any]:
         raise NotImplementedError
+
+    async def arun(self, target: str, **kwargs) -> Dict[str, Any]:
+        """Async entry point. I/O-bound modules override this with a native
+        implementation; by default the sync ``run`` goes to a thread pool."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(get_sync_threads(), functools.partial(self.run, target, **kwargs))
+
+    @property
+    def is_async(self) -> bool:
+        return type(self).arun is not OSINTModule.arun
+
+    def served_from_cache(self, target: str, options: Dict[str, Any]) -> bool:
+        """Cheap pre-check: True when the run will be answered from a cache
+        without touching the upstream. Such runs skip the scheduler's
+        concurrency and rate limits, which exist for the upstream's sake."""
+        return False
+
+    def upstream_key(self, target: str, options: Dict[str, Any]) -> str:
+        """Identifies the upstream server a run will hit, for rate limiting.
+        Defaults to the target's registrable domain."""
+        return registrable_domain(target)
@@ -1,34 +1,173 @@
 from .base import OSINTModule
+from app.core.config import settings
+from app.core.dns_cache import get_dns_cache
+import asyncio
+import dns.asyncresolver
+import dns.exception
+import dns.rdatatype
 import dns.resolver
 import time
 
+# Record types to look for
+RECORD_TYPES = ["A", "AAAA", "MX", "NS", "TXT"]
+
+# Only these errors are cacheable (RFC 2308 negative caching)
+NEGATIVE_ERRORS = ("nxdomain", "no_answer")
+
+# One resolver per worker process, created lazily so it is built after fork
+_resolver = None
+_async_resolver = None
+
+def _configure(resolver):
+    if settings.DNS_NAMESERVERS:
+        resolver.nameservers = [ns.strip() for ns in settings.DNS_NAMESERVERS.split(",") if ns.strip()]
+    resolver.port = settings.DNS_PORT
+    resolver.timeout = settings.DNS_QUERY_TIMEOUT_S
+    resolver.lifetime = settings.DNS_QUERY_TIMEOUT_S
+    return resolver
+
+def get_resolver():
+    global _resolver
+    if _resolver is None:
+        _resolver = _configure(dns.resolver.Resolver())
+    return _resolver
+
+def get_async_resolver():
+    global _async_resolver
+    if _async_resolver is None:
+        _async_resolver = _configure(dns.asyncresolver.Resolver())
+    return _async_resolver
+
+def classify_error(exc: Exception) -> str:
+    if isinstance(exc, dns.resolver.NXDOMAIN):
+        return "nxdomain"
+    if isinstance(exc, dns.resolver.NoAnswer):
+        return "no_answer"
+    if isinstance(exc, (dns.exception.Timeout, asyncio.TimeoutError)):
+        return "timeout"
+    if isinstance(exc, dns.resolver.NoNameservers):
+        return "no_nameservers"
+    return "error"
+
+def negative_ttl(exc: Exception) -> int:
+    """TTL for a negative answer: the SOA minimum from the authority section,
+    falling back to DNS_NEGATIVE_TTL_S when the response carries no SOA."""
+    try:
+        if isinstance(exc, dns.resolver.NXDOMAIN):
+            responses = list(exc.responses().values())
+        else:
+            responses = [exc.response()]
+        for response in responses:
+            for rrset in response.authority:
+                if rrset.rdtype == dns.rdatatype.SOA:
+                    return min(rrset.ttl, rrset[0].minimum)
+    except Exception:
+        pass
+    return settings.DNS_NEGATIVE_TTL_S
+
+def to_outcome(answer) -> dict:
+    """Turn an Answer or a resolver exception into a cacheable outcome."""
+    if isinstance(answer, Exception):
+        error = classify_error(answer)
+        return {
+            "records": [],
+            "error": error,
+            "message": str(answer) or type(answer).__name__,
+            "ttl": negative_ttl(answer) if error in NEGATIVE_ERRORS else 0,
+        }
+    return {"records": [str(r) for r in answer], "error": None, "ttl": answer.rrset.ttl}
+
 class DNSModule(OSINTModule):
     name = "dns"
-    description = "Perform DNS A, AAAA, and MX record lookups"
+    description = "Perform DNS A, AAAA, MX, NS and TXT record lookups"
+    options_schema = {
+        "record_types": {"type": "array", "description": f"Record types to query (default {', '.join(RECORD_TYPES)})"},
+        "timeout": {"type": "number", "description": "Per-query timeout in seconds"},
+        "concurrent": {"type": "boolean", "description": "Query all record types at once"},
+        "use_cache": {"type": "boolean", "description": "Serve answers from the shared DNS cache"},
+    }
+    # Upstream is the zone's authoritative servers, keyed by registrable domain
+    rate_limit = 20.0
+    rate_burst = 20
+
+    def served_from_cache(self, target: str, options: dict) -> bool:
+        cache, record_types, _ = self._options(options)
+        return cache is not None and cache.has_all(target, record_types)
 
     def run(self, target: str, **kwargs):
         started = time.time()
-        results = {}
-        
-        # Record types to look for
-        record_types = ["A", "AAAA", "MX", "NS", "TXT"]
-        
+        cache, record_types, timeout = self._options(kwargs)
+        cached = cache.get_many(target, record_types) if cache else {}
+        pending = [rtype for rtype in record_types if rtype not in cached]
+        if not pending:
+            fresh = {}
+        elif kwargs.get("concurrent", settings.DNS_CONCURRENT):
+            fresh = asyncio.run(self.resolve_all(target, pending, timeout))
+        else:
+            fresh = self.resolve_sequential(target, pending, timeout)
+        if cache:
+            cache.put_many(target, self._cacheable(fresh))
+        return self._result(target, record_types, cached, fresh, started)
+
+    async def arun(self, target: str, **kwargs):
+        # Runs on the worker's shared event loop: the cache goes through the
+        # asyncio Redis client so it never stalls the other lookups
+        started = time.time()
+        cache, record_types, timeout = self._options(kwargs)
+        cached = await cache.aget_many(target, record_types) if cache else {}
+        pending = [rtype for rtype in record_types if rtype not in cached]
+        fresh = await self.resolve_all(target, pending, timeout) if pending else {}
+        if cache:
+            await cache.aput_many(target, self._cacheable(fresh))
+        return self._result(target, record_types, cached, fresh, started)
+
+    def _options(self, kwargs: dict):
+        cache = get_dns_cache() if kwargs.get("use_cache", settings.DNS_CACHE_ENABLED) else None
+        record_types = kwargs.get("record_types") or RECORD_TYPES
+        timeout = float(kwargs.get("timeout", settings.DNS_QUERY_TIMEOUT_S))
+        return cache, record_types, timeout
+
+    def _cacheable(self, fresh: dict) -> dict:
+        return {rtype: o for rtype, o in fresh.items() if o["ttl"] > 0}
+
+    def _result(self, target, record_types, cached, fresh, started):
+        results, errors, sources = {}, {}, {}
         for rtype in record_types:
-            try:
-                answers = dns.resolver.resolve(target, rtype)
-                # Convert answers to string list
-                results[rtype] = [str(r) for r in answers]
-            except Exception:
-                # If no record found or error, skip
-                results[rtype] = []
+            outcome = cached.get(rtype) or fresh[rtype]
+            sources[rtype] = "cache" if rtype in cached else "upstream"
+            results[rtype] = outcome["records"]
+            if outcome["error"]:
+                errors[rtype] = {"type": outcome["error"], "message": outcome.get("message") or outcome["error"]}
 
         return {
             "module": self.name,
             "target": target,
             "success": True,
             "duration_s": round(time.time() - started, 3),
-            "data": results
+            "data": results,
+            "errors": errors,
+            "source": sources,
         }
 
+    def resolve_sequential(self, target: str, record_types, timeout: float):
+        resolver = get_resolver()
+        outcomes = {}
+        for rtype in record_types:
+            try:
+                outcomes[rtype] = to_outcome(resolver.resolve(target, rtype, lifetime=timeout))
+            except Exception as e:
+                outcomes[rtype] = to_outcome(e)
+        return outcomes
+
+    async def resolve_all(self, target: str, record_types, timeout: float):
+        """Query every record type at once; each query has its own timeout."""
+        resolver = get_async_resolver()
+
+        async def query(rtype):
+            return await asyncio.wait_for(resolver.resolve(target, rtype, lifetime=timeout), timeout)
+
+        answers = await asyncio.gather(*(query(rtype) for rtype in record_types), return_exceptions=True)
+        return {rtype: to_outcome(answer) for rtype, answer in zip(record_types, answers)}
+
 def get_module():
     return DNSModule()
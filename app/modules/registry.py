@@ -0,0 +1,111 @@
+import importlib
+import logging
+import pkgutil
+import threading
+from dataclasses import dataclass
+from importlib.metadata import entry_points
+from typing import Dict, List, Type
+from .base import OSINTModule
+
+logger = logging.getLogger(__name__)
+
+ENTRY_POINT_GROUP = "ciphereye.modules"
+
+_TYPES = {
+    "string": str,
+    "integer": int,
+    "number": (int, float),
+    "boolean": bool,
+    "array": list,
+}
+
+@dataclass
+class ModuleSpec:
+    key: str
+    cls: Type[OSINTModule]
+    instance: OSINTModule
+
+    def describe(self) -> dict:
+        return {
+            "key": self.key,
+            "name": self.cls.name,
+            "description": self.cls.description,
+            "options": self.cls.options_schema,
+            "max_concurrency": self.cls.max_concurrency,
+            "rate_limit": self.cls.rate_limit,
+            "rate_burst": self.cls.rate_burst,
+        }
+
+    def validate_options(self, options: dict) -> List[str]:
+        """Return a list of problems with ``options`` (empty when valid)."""
+        problems = []
+        schema = self.cls.options_schema
+        for key, value in options.items():
+            if key not in schema:
+                problems.append(f"unknown option '{key}'")
+                continue
+            expected = _TYPES.get(schema[key].get("type"))
+            # bool is an int subclass; don't let True pass as a number
+            if expected and (not isinstance(value, expected) or
+                             (isinstance(value, bool) and expected is not bool)):
+                problems.append(f"option '{key}' must be {schema[key]['type']}")
+        return problems
+
+class ModuleRegistry:
+    """Module classes and one shared instance of each, built once per process.
+
+    Built-in modules are the ``*_module`` files in ``app.modules``; third-party
+    packages add more through the ``ciphereye.modules`` entry point group,
+    pointing at either an ``OSINTModule`` subclass or a ``get_module`` factory.
+    """
+
+    def __init__(self):
+        self._specs: Dict[str, ModuleSpec] = {}
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def load(self):
+        with self._lock:
+            if self._loaded:
+                return
+            pkg = importlib.import_module("app.modules")
+            for _, mod_name, _ in pkgutil.iter_modules(pkg.__path__):
+                if mod_name.endswith("_module"):
+                    mod = importlib.import_module(f"app.modules.{mod_name}")
+                    self._add(mod_name, mod.get_module())
+            for ep in entry_points(group=ENTRY_POINT_GROUP):
+                try:
+                    self._add(ep.name, ep.load()())
+                except Exception as e:
+                    logger.error("Failed to load module plugin %s: %s", ep.name, e)
+            self._loaded = True
+
+    def _add(self, key: str, instance: OSINTModule):
+        if not key.endswith("_module"):
+            key = f"{key}_module"
+        self._specs[key] = ModuleSpec(key=key, cls=type(instance), instance=instance)
+
+    def get(self, name: str) -> ModuleSpec:
+        """Look up by key ('dns_module') or short name ('dns')."""
+        self.load()
+        key = name if name.endswith("_module") else f"{name}_module"
+        if key not in self._specs:
+            raise KeyError(name)
+        return self._specs[key]
+
+    def names(self) -> List[str]:
+        self.load()
+        return list(self._specs)
+
+    def __contains__(self, name: str) -> bool:
+        try:
+            self.get(name)
+            return True
+        except KeyError:
+            return False
+
+    def describe(self) -> List[dict]:
+        self.load()
+        return [spec.describe() for spec in self._specs.values()]
+
+registry = ModuleRegistry()
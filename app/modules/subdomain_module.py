@@ -0,0 +1,167 @@
+from .base import OSINTModule
+from .dns_module import get_async_resolver, classify_error
+from app.core.config import settings
+from app.core.domains import normalize_host
+from app.core.redis_client import get_async_redis
+import asyncio
+import json
+import os
+import re
+import time
+import uuid
+import redis
+
+BUNDLED_DIR = os.path.join(os.path.dirname(__file__), "wordlists")
+DEFAULT_WORDLIST = "subdomains-top"
+# Hand hosts to the progress sink at least this often, whatever the interval
+FLUSH_EVERY_HOSTS = 500
+WORDLIST_ID = re.compile(r"^[A-Za-z0-9_-]+$")
+
+def wordlist_path(name: str) -> str:
+    """Bundled list (``app/modules/wordlists/<name>.txt``) or an uploaded
+    one (``WORDLIST_DIR/<name>.txt``)."""
+    if not WORDLIST_ID.match(name):
+        raise ValueError(f"Invalid wordlist name '{name}'")
+    for folder in (BUNDLED_DIR, settings.WORDLIST_DIR):
+        path = os.path.join(folder, f"{name}.txt")
+        if os.path.isfile(path):
+            return path
+    raise ValueError(f"Wordlist '{name}' not found")
+
+def iter_labels(path: str, limit: int = 0):
+    """Stream candidate labels from a wordlist without loading it whole."""
+    seen = 0
+    with open(path, encoding="utf-8", errors="ignore") as f:
+        for line in f:
+            label = line.strip().lower().strip(".")
+            if not label or label.startswith("#"):
+                continue
+            yield label
+            seen += 1
+            if limit and seen >= limit:
+                return
+
+class SubdomainModule(OSINTModule):
+    name = "subdomain"
+    description = "Brute-force subdomains from a wordlist with wildcard DNS filtering"
+    options_schema = {
+        "wordlist": {"type": "string", "description": f"Bundled or uploaded wordlist (default {DEFAULT_WORDLIST})"},
+        "concurrency": {"type": "integer", "description": "Queries in flight at once"},
+        "timeout": {"type": "number", "description": "Per-query timeout in seconds"},
+        "max_candidates": {"type": "integer", "description": "Stop after this many wordlist entries (0 = all)"},
+    }
+    supports_progress = True
+    # Enumerations are long and heavy: keep only a few going at once
+    max_concurrency = 4
+    soft_time_limit = 3600
+    time_limit = 3660
+
+    def run(self, target: str, **kwargs):
+        return asyncio.run(self.arun(target, **kwargs))
+
+    async def arun(self, target: str, **kwargs):
+        started = time.time()
+        zone = normalize_host(target)
+        progress = kwargs.get("progress")
+        concurrency = max(1, int(kwargs.get("concurrency", settings.SUBDOMAIN_CONCURRENCY)))
+        timeout = float(kwargs.get("timeout", settings.DNS_QUERY_TIMEOUT_S))
+        try:
+            path = wordlist_path(kwargs.get("wordlist") or DEFAULT_WORDLIST)
+        except ValueError as e:
+            return {"module": self.name, "target": target, "success": False,
+                    "duration_s": round(time.time() - started, 3), "error": str(e)}
+
+        resolver = get_async_resolver()
+        wildcard = await self.wildcard_addresses(zone, resolver, timeout)
+
+        # With a progress sink, hosts are reported as RunItems and dropped
+        # from memory; `found` holds only those not reported yet. Without
+        # one (direct calls) they are all returned in data["hosts"]
+        found, errors = [], {}
+        state = {"checked": 0, "found": 0, "wildcard_filtered": 0, "last_report": time.time()}
+        labels = iter_labels(path, int(kwargs.get("max_candidates", 0)))
+        loop = asyncio.get_running_loop()
+
+        def snapshot(partial: bool):
+            data = {
+                "found": state["found"],
+                "checked": state["checked"],
+                "wildcard": sorted(wildcard),
+                "wildcard_filtered": state["wildcard_filtered"],
+                "errors": dict(errors),
+            }
+            if not progress:
+                data["hosts"] = found
+            return {
+                "module": self.name,
+                "target": target,
+                "success": True,
+                "partial": partial,
+                "duration_s": round(time.time() - started, 3),
+                "data": data,
+            }
+
+        async def flush():
+            nonlocal found
+            # Swap before awaiting: workers keep appending to the new list
+            # while the executor thread owns the old one
+            state["last_report"] = time.time()
+            batch, found = found, []
+            await loop.run_in_executor(None, progress, snapshot(True), batch)
+
+        async def worker():
+            # Workers share one label iterator, so at most `concurrency`
+            # candidates exist at any time whatever the wordlist size
+            for label in labels:
+                host = f"{label}.{zone}"
+                try:
+                    answer = await asyncio.wait_for(resolver.resolve(host, "A", lifetime=timeout), timeout)
+                    addresses = sorted(str(r) for r in answer)
+                    if wildcard and set(addresses) <= wildcard:
+                        state["wildcard_filtered"] += 1
+                    else:
+                        found.append({"host": host, "addresses": addresses})
+                        state["found"] += 1
+                except Exception as e:
+                    kind = classify_error(e)
+                    if kind not in ("nxdomain", "no_answer"):
+                        errors[kind] = errors.get(kind, 0) + 1
+                state["checked"] += 1
+
+                if progress and (len(found) >= FLUSH_EVERY_HOSTS
+                                 or time.time() - state["last_report"] >= settings.SUBDOMAIN_PROGRESS_EVERY_S):
+                    await flush()
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        if progress and found:
+            await flush()
+        return snapshot(False)
+
+    async def wildcard_addresses(self, zone: str, resolver, timeout: float) -> set:
+        """Addresses that random labels under ``zone`` resolve to. Probed once
+        per zone and shared through Redis for SUBDOMAIN_WILDCARD_TTL_S."""
+        key = f"wildcard:{zone}"
+        try:
+            cached = await get_async_redis().get(key)
+            if cached is not None:
+                return set(json.loads(cached))
+        except redis.RedisError:
+            pass
+
+        addresses = set()
+        for _ in range(2):
+            probe = f"{uuid.uuid4().hex[:16]}.{zone}"
+            try:
+                answer = await asyncio.wait_for(resolver.resolve(probe, "A", lifetime=timeout), timeout)
+                addresses.update(str(r) for r in answer)
+            except Exception:
+                pass
+
+        try:
+            await get_async_redis().set(key, json.dumps(sorted(addresses)), ex=settings.SUBDOMAIN_WILDCARD_TTL_S)
+        except redis.RedisError:
+            pass
+        return addresses
+
+def get_module():
+    return SubdomainModule()
@@ -1,20 +1,46 @@
 from .base import OSINTModule
+from app.core.config import settings
+from app.core.domains import registrable_domain, public_suffix
+from app.core.whois_cache import get_whois_cache
+from whois.parser import WhoisEntry
+import socket
 import whois
 import time
 
 class WhoisModule(OSINTModule):
     name = "whois"
     description = "Perform WHOIS lookup on domain"
+    options_schema = {
+        "use_cache": {"type": "boolean", "description": "Serve results from the shared WHOIS cache"},
+    }
+    max_concurrency = 20
+    rate_limit = 1.0
+    rate_burst = 5
+
+    def upstream_key(self, target: str, options: dict) -> str:
+        # One WHOIS server per TLD (whois.verisign-grs.com for .com, ...)
+        suffix = public_suffix(target) or registrable_domain(target)
+        return "tld:" + suffix.rsplit(".", 1)[-1]
+
+    def served_from_cache(self, target: str, options: dict) -> bool:
+        if not options.get("use_cache", settings.WHOIS_CACHE_ENABLED):
+            return False
+        return get_whois_cache().has(registrable_domain(target))
 
     def run(self, target: str, **kwargs):
         started = time.time()
+        domain = registrable_domain(target)
         try:
-            data = whois.whois(target)
-            out = dict(data) if data else {}
+            if kwargs.get("use_cache", settings.WHOIS_CACHE_ENABLED):
+                out, cached = get_whois_cache().lookup(domain, self.query)
+            else:
+                out, cached = self.query(domain), False
             return {
                 "module": self.name,
                 "target": target,
+                "domain": domain,
                 "success": True,
+                "cached": cached,
                 "duration_s": round(time.time() - started, 3),
                 "data": out
             }
@@ -22,10 +48,32 @@ class WhoisModule(OSINTModule):
             return {
                 "module": self.name,
                 "target": target,
+                "domain": domain,
                 "success": False,
                 "duration_s": round(time.time() - started, 3),
                 "error": str(e)
             }
 
+    def query(self, domain: str) -> dict:
+        if settings.WHOIS_SERVER:
+            data = WhoisEntry.load(domain, self.query_server(domain, settings.WHOIS_SERVER))
+        else:
+            data = whois.whois(domain)
+        return dict(data) if data else {}
+
+    def query_server(self, domain: str, server: str) -> str:
+        """Raw WHOIS answer from one fixed server (a local mirror, or the
+        benchmark stub)."""
+        host, _, port = server.partition(":")
+        with socket.create_connection((host, int(port or 43)), timeout=settings.WHOIS_QUERY_TIMEOUT_S) as s:
+            s.sendall(domain.encode("idna") + b"\r\n")
+            chunks = []
+            while True:
+                chunk = s.recv(4096)
+                if not chunk:
+                    break
+                chunks.append(chunk)
+        return b"".join(chunks).decode("utf-8", "replace")
+
 def get_module():
     return WhoisModule()
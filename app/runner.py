@@ -1,24 +1,53 @@
-import importlib
-import pkgutil
+import asyncio
+import functools
 import uuid
 import json
-from datetime import datetime
-from sqlmodel import Session
-from app.core.celery_app import celery_app
-from app.modules import base as base_mod
-from app.db.database import engine_sync
-from app.models import Run
+import hashlib
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
+from datetime import datetime, timedelta
+from typing import Optional
+from sqlmodel import Session, select
+from sqlalchemy import func, insert, update
+from celery import group
+from celery.exceptions import SoftTimeLimitExceeded
+from celery.signals import worker_init, worker_process_init, worker_process_shutdown, worker_shutdown
+from app.core.celery_app import celery_app, queue_for
+from app.core.config import settings
+from app.core.events import is_final, publish_run_event, record_queued
+from app.core.result_writer import get_result_writer, close_result_writer, use_worker_pool
+from app.core.async_pool import get_async_pool, stop_async_pool
+from app.core import metrics
+from app.modules.registry import registry
+from app import scheduler
+from app.db.database import engine_sync, AsyncSessionLocal
+from app.models import Run, RunItem
 
 def list_modules():
-    pkg = importlib.import_module("app.modules")
-    return [name for _, name, _ in pkgutil.iter_modules(pkg.__path__) if name != "base"]
+    return registry.names()
+
+def module_key(name: str) -> str:
+    """'dns_module' and 'dns' both refer to the dns module."""
+    return name[:-7] if name.endswith("_module") else name
 
 def load_module(name: str):
-    mod_name = name
-    if mod_name.endswith("_module"):
-        mod_name = mod_name[:-7]
-    mod = importlib.import_module(f"app.modules.{mod_name}_module")
-    return mod.get_module()
+    """Shared module instance from the registry (built once per process)."""
+    return registry.get(name).instance
+
+def run_fingerprint(name: str, target: str, options: dict) -> str:
+    """Identity of a run for memoization: module, normalized target and
+    canonicalized options."""
+    canonical = json.dumps(
+        [module_key(name), target.strip().lower().rstrip("."), options],
+        sort_keys=True, separators=(",", ":"), default=str,
+    )
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+def freshness_window(name: str, max_age_s: Optional[int] = None) -> Optional[int]:
+    """Per-request window wins; otherwise the per-module RUN_FRESHNESS_S."""
+    if max_age_s is not None:
+        return max_age_s
+    return settings.RUN_FRESHNESS_S.get(module_key(name))
 
 def serialize_datetime(obj):
     """Recursively convert datetime objects to ISO format strings"""
@@ -30,41 +59,316 @@ def serialize_datetime(obj):
         return [serialize_datetime(item) for item in obj]
     return obj
 
-@celery_app.task(name="run_module_task")
-def run_module_task(run_id: str, name: str, target: str, options: dict):
-    # 1. Load module
-    module = load_module(name)
+def report_progress(run_id: str, batch_id: Optional[str], partial: dict, items: list = ()):
+    """Store a module's partial result on its Run row straight away (not
+    through the buffered writer), append ``items`` as RunItems in the same
+    transaction and announce it, without the payload."""
+    with Session(engine_sync) as session:
+        updated = session.execute(
+            update(Run).where(Run.id == uuid.UUID(run_id), Run.status == "running")
+            .values(result=serialize_datetime(partial))
+        ).rowcount
+        if updated and items:
+            session.execute(insert(RunItem), [{"run_id": uuid.UUID(run_id), "data": serialize_datetime(item)} for item in items])
+        session.commit()
+    if not updated:
+        return
+    data = partial.get("data", {})
+    summary = {k: v if not isinstance(v, list) else len(v) for k, v in data.items() if not isinstance(v, dict)}
+    publish_run_event(run_id, "running", batch_id, progress=summary)
+
+@worker_init.connect
+def start_metrics_exporter(**kwargs):
+    metrics.start_worker_exporter()
+
+@worker_init.connect
+def configure_result_writer(sender=None, **kwargs):
+    use_worker_pool(sender.pool_cls)
+
+@worker_process_init.connect
+def preload_modules(**kwargs):
+    registry.load()
+
+@worker_process_shutdown.connect
+@worker_shutdown.connect
+def flush_results(**kwargs):
+    close_result_writer()
+    stop_async_pool()
+
+def defer_run(run_id: str, wait: float) -> bool:
+    """Note when a deferred run is due back, so the reaper can tell it from
+    one whose message was lost. False when it is no longer queued."""
+    with Session(engine_sync) as session:
+        updated = session.execute(
+            update(Run).where(Run.id == uuid.UUID(run_id), Run.status == "queued")
+            .values(deferred_until=datetime.utcnow() + timedelta(seconds=wait))
+        ).rowcount
+        session.commit()
+    return bool(updated)
+
+def give_up_run(run_id: str, batch_id: Optional[str], waited_s: float):
+    with Session(engine_sync) as session:
+        failed = fail_runs(session, (Run.id == uuid.UUID(run_id)) & (Run.status == "queued"),
+                           f"Gave up after {int(waited_s)}s waiting for the module's rate or concurrency limit",
+                           datetime.utcnow())
+        session.commit()
+    if failed:
+        publish_run_event(run_id, "failed", batch_id)
+
+def defer(task, run_id: str, batch_id: Optional[str], deferral: dict, wait: float, reserved: bool):
+    """Re-queue the run ``wait`` seconds from now. ``deferral`` travels with
+    the task's retries: when it was first deferred, whether it holds a
+    reserved token, and the deferred_until last written for it."""
+    now = time.time()
+    since = deferral.get("since", now)
+    if now + wait - since > settings.SCHEDULER_MAX_DEFER_S:
+        give_up_run(run_id, batch_id, now - since)
+        return None
+    # One UPDATE per SCHEDULER_DEFER_WRITE_S of waiting, not per retry
+    recorded = deferral.get("recorded")
+    if recorded is None or now + wait - recorded >= settings.SCHEDULER_DEFER_WRITE_S:
+        if not defer_run(run_id, wait):
+            return None
+        recorded = now + wait
+    raise task.retry(countdown=wait, kwargs={
+        **task.request.kwargs, "deferral": {"since": since, "reserved": reserved, "recorded": recorded},
+    })
 
-    # 2. Run Module
+def start_run(run_id: str, time_limit: int) -> Optional[datetime]:
+    """Move a run from queued to running and set its deadline. Returns its
+    created_at, or None when it is no longer queued (cancelled, reaped, or a
+    redelivered message for a run that already started)."""
+    now = datetime.utcnow()
+    with Session(engine_sync) as session:
+        created_at = session.execute(
+            update(Run).where(Run.id == uuid.UUID(run_id), Run.status == "queued")
+            .values(status="running", started_at=now, deadline_at=now + timedelta(seconds=time_limit))
+            .returning(Run.created_at)
+        ).scalar()
+        session.commit()
+    return created_at
+
+# Retries are bounded by SCHEDULER_MAX_DEFER_S rather than a count
+@celery_app.task(name="run_module_task", bind=True, max_retries=None)
+def run_module_task(self, run_id: str, name: str, target: str, options: dict, batch_id: Optional[str] = None,
+                    deferral: Optional[dict] = None):
+    # 1. Load module and wait our turn: if the module or its upstream is
+    # saturated, re-queue with a countdown instead of holding this slot
+    spec = registry.get(name)
+    # A cancelled or reaped run stops here instead of spending rate tokens
+    if is_final(run_id):
+        return None
+    deferral = deferral or {}
+    waiting = scheduler.try_acquire(spec, run_id, target, options, deferral.get("reserved", False), self.request.retries)
+    if waiting is not None:
+        return defer(self, run_id, batch_id, deferral, *waiting)
+    limits = scheduler.limits_for(spec)
+    created_at = start_run(run_id, limits["time_limit"])
+    if created_at is None:
+        scheduler.release(spec, run_id)
+        return None
+    metrics.QUEUE_WAIT.labels(spec.cls.name).observe((datetime.utcnow() - created_at).total_seconds())
+    started = time.perf_counter()
+    publish_run_event(run_id, "running", batch_id)
+    if spec.cls.supports_progress:
+        options = {**options, "progress": functools.partial(report_progress, run_id, batch_id)}
+
+    # 2. Run Module. The soft time limit raises SoftTimeLimitExceeded in
+    # prefork workers; thread pools have no time limits, so in async mode
+    # the coroutine is also given the soft limit as a timeout
     try:
-        result_data = module.run(target, **options)
+        if settings.WORKER_ASYNC_MODE:
+            result_data = get_async_pool().run(spec.instance.arun(target, **options), limits["soft_time_limit"])
+        else:
+            result_data = spec.instance.run(target, **options)
         # Serialize any datetime objects in the result
         result_data = serialize_datetime(result_data)
         status = "success" if result_data.get("success") else "failed"
+    except (SoftTimeLimitExceeded, FuturesTimeoutError):
+        result_data = {"error": f"Timed out after {limits['soft_time_limit']}s"}
+        status = "failed"
     except Exception as e:
         result_data = {"error": str(e)}
         status = "failed"
+    finally:
+        scheduler.release(spec, run_id)
+    metrics.RUN_DURATION.labels(spec.cls.name).observe(result_data.get("duration_s") or time.perf_counter() - started)
+    metrics.RUNS.labels(spec.cls.name, status).inc()
 
-    # 3. Save to DB (Synchronous)
-    with Session(engine_sync) as session:
-        run_obj = session.get(Run, run_id)
-        if run_obj:
-            run_obj.result = result_data
-            run_obj.status = status
-            run_obj.finished_at = datetime.utcnow()
-            session.add(run_obj)
+    # 3. Save to DB (Synchronous): buffered when the result writer is on,
+    # otherwise a single UPDATE without loading the row first. Either way
+    # only a row that is still running is updated
+    values = {"result": result_data, "status": status, "finished_at": datetime.utcnow()}
+    writer = get_result_writer()
+    if writer:
+        writer.submit(run_id, **values)
+    else:
+        with Session(engine_sync) as session:
+            updated = session.execute(
+                update(Run).where(Run.id == uuid.UUID(run_id), Run.status == "running").values(**values)
+            ).rowcount
             session.commit()
+        if not updated:
+            return None
 
+    publish_run_event(run_id, status, batch_id, result_data)
     return result_data
 
-def enqueue_run(name: str, target: str, options: dict = {}):
-    run_id = uuid.uuid4()
+def fail_runs(session: Session, condition, error: str, now: datetime) -> list:
+    return session.execute(
+        update(Run).where(condition)
+        .values(status="failed", finished_at=now, result={"error": error})
+        .returning(Run.id, Run.batch_id)
+    ).all()
+
+@celery_app.task(name="reap_stuck_runs")
+def reap_stuck_runs():
+    """Fail runs whose worker died or hung past the hard time limit, and
+    queued runs no worker has seen for RUN_QUEUED_MAX_AGE_S (their message
+    was lost). A run the scheduler keeps deferring is seen on every retry,
+    however long its batch takes. Scheduled every REAPER_INTERVAL_S by
+    celery beat."""
+    now = datetime.utcnow()
+    queued_cutoff = now - timedelta(seconds=settings.RUN_QUEUED_MAX_AGE_S)
+    last_seen = func.coalesce(Run.deferred_until, Run.created_at)
+    with Session(engine_sync) as session:
+        overdue = fail_runs(session, (Run.status == "running") & (Run.deadline_at < now),
+                            "Run exceeded its time limit", now)
+        lost = fail_runs(session, (Run.status == "queued") & (last_seen < queued_cutoff),
+                         "Run was never picked up by a worker", now)
+        session.commit()
+    metrics.RUNS_REAPED.labels("deadline").inc(len(overdue))
+    metrics.RUNS_REAPED.labels("queued_too_long").inc(len(lost))
+    reaped = overdue + lost
+    for run_id, batch_id in reaped:
+        publish_run_event(str(run_id), "failed", str(batch_id) if batch_id else None)
+    return len(reaped)
+
+def revoke_run(run_id: str, name: str, batch_id: Optional[str]):
+    """Once a run is marked cancelled: drop its queued message or kill the
+    task in flight, free its scheduler slot and announce it."""
+    celery_app.control.revoke(run_id, terminate=True, signal="SIGTERM")
+    if name in registry:
+        scheduler.release(registry.get(name), run_id)
+    publish_run_event(run_id, "cancelled", batch_id)
+
+def fresh_run_query(fingerprint: str, max_age_s: int):
+    cutoff = datetime.utcnow() - timedelta(seconds=max_age_s)
+    return (
+        select(Run.id)
+        .where(Run.fingerprint == fingerprint, Run.status == "success", Run.finished_at >= cutoff)
+        .order_by(Run.finished_at.desc())
+        .limit(1)
+    )
+
+def task_options(name: str, priority: str) -> dict:
+    """Queue and time limits for a run of module ``name``."""
+    spec = registry.get(name)
+    limits = scheduler.limits_for(spec)
+    return {
+        "queue": queue_for(spec.cls.name, priority),
+        "soft_time_limit": limits["soft_time_limit"],
+        "time_limit": limits["time_limit"],
+    }
+
+def publish_run(run_id: str, name: str, target: str, options: dict, priority: str = "normal"):
+    record_queued([run_id])
+    run_module_task.apply_async(args=[run_id, name, target, options], task_id=run_id, **task_options(name, priority))
+
+def batch_rows(names: list, targets: list, options: dict, batch_id: uuid.UUID):
+    now = datetime.utcnow()
+    return [
+        {"id": uuid.uuid4(), "module": name, "target": target, "status": "queued",
+         "batch_id": batch_id, "fingerprint": run_fingerprint(name, target, options), "created_at": now}
+        for target in targets for name in names
+    ]
+
+def publish_batch(rows: list, batch_id: uuid.UUID, options: dict, priority: str = "bulk"):
+    """Publish a batch as groups of ``BATCH_PUBLISH_CHUNK`` tasks, each group
+    over one producer connection."""
+    record_queued((str(r["id"]) for r in rows), str(batch_id))
+    chunk = settings.BATCH_PUBLISH_CHUNK
+    for i in range(0, len(rows), chunk):
+        group(
+            run_module_task.signature(
+                args=[str(r["id"]), r["module"], r["target"], options],
+                kwargs={"batch_id": str(batch_id)},
+                task_id=str(r["id"]),
+                **task_options(r["module"], priority),
+            )
+            for r in rows[i:i + chunk]
+        ).apply_async()
+
+def enqueue_batch(names: list, targets: list, options: dict = {}, priority: str = "bulk"):
+    """Create one Run per (module, target) pair with a single multi-row
+    INSERT, then publish them in chunks."""
+    batch_id = uuid.uuid4()
+    rows = batch_rows(names, targets, options, batch_id)
+    if not rows:
+        return str(batch_id), 0
 
     with Session(engine_sync) as session:
-        run_obj = Run(id=run_id, module=name, target=target, status="queued")
-        session.add(run_obj)
+        session.execute(insert(Run), rows)
         session.commit()
 
-    # Send to 'default' queue (matches worker configuration)
-    run_module_task.apply_async(args=[str(run_id), name, target, options], task_id=str(run_id))
-    return str(run_id)
+    publish_batch(rows, batch_id, options, priority)
+    return str(batch_id), len(rows)
+
+# --- ASYNC ENQUEUE (for the FastAPI event loop) ---
+# Kombu publishing and the Redis state writes are blocking, so they run on a
+# small dedicated pool instead of the event loop thread.
+_publisher = ThreadPoolExecutor(max_workers=settings.PUBLISH_THREADS, thread_name_prefix="publish")
+
+async def enqueue_run_async(name: str, target: str, options: dict = {}, max_age_s: Optional[int] = None,
+                            priority: str = "normal"):
+    """Returns ``(run_id, cached)``. With a freshness window, a successful run
+    of the same fingerprint inside the window is returned instead of
+    enqueuing a new one. Never blocks the event loop."""
+    run_id = uuid.uuid4()
+    fingerprint = run_fingerprint(name, target, options)
+    window = freshness_window(name, max_age_s)
+
+    async with AsyncSessionLocal() as session:
+        if window:
+            fresh_id = (await session.exec(fresh_run_query(fingerprint, window))).first()
+            if fresh_id:
+                return str(fresh_id), True
+        session.add(Run(id=run_id, module=name, target=target, status="queued", fingerprint=fingerprint))
+        await session.commit()
+
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(_publisher, publish_run, str(run_id), name, target, options, priority)
+    return str(run_id), False
+
+async def enqueue_batch_async(names: list, targets: list, options: dict = {}, priority: str = "bulk"):
+    """Same as ``enqueue_batch`` but never blocks the event loop."""
+    batch_id = uuid.uuid4()
+    rows = batch_rows(names, targets, options, batch_id)
+    if not rows:
+        return str(batch_id), 0
+
+    async with AsyncSessionLocal() as session:
+        await session.execute(insert(Run), rows)
+        await session.commit()
+
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(_publisher, publish_batch, rows, batch_id, options, priority)
+    return str(batch_id), len(rows)
+
+async def cancel_run_async(run_id: uuid.UUID) -> bool:
+    """Cancel a queued or running run. False when there is no such run or it
+    has already finished."""
+    async with AsyncSessionLocal() as session:
+        row = (await session.execute(
+            update(Run).where(Run.id == run_id, Run.status.in_(("queued", "running")))
+            .values(status="cancelled", finished_at=datetime.utcnow())
+            .returning(Run.module, Run.batch_id)
+        )).first()
+        await session.commit()
+    if row is None:
+        return False
+
+    metrics.RUNS.labels(module_key(row.module), "cancelled").inc()
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(_publisher, revoke_run, str(run_id), row.module, str(row.batch_id) if row.batch_id else None)
+    return True
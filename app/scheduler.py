@@ -0,0 +1,65 @@
+import random
+from typing import Optional, Tuple
+from app.core import ratelimit
+from app.core.config import settings
+from app.modules.registry import ModuleSpec
+
+# Cross-worker politeness for module runs: a cap on runs of each module in
+# flight, plus a token bucket per (module, upstream). A run that can't go yet
+# is told how long to wait, and the task re-queues itself with that countdown
+# instead of sleeping on a worker slot. A run waiting for a token reserves
+# the next free one, so it comes back once, when that token is due, and then
+# only needs a concurrency slot. Leases last as long as the module's hard
+# time limit, so a slot held by a killed worker comes back with it.
+
+def limits_for(spec: ModuleSpec) -> dict:
+    limits = {
+        "max_concurrency": spec.cls.max_concurrency,
+        "rate_limit": spec.cls.rate_limit,
+        "rate_burst": spec.cls.rate_burst,
+        "soft_time_limit": spec.cls.soft_time_limit or settings.RUN_SOFT_TIME_LIMIT_S,
+        "time_limit": spec.cls.time_limit or settings.RUN_TIME_LIMIT_S,
+    }
+    limits.update(settings.MODULE_LIMITS.get(spec.cls.name, {}))
+    return limits
+
+def lease_key(spec: ModuleSpec) -> str:
+    return f"sched:{spec.cls.name}:running"
+
+def try_acquire(spec: ModuleSpec, run_id: str, target: str, options: dict,
+                reserved: bool = False, attempt: int = 0) -> Optional[Tuple[float, bool]]:
+    """None when the run may start now, otherwise ``(seconds to wait,
+    whether the run now holds a reserved token)``. ``reserved`` is what the
+    run's previous deferral returned; ``attempt`` counts its deferrals."""
+    if not settings.SCHEDULER_ENABLED:
+        return None
+    limits = limits_for(spec)
+    if not limits["max_concurrency"] and not limits["rate_limit"]:
+        return None
+    # Cache hits cost the upstream nothing, so they don't wait for its tokens
+    if spec.instance.served_from_cache(target, options):
+        return None
+
+    upstream = spec.instance.upstream_key(target, options)
+    wait_ms = ratelimit.acquire(
+        lease_key(spec), f"sched:{spec.cls.name}:bucket:{upstream}", run_id,
+        limit=limits["max_concurrency"], lease_s=limits["time_limit"] or settings.SCHEDULER_LEASE_S,
+        # A reserved token was paid for when it was reserved
+        rate=0 if reserved else limits["rate_limit"], burst=limits["rate_burst"],
+        horizon_s=settings.SCHEDULER_RESERVE_HORIZON_S,
+    )
+    if wait_ms == 0:
+        return None
+    if wait_ms > 0:
+        # Reservations are already 1/rate apart; no jitter needed
+        return wait_ms / 1000, True
+    if wait_ms == ratelimit.BACKLOG_FULL:
+        wait = settings.SCHEDULER_RESERVE_HORIZON_S
+    else:
+        wait = min(settings.SCHEDULER_RETRY_S * 2 ** attempt, settings.SCHEDULER_RETRY_MAX_S)
+    # Jitter so deferred runs don't all come back in the same instant
+    return wait * (1 + random.random() * 0.5), reserved
+
+def release(spec: ModuleSpec, run_id: str):
+    if settings.SCHEDULER_ENABLED and limits_for(spec)["max_concurrency"]:
+        ratelimit.release(lease_key(spec), run_id)
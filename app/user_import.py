@@ -0,0 +1,153 @@
+import asyncio
+import csv
+import io
+import itertools
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import AsyncIterator, Iterator, Optional
+from pydantic import EmailStr, ValidationError, parse_obj_as
+from sqlalchemy import insert
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlmodel import select
+from app.core import leaderboard
+from app.core.config import settings
+from app.core.security import get_password_hash
+from app.db.database import AsyncSessionLocal
+from app.models import User
+
+# Bulk user provisioning: rows are validated, checked against existing
+# emails with one IN query per chunk, hashed across a process pool and
+# inserted with one multi-row INSERT ... ON CONFLICT DO NOTHING. Every row
+# gets an outcome line once its chunk is committed, so a client whose
+# stream breaks can resume from the row after the last outcome it saw
+# (re-sending already imported rows is harmless too: they come back as
+# "exists").
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+def get_hash_processes() -> ProcessPoolExecutor:
+    """Spawned, not forked: the API process has an event loop and threads."""
+    global _pool
+    if _pool is None:
+        workers = settings.USER_IMPORT_PROCESSES or os.cpu_count() or 1
+        _pool = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+def hash_many(passwords: list) -> list:
+    return [get_password_hash(p) for p in passwords]
+
+async def hash_parallel(passwords: list) -> list:
+    loop = asyncio.get_running_loop()
+    pool = get_hash_processes()
+    slices = max(1, min(len(passwords), pool._max_workers))
+    size = -(-len(passwords) // slices)
+    parts = await asyncio.gather(*(
+        loop.run_in_executor(pool, hash_many, passwords[i:i + size]) for i in range(0, len(passwords), size)
+    ))
+    return [h for part in parts for h in part]
+
+def parse_rows(lines: Iterator[str], fmt: str) -> Iterator[dict]:
+    """CSV with an ``email,password[,is_admin]`` header, or JSONL objects
+    with the same keys. Unparseable lines yield ``{"error": ...}``."""
+    if fmt == "csv":
+        for row in csv.DictReader(lines):
+            yield {k.strip().lower(): (v or "").strip() for k, v in row.items() if k}
+        return
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+            yield row if isinstance(row, dict) else {"error": "not a JSON object"}
+        except ValueError as e:
+            yield {"error": f"invalid JSON: {e}"}
+
+def as_bool(value) -> bool:
+    return value if isinstance(value, bool) else str(value).strip().lower() in ("1", "true", "yes", "y")
+
+def insert_ignoring_existing(dialect: str, rows: list):
+    if dialect == "postgresql":
+        return postgresql.insert(User).values(rows).on_conflict_do_nothing(index_elements=["email"]).returning(User.email)
+    if dialect == "sqlite":
+        return sqlite.insert(User).values(rows).on_conflict_do_nothing(index_elements=["email"]).returning(User.email)
+    return insert(User).values(rows).returning(User.email)
+
+async def import_chunk(chunk: list) -> list:
+    """``chunk`` is ``[(row_number, row)]``; returns one outcome per row."""
+    outcomes, valid = {}, []
+    for n, row in chunk:
+        if "error" in row:
+            outcomes[n] = {"status": "invalid", "error": row["error"]}
+            continue
+        try:
+            # Same normalization as signup, so imported users can log in
+            email = parse_obj_as(EmailStr, str(row.get("email", "")))
+        except ValidationError:
+            outcomes[n] = {"status": "invalid", "error": "invalid email"}
+            continue
+        password = str(row.get("password") or "")
+        if not password:
+            outcomes[n] = {"status": "invalid", "email": email, "error": "password is required"}
+            continue
+        valid.append((n, email, password, as_bool(row.get("is_admin", False))))
+
+    async with AsyncSessionLocal() as session:
+        emails = [email for _, email, _, _ in valid]
+        existing = set((await session.execute(select(User.email).where(User.email.in_(emails)))).scalars()) if emails else set()
+
+        new, seen = [], set()
+        for n, email, password, is_admin in valid:
+            if email in existing:
+                outcomes[n] = {"status": "exists", "email": email}
+            elif email in seen:
+                outcomes[n] = {"status": "duplicate", "email": email}
+            else:
+                seen.add(email)
+                new.append((n, email, password, is_admin))
+
+        created = set()
+        if new:
+            hashes = await hash_parallel([password for _, _, password, _ in new])
+            rows = [User(email=email, hashed_password=h, is_admin=is_admin).dict()
+                    for (_, email, _, is_admin), h in zip(new, hashes)]
+            stmt = insert_ignoring_existing(session.bind.dialect.name, rows)
+            created = set((await session.execute(stmt)).scalars())
+            await session.commit()
+            await leaderboard.add_players([email for _, email, _, is_admin in new if email in created and not is_admin])
+        for n, email, _, _ in new:
+            # Lost a race with a concurrent signup/import
+            outcomes[n] = {"status": "created" if email in created else "exists", "email": email}
+
+    return [{"row": n, **outcomes[n]} for n, _ in chunk]
+
+def take(rows: Iterator, n: int) -> list:
+    return list(itertools.islice(rows, n))
+
+async def import_users(lines: Iterator[str], fmt: str, start_row: int = 1) -> AsyncIterator[dict]:
+    """Outcome per data row (numbered from 1), then ``{"summary": ...}``.
+    ``lines`` is read (and parsed) a chunk at a time in a thread, so a large
+    upload spooled to disk doesn't block the event loop."""
+    loop = asyncio.get_running_loop()
+    rows = itertools.islice(enumerate(parse_rows(lines, fmt), start=1), start_row - 1, None)
+    totals = {"created": 0, "exists": 0, "duplicate": 0, "invalid": 0}
+    last = start_row - 1
+    while True:
+        room = settings.USER_IMPORT_MAX_ROWS - (last - start_row + 1)
+        # With no room left, one more row tells whether the upload goes on
+        chunk = await loop.run_in_executor(None, take, rows, min(settings.USER_IMPORT_CHUNK, room) or 1)
+        if not chunk:
+            break
+        if not room:
+            yield {"error": f"import stopped at the {settings.USER_IMPORT_MAX_ROWS} row limit", "next_row": chunk[0][0]}
+            break
+        for outcome in await import_chunk(chunk):
+            totals[outcome["status"]] += 1
+            yield outcome
+        last = chunk[-1][0]
+    yield {"summary": totals, "next_row": last + 1}
+
+def text_lines(raw) -> Iterator[str]:
+    """Lines of an uploaded file, tolerating a UTF-8 BOM."""
+    return io.TextIOWrapper(raw, encoding="utf-8-sig", newline="")
@@ -0,0 +1,169 @@
+"""Latency of unrelated endpoints while POST /api/run is being hammered.
+
+Fires ``--burst`` enqueue requests (``--concurrency`` at a time) at a running
+backend while a probe loop measures ``GET /api/health`` every ``--interval``
+seconds. If the enqueue path blocks the event loop, probe p99 climbs with
+the burst; with the async path it should stay close to the idle baseline.
+
+    python -m benchmarks.enqueue_latency --url http://localhost:8000 --burst 2000
+
+With ``--offline`` the backend is started in-process instead, like
+``benchmarks.suite`` (SQLite, in-memory Celery broker), and
+``--publish-delay-ms`` makes every broker publish sleep first, to stand in
+for a remote broker's round trip. ``--sync-enqueue`` swaps POST /api/run's
+enqueue for a blocking one (sync session, publish on the event loop), the
+way the API enqueued before it went async, so both can be compared on the
+same tree:
+
+    python -m benchmarks.enqueue_latency --offline --burst 500 --concurrency 4 --publish-delay-ms 5
+    python -m benchmarks.enqueue_latency --offline --burst 500 --concurrency 4 --publish-delay-ms 5 --sync-enqueue
+"""
+import argparse
+import asyncio
+import json
+import logging
+import statistics
+import tempfile
+import time
+import aiohttp
+
+def percentiles(samples):
+    if not samples:
+        return {}
+    ordered = sorted(samples)
+    pick = lambda q: ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+    return {
+        "count": len(ordered),
+        "mean_ms": round(statistics.fmean(ordered) * 1000, 2),
+        "p50_ms": round(pick(0.50) * 1000, 2),
+        "p95_ms": round(pick(0.95) * 1000, 2),
+        "p99_ms": round(pick(0.99) * 1000, 2),
+        "max_ms": round(ordered[-1] * 1000, 2),
+    }
+
+async def probe(session, url, interval, stop, samples):
+    while not stop.is_set():
+        started = time.perf_counter()
+        async with session.get(f"{url}/api/health") as resp:
+            await resp.read()
+        samples.append(time.perf_counter() - started)
+        await asyncio.sleep(interval)
+
+async def burst(session, url, total, concurrency, module, samples):
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one(i):
+        async with sem:
+            started = time.perf_counter()
+            async with session.post(f"{url}/api/run", json={"module": module, "target": f"bench-{i}.example.com"}) as resp:
+                await resp.read()
+            samples.append(time.perf_counter() - started)
+
+    await asyncio.gather(*(one(i) for i in range(total)))
+
+async def main(args):
+    async with aiohttp.ClientSession() as session:
+        idle, loaded, enqueue = [], [], []
+
+        stop = asyncio.Event()
+        task = asyncio.create_task(probe(session, args.url, args.interval, stop, idle))
+        await asyncio.sleep(args.idle_s)
+        stop.set()
+        await task
+
+        stop = asyncio.Event()
+        task = asyncio.create_task(probe(session, args.url, args.interval, stop, loaded))
+        started = time.perf_counter()
+        await burst(session, args.url, args.burst, args.concurrency, args.module, enqueue)
+        elapsed = time.perf_counter() - started
+        stop.set()
+        await task
+
+    report = {
+        "benchmark": "enqueue_latency",
+        "url": args.url,
+        "burst": args.burst,
+        "concurrency": args.concurrency,
+        "publish_delay_ms": args.publish_delay_ms if args.offline else None,
+        "sync_enqueue": args.sync_enqueue if args.offline else None,
+        "enqueue_per_s": round(args.burst / elapsed, 1),
+        "health_idle": percentiles(idle),
+        "health_during_burst": percentiles(loaded),
+        "enqueue": percentiles(enqueue),
+    }
+    print(json.dumps(report, indent=2))
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+
+def delay_publishing(delay_ms: float):
+    """Wrap the broker publish the API runs for every enqueue."""
+    from app import runner
+    publish_run = runner.publish_run
+
+    def delayed(*args, **kwargs):
+        time.sleep(delay_ms / 1000)
+        return publish_run(*args, **kwargs)
+
+    runner.publish_run = delayed
+
+def enqueue_blocking():
+    """Have POST /api/run insert and publish on the event loop, blocking it."""
+    import uuid
+    from sqlmodel import Session
+    from app import runner
+    from app.api import routes_osint
+    from app.models import Run
+
+    async def enqueue_run(name, target, options={}, max_age_s=None, priority="normal"):
+        run_id = str(uuid.uuid4())
+        with Session(runner.engine_sync) as session:
+            session.add(Run(id=uuid.UUID(run_id), module=name, target=target, status="queued",
+                            fingerprint=runner.run_fingerprint(name, target, options)))
+            session.commit()
+        runner.publish_run(run_id, name, target, options, priority)
+        return run_id, False
+
+    routes_osint.enqueue_run_async = enqueue_run
+
+def offline(args):
+    from benchmarks.stubs import StubDNSServer, StubWhoisServer
+    from benchmarks.suite import configure, redis_reachable, reset_database, start_api
+
+    args.database_url = f"sqlite+aiosqlite:///{tempfile.mkdtemp(prefix='ciphereye-bench-')}/bench.db"
+    args.caches = args.async_mode = False
+    # Runs are only enqueued, never executed; the stubs keep configure() honest
+    with StubDNSServer() as dns_stub, StubWhoisServer() as whois_stub:
+        configure(args, dns_stub.port, whois_stub.port)
+        if not redis_reachable(args.redis_url):
+            logging.getLogger("app").setLevel(logging.ERROR)
+        reset_database(0, 0)
+        if args.publish_delay_ms:
+            delay_publishing(args.publish_delay_ms)
+        if args.sync_enqueue:
+            enqueue_blocking()
+        server, thread, args.url = start_api()
+        try:
+            asyncio.run(main(args))
+        finally:
+            server.should_exit = True
+            thread.join(timeout=10)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--burst", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--module", default="dns_module")
+    parser.add_argument("--interval", type=float, default=0.01)
+    parser.add_argument("--idle-s", type=float, default=3.0)
+    parser.add_argument("--offline", action="store_true", help="start the backend in-process")
+    parser.add_argument("--publish-delay-ms", type=float, default=0.0, help="with --offline: sleep before each broker publish")
+    parser.add_argument("--sync-enqueue", action="store_true", help="with --offline: enqueue on the event loop, blocking it")
+    parser.add_argument("--redis-url", default="redis://127.0.0.1:6379/15", help="with --offline")
+    parser.add_argument("--out", help="also write the JSON report here")
+    args = parser.parse_args()
+    if args.offline:
+        offline(args)
+    else:
+        asyncio.run(main(args))
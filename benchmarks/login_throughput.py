@@ -0,0 +1,121 @@
+"""Concurrent login throughput, and what it does to everyone else.
+
+Starts the app offline like ``benchmarks.suite`` (one uvicorn process), then
+fires ``--logins`` POST /auth/login requests ``--concurrency`` at a time
+while a probe loop measures GET /api/health. bcrypt on the event loop shows
+up as health latency tracking login latency; offloaded, health stays near
+its idle baseline and excess logins are shed with 503s instead of queuing.
+
+    python -m benchmarks.login_throughput --logins 400 --concurrency 64 --out login.json
+"""
+import argparse
+import asyncio
+import json
+import logging
+import random
+import tempfile
+import time
+from collections import Counter
+import aiohttp
+from benchmarks.enqueue_latency import percentiles
+from benchmarks.stubs import StubDNSServer, StubWhoisServer
+from benchmarks.suite import PASSWORD, configure, git_revision, redis_reachable, reset_database, start_api
+
+async def probe(session, url, interval, stop, samples, errors):
+    # Keep-alive connections can be dropped while the server's loop is
+    # stalled; count those rather than abort the run
+    while not stop.is_set():
+        started = time.perf_counter()
+        try:
+            async with session.get(f"{url}/api/health") as resp:
+                await resp.read()
+            samples.append(time.perf_counter() - started)
+        except aiohttp.ClientError:
+            errors["health"] += 1
+        await asyncio.sleep(interval)
+
+async def logins(session, url, total, concurrency, users, samples, statuses):
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one(i):
+        async with sem:
+            started = time.perf_counter()
+            body = {"email": random.choice(users), "password": PASSWORD}
+            try:
+                async with session.post(f"{url}/auth/login", json=body) as resp:
+                    await resp.read()
+                    statuses[resp.status] += 1
+            except aiohttp.ClientError as e:
+                statuses[type(e).__name__] += 1
+                return
+            if resp.status == 200:
+                samples.append(time.perf_counter() - started)
+
+    await asyncio.gather(*(one(i) for i in range(total)))
+
+async def measure(url, args):
+    users = [f"player{i}@bench.example.com" for i in range(args.users)]
+    connector = aiohttp.TCPConnector(limit=args.concurrency + 1)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        idle, loaded, login_samples, statuses, errors = [], [], [], Counter(), Counter()
+
+        stop = asyncio.Event()
+        task = asyncio.create_task(probe(session, url, args.interval, stop, idle, errors))
+        await asyncio.sleep(args.idle_s)
+        stop.set()
+        await task
+
+        stop = asyncio.Event()
+        task = asyncio.create_task(probe(session, url, args.interval, stop, loaded, errors))
+        started = time.perf_counter()
+        await logins(session, url, args.logins, args.concurrency, users, login_samples, statuses)
+        elapsed = time.perf_counter() - started
+        stop.set()
+        await task
+
+    return {
+        "benchmark": "login_throughput",
+        "revision": git_revision(),
+        "logins": args.logins,
+        "concurrency": args.concurrency,
+        "logins_ok_per_s": round(statuses[200] / elapsed, 1),
+        "status": {str(k): v for k, v in statuses.items()},
+        "login": percentiles(login_samples),
+        "health_idle": percentiles(idle),
+        "health_during_logins": percentiles(loaded),
+        "health_errors": errors["health"],
+    }
+
+def main(args):
+    random.seed(args.seed)
+    args.database_url = f"sqlite+aiosqlite:///{tempfile.mkdtemp(prefix='ciphereye-bench-')}/bench.db"
+    args.caches = args.async_mode = False
+    # The stubs are idle here; they only keep configure() honest
+    with StubDNSServer() as dns_stub, StubWhoisServer() as whois_stub:
+        configure(args, dns_stub.port, whois_stub.port)
+        if not redis_reachable(args.redis_url):
+            logging.getLogger("app").setLevel(logging.ERROR)
+        reset_database(args.users, 0)
+        server, thread, url = start_api()
+        try:
+            report = asyncio.run(measure(url, args))
+        finally:
+            server.should_exit = True
+            thread.join(timeout=10)
+
+    print(json.dumps(report, indent=2))
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--logins", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--interval", type=float, default=0.01)
+    parser.add_argument("--idle-s", type=float, default=2.0)
+    parser.add_argument("--redis-url", default="redis://127.0.0.1:6379/15")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--out", help="also write the JSON report here")
+    main(parser.parse_args())
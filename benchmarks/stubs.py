@@ -0,0 +1,120 @@
+"""Local stand-ins for the network services the modules talk to, so the
+benchmarks run offline and give the same answers every time.
+
+Both servers bind to 127.0.0.1 on a free port and serve from a background
+thread. ``delay_ms`` adds a fixed latency per query to mimic a real RTT.
+"""
+import hashlib
+import socketserver
+import threading
+import time
+import dns.message
+import dns.rcode
+import dns.rdataclass
+import dns.rdatatype
+import dns.rrset
+
+TTL = 300
+
+def _octet(name: str) -> int:
+    return hashlib.sha256(name.encode()).digest()[0] or 1
+
+def dns_records(name: str, rdtype: int):
+    """Deterministic records for ``name``. Names whose first label starts
+    with ``nx`` do not exist."""
+    label = name.split(".", 1)[0]
+    if label.startswith("nx"):
+        return None
+    zone = name.split(".", 1)[-1] or name
+    return {
+        dns.rdatatype.A: [f"192.0.2.{_octet(name)}"],
+        dns.rdatatype.AAAA: [f"2001:db8::{_octet(name):x}"],
+        dns.rdatatype.MX: [f"10 mail.{zone}."],
+        dns.rdatatype.NS: [f"ns1.{zone}.", f"ns2.{zone}."],
+        dns.rdatatype.TXT: ['"v=spf1 -all"'],
+    }.get(rdtype, [])
+
+class _StubServer:
+    server_class = None
+    handler_class = None
+
+    def __init__(self, delay_ms: float = 0):
+        self.delay_s = delay_ms / 1000
+        self.server = self.server_class(("127.0.0.1", 0), self.handler_class)
+        self.server.daemon_threads = True
+        self.server.stub = self
+        self.port = self.server.server_address[1]
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+class _DNSHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        data, sock = self.request
+        query = dns.message.from_wire(data)
+        response = dns.message.make_response(query)
+        question = query.question[0]
+        name = question.name.to_text().rstrip(".")
+        records = dns_records(name, question.rdtype)
+        if records is None:
+            response.set_rcode(dns.rcode.NXDOMAIN)
+        if records:
+            response.answer.append(dns.rrset.from_text_list(
+                question.name, TTL, dns.rdataclass.IN, question.rdtype, records,
+            ))
+        else:
+            zone = question.name.parent() if len(question.name) > 2 else question.name
+            response.authority.append(dns.rrset.from_text(
+                zone, TTL, dns.rdataclass.IN, dns.rdatatype.SOA,
+                f"ns1.{zone} hostmaster.{zone} 1 7200 900 1209600 {TTL}",
+            ))
+        if self.server.stub.delay_s:
+            time.sleep(self.server.stub.delay_s)
+        sock.sendto(response.to_wire(), self.client_address)
+
+class StubDNSServer(_StubServer):
+    """Authoritative-looking UDP server answering A, AAAA, MX, NS and TXT for
+    any name. Point the app at it with DNS_NAMESERVERS=127.0.0.1 and
+    DNS_PORT=<port>."""
+    server_class = socketserver.ThreadingUDPServer
+    handler_class = _DNSHandler
+
+WHOIS_TEMPLATE = """\
+   Domain Name: {domain}
+   Registry Domain ID: {digest}_DOMAIN-STUB
+   Registrar WHOIS Server: whois.stub-registrar.test
+   Updated Date: 2024-01-01T00:00:00Z
+   Creation Date: 2001-01-01T00:00:00Z
+   Registry Expiry Date: 2031-01-01T00:00:00Z
+   Registrar: Stub Registrar, Inc.
+   Registrar IANA ID: 9999
+   Domain Status: clientTransferProhibited
+   Name Server: NS1.{domain}
+   Name Server: NS2.{domain}
+   DNSSEC: unsigned
+>>> Last update of whois database: 2024-01-01T00:00:00Z <<<
+"""
+
+class _WhoisHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        domain = self.rfile.readline().strip().decode("ascii", "replace").upper()
+        if self.server.stub.delay_s:
+            time.sleep(self.server.stub.delay_s)
+        if domain.startswith("NX"):
+            body = f'No match for "{domain}".\r\n'
+        else:
+            digest = hashlib.sha256(domain.encode()).hexdigest()[:10].upper()
+            body = WHOIS_TEMPLATE.format(domain=domain, digest=digest)
+        self.wfile.write(body.encode())
+
+class StubWhoisServer(_StubServer):
+    """Port-43 style WHOIS server with a Verisign-like answer for any domain.
+    Point the app at it with WHOIS_SERVER=127.0.0.1:<port>."""
+    server_class = socketserver.ThreadingTCPServer
+    handler_class = _WhoisHandler
@@ -0,0 +1,288 @@
+"""Offline benchmark suite: API latency and end-to-end run throughput.
+
+Starts the FastAPI app in-process (uvicorn on a free local port) against a
+throwaway SQLite file or a Postgres database, with Celery on its in-memory
+broker, and the DNS and WHOIS modules pointed at the local stubs in
+``benchmarks.stubs``. Nothing leaves the machine.
+
+    python -m benchmarks.suite --out bench.json
+    python -m benchmarks.suite --database-url postgresql+asyncpg://u:p@localhost/bench --out bench.json
+
+Measured:
+  * throughput and p50/p95/p99 latency of POST /api/run, POST
+    /challenges/verify, GET /challenges/leaderboard, GET /challenges/list
+    and POST /auth/login, each driven at ``--concurrency``
+  * end-to-end runs/sec through ``run_module_task`` (executed locally, the
+    way a worker would) with ``--workers`` threads
+
+All tables of the target database are dropped and recreated, so only point
+``--database-url`` at a database made for this. Redis (``--redis-url``) is
+used if reachable; otherwise the app's Redis-backed features fail open.
+SQLite needs aiosqlite (benchmarks/requirements.txt).
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from benchmarks.enqueue_latency import percentiles
+from benchmarks.stubs import StubDNSServer, StubWhoisServer
+
+PASSWORD = "bench-password"
+ADMIN = "admin@bench.example.com"
+
+def configure(args, dns_port: int, whois_port: int):
+    """Settings are read at import time, so this runs before any app import."""
+    os.environ.update({
+        "DATABASE_URL": args.database_url,
+        "REDIS_URL": args.redis_url,
+        "CELERY_BROKER_URL": "memory://",
+        "CELERY_RESULT_BACKEND": "cache+memory://",
+        "SCHEDULER_ENABLED": "false",
+        # One bucket per challenge would turn most of the verify load into 429s
+        "VERIFY_GLOBAL_RATE": "0",
+        "METRICS_ENABLED": "false",
+        "DNS_NAMESERVERS": "127.0.0.1",
+        "DNS_PORT": str(dns_port),
+        "WHOIS_SERVER": f"127.0.0.1:{whois_port}",
+        "DNS_CACHE_ENABLED": str(args.caches).lower(),
+        "WHOIS_CACHE_ENABLED": str(args.caches).lower(),
+        "WORKER_ASYNC_MODE": str(args.async_mode).lower(),
+    })
+
+def reset_database(users: int, challenges: int):
+    from sqlmodel import SQLModel, Session, select
+    from app.db.database import engine_sync
+    from app.core.security import get_password_hash
+    from app.models import User, Challenge
+
+    SQLModel.metadata.drop_all(engine_sync)
+    SQLModel.metadata.create_all(engine_sync)
+    hashed = get_password_hash(PASSWORD)  # one bcrypt hash shared by every seeded user
+    with Session(engine_sync) as session:
+        session.add_all(
+            User(email=f"player{i}@bench.example.com", hashed_password=hashed, score=random.randint(0, 500))
+            for i in range(users)
+        )
+        session.add(User(email=ADMIN, hashed_password=hashed, is_admin=True))
+        session.add_all(
+            Challenge(title=f"Challenge {i}", description="Benchmark challenge", resources="",
+                      flag=f"FLAG{{bench-{i}}}", level=i % 5 + 1, points=10)
+            for i in range(challenges)
+        )
+        session.commit()
+        ids = [str(cid) for cid in session.exec(select(Challenge.id).order_by(Challenge.title)).all()]
+    return ids
+
+def start_api():
+    import uvicorn
+    from app.main import app
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=0, log_level="warning", lifespan="on"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    port = server.servers[0].sockets[0].getsockname()[1]
+    return server, thread, f"http://127.0.0.1:{port}"
+
+async def drive(session, name, total, concurrency, request, quiet=False):
+    """Send ``total`` requests built by ``request(i)`` -> (method, path,
+    json[, headers])."""
+    sem = asyncio.Semaphore(concurrency)
+    latencies, statuses = [], Counter()
+
+    async def one(i):
+        method, path, body, *headers = request(i)
+        async with sem:
+            started = time.perf_counter()
+            try:
+                async with session.request(method, path, json=body, headers=headers[0] if headers else None) as resp:
+                    await resp.read()
+                    statuses[resp.status] += 1
+            except Exception as e:
+                statuses[type(e).__name__] += 1
+                return
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(total)))
+    elapsed = time.perf_counter() - started
+    errors = sum(n for status, n in statuses.items() if not (isinstance(status, int) and status < 500))
+    if not quiet:
+        print(f"  {name:<28} {total / elapsed:8.1f} req/s", file=sys.stderr)
+    return {
+        "requests": total,
+        "concurrency": concurrency,
+        "req_per_s": round(total / elapsed, 1),
+        "errors": errors,
+        "status": {str(k): v for k, v in statuses.items()},
+        "latency": percentiles(latencies),
+    }
+
+async def http_benchmarks(url, args, challenge_ids):
+    import aiohttp
+    from app.core.security import create_access_token
+
+    flags = {cid: f"FLAG{{bench-{i}}}" for i, cid in enumerate(challenge_ids)}
+    users = [f"player{i}@bench.example.com" for i in range(args.users)]
+    # Minted directly rather than through /auth/login, which is measured
+    # on its own below
+    auth = {email: {"Authorization": f"Bearer {create_access_token({'sub': email})}"} for email in users}
+    admin = {"Authorization": f"Bearer {create_access_token({'sub': ADMIN})}"}
+
+    def verify(i):
+        cid = random.choice(challenge_ids)
+        flag = flags[cid] if random.random() < 0.5 else "FLAG{wrong}"
+        return "POST", "/challenges/verify", {"challenge_id": cid, "flag": flag}, auth[random.choice(users)]
+
+    scenarios = [
+        ("POST /api/run", args.requests,
+         lambda i: ("POST", "/api/run", {"module": "dns_module", "target": f"bench-{i}.example.com"})),
+        ("POST /challenges/verify", args.requests, verify),
+        ("GET /challenges/leaderboard", args.requests, lambda i: ("GET", "/challenges/leaderboard", None)),
+        ("GET /challenges/list", args.requests, lambda i: ("GET", "/challenges/list", None, admin)),
+        ("POST /auth/login", args.login_requests,
+         lambda i: ("POST", "/auth/login", {"email": random.choice(users), "password": PASSWORD})),
+    ]
+    results = {}
+    connector = aiohttp.TCPConnector(limit=args.concurrency)
+    async with aiohttp.ClientSession(url, connector=connector) as session:
+        for name, total, request in scenarios:
+            await drive(session, name, min(args.warmup, total), args.concurrency, request, quiet=True)
+            results[name] = await drive(session, name, total, args.concurrency, request)
+    return results
+
+def run_benchmark(args):
+    """Create runs like the API does, then execute them through
+    run_module_task on ``--workers`` threads."""
+    from app.runner import enqueue_batch, run_module_task
+    from app.models import Run
+    from app.db.database import engine_sync
+    from sqlmodel import Session, select
+
+    targets = [f"e2e-{i}.example.com" for i in range(args.runs)]
+    batch_id, _ = enqueue_batch(args.modules, targets, {})
+    with Session(engine_sync) as session:
+        rows = session.exec(select(Run.id, Run.module, Run.target).where(Run.batch_id == uuid.UUID(batch_id))).all()
+
+    latencies = {name: [] for name in args.modules}
+    statuses = Counter()
+
+    def execute(row):
+        run_id, module, target = row
+        started = time.perf_counter()
+        result = run_module_task.apply(args=[str(run_id), module, target, {}], kwargs={"batch_id": batch_id}).get()
+        latencies[module].append(time.perf_counter() - started)
+        statuses[(module, "success" if result and result.get("success") else "failed")] += 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(args.workers) as pool:
+        list(pool.map(execute, rows))
+    elapsed = time.perf_counter() - started
+
+    from app.core.result_writer import close_result_writer
+    close_result_writer()
+    print(f"  {'run_module_task':<28} {len(rows) / elapsed:8.1f} runs/s", file=sys.stderr)
+    return {
+        "runs": len(rows),
+        "workers": args.workers,
+        "async_mode": args.async_mode,
+        "runs_per_s": round(len(rows) / elapsed, 1),
+        "by_module": {
+            name: {
+                "success": statuses[(name, "success")],
+                "failed": statuses[(name, "failed")],
+                "latency": percentiles(latencies[name]),
+            }
+            for name in args.modules
+        },
+    }
+
+def redis_reachable(url: str) -> bool:
+    import redis
+    try:
+        return bool(redis.Redis.from_url(url, socket_connect_timeout=1).ping())
+    except redis.RedisError:
+        return False
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main(args):
+    random.seed(args.seed)
+    if not args.database_url:
+        args.database_url = f"sqlite+aiosqlite:///{tempfile.mkdtemp(prefix='ciphereye-bench-')}/bench.db"
+
+    with StubDNSServer(args.upstream_delay_ms) as dns_stub, StubWhoisServer(args.upstream_delay_ms) as whois_stub:
+        configure(args, dns_stub.port, whois_stub.port)
+        has_redis = redis_reachable(args.redis_url)
+        if not has_redis:
+            print(f"Redis not reachable at {args.redis_url}; running without it", file=sys.stderr)
+            # Every event publish would log a warning otherwise
+            logging.getLogger("app").setLevel(logging.ERROR)
+        challenge_ids = reset_database(args.users, args.challenges)
+        server, thread, url = start_api()
+        try:
+            print("HTTP", file=sys.stderr)
+            http = asyncio.run(http_benchmarks(url, args, challenge_ids))
+            print("End to end", file=sys.stderr)
+            e2e = run_benchmark(args)
+        finally:
+            server.should_exit = True
+            thread.join(timeout=10)
+
+    report = {
+        "benchmark": "suite",
+        "revision": git_revision(),
+        "timestamp": datetime.utcnow().isoformat() + "Z",
+        "python": platform.python_version(),
+        "database": args.database_url.split(":", 1)[0],
+        "redis": has_redis,
+        "params": {
+            "requests": args.requests, "login_requests": args.login_requests, "concurrency": args.concurrency,
+            "users": args.users, "challenges": args.challenges, "caches": args.caches,
+            "upstream_delay_ms": args.upstream_delay_ms, "seed": args.seed,
+        },
+        "http": http,
+        "end_to_end": e2e,
+    }
+    print(json.dumps(report, indent=2))
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", help="async URL; default: a fresh SQLite file")
+    parser.add_argument("--redis-url", default="redis://127.0.0.1:6379/15")
+    parser.add_argument("--requests", type=int, default=2000, help="per endpoint")
+    parser.add_argument("--login-requests", type=int, default=200, help="bcrypt-bound, so fewer")
+    parser.add_argument("--warmup", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--challenges", type=int, default=50)
+    parser.add_argument("--runs", type=int, default=500, help="targets per module for the end-to-end run")
+    parser.add_argument("--modules", nargs="+", default=["dns_module", "whois_module"])
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--async-mode", action="store_true", help="run modules with WORKER_ASYNC_MODE")
+    parser.add_argument("--caches", action="store_true", help="keep the DNS/WHOIS caches on")
+    parser.add_argument("--upstream-delay-ms", type=float, default=0, help="added latency per stub query")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--out", help="also write the JSON report here")
+    main(parser.parse_args())
@@ -2,6 +2,8 @@ import streamlit as st
 import requests
 import pandas as pd
 import time
+import base64
+import json
 
 API_URL = "http://backend:8000"
 PUBLIC_API_URL = "http://localhost:8000"
@@ -28,19 +30,52 @@ if 'token' not in st.session_state:
     st.session_state.token = url_token
 if 'user_email' not in st.session_state: 
     st.session_state.user_email = url_email
+# The refresh token lives only in this browser session, never in the URL
+# (history, Referer, proxy logs; two tabs rotating one token)
+if 'refresh_token' not in st.session_state: 
+    st.session_state.refresh_token = None
 if 'my_score' not in st.session_state: 
     st.session_state.my_score = 0
+if 'catalogue' not in st.session_state:
+    st.session_state.catalogue = (None, [])  # (etag, challenges)
 
 # --- AUTH FUNCTIONS ---
+def token_expired(token, leeway=30):
+    try:
+        payload = token.split(".")[1]
+        payload += "=" * (-len(payload) % 4)
+        return json.loads(base64.urlsafe_b64decode(payload))["exp"] - leeway < time.time()
+    except Exception:
+        return True
+
+def remember_tokens(access_token, refresh_token):
+    st.session_state.token = access_token
+    st.session_state.refresh_token = refresh_token
+    # Save the short-lived access token to the URL so it survives refresh
+    st.experimental_set_query_params(token=access_token, email=st.session_state.user_email)
+
+def refresh_session():
+    """Swap the refresh token for a new pair instead of a password login;
+    log out if it is gone or revoked."""
+    if st.session_state.get("refresh_token"):
+        try:
+            r = requests.post(f"{API_URL}/auth/refresh", json={"refresh_token": st.session_state.refresh_token})
+            if r.status_code == 200:
+                data = r.json()
+                remember_tokens(data["access_token"], data.get("refresh_token"))
+                return True
+            if r.status_code == 503: return False  # token store down, keep the session
+        except requests.RequestException:
+            return False
+    logout()
+
 def login(email, password):
     try:
         r = requests.post(f"{API_URL}/auth/login", json={"email": email, "password": password})
         if r.status_code == 200:
-            token = r.json().get("access_token")
-            st.session_state.token = token
+            data = r.json()
             st.session_state.user_email = email
-            # Save to URL so it survives refresh
-            st.experimental_set_query_params(token=token, email=email)
+            remember_tokens(data.get("access_token"), data.get("refresh_token"))
             st.success("🚀 Access Granted!")
             time.sleep(0.5)
             st.experimental_rerun()
@@ -55,11 +90,18 @@ def signup(email, password):
     except Exception as e: st.error(f"⚠️ Server Offline: {e}")
 
 def logout():
+    if st.session_state.get("refresh_token"):
+        try: requests.post(f"{API_URL}/auth/logout", json={"refresh_token": st.session_state.refresh_token})
+        except requests.RequestException: pass
     st.session_state.token = None
+    st.session_state.refresh_token = None
     st.session_state.user_email = None
     st.experimental_set_query_params() # Clear URL
     st.experimental_rerun()
 
+if st.session_state.token and token_expired(st.session_state.token):
+    refresh_session()
+
 # --- VIEW: GUEST ---
 if not st.session_state.token:
     col1, col2, col3 = st.columns([1, 2, 1])
@@ -87,31 +129,41 @@ else:
 
     st.markdown("---")
     
-    # 2. Fetch Leaderboard (Async update)
+    # 2. Fetch Leaderboard + own standing (rank works outside the top 10 too)
+    lb_data, standing = [], None
     try:
         lb_data = requests.get(f"{API_URL}/challenges/leaderboard").json()
-        # Update score from leaderboard if available
-        for u in lb_data:
-            if u['email'] == st.session_state.user_email.split('@')[0]:
-                st.session_state.my_score = u['score']
-                break
+        r = requests.get(f"{API_URL}/challenges/leaderboard/me", params={"around": 2},
+                         headers={"Authorization": f"Bearer {st.session_state.token}"})
+        if r.status_code == 200:
+            standing = r.json()
+            st.session_state.my_score = standing['score']
     except: pass
 
     # 3. Metrics Display (Uses Session State for instant updates)
     m1, m2, m3 = st.columns(3)
     m1.metric("YOUR SCORE", f"{st.session_state.my_score} PTS")
     m2.metric("PLAYER", st.session_state.user_email)
-    m3.metric("STATUS", "ONLINE", delta_color="normal")
+    if standing: m3.metric("RANK", f"#{standing['rank']} / {standing['players']}")
+    else: m3.metric("STATUS", "ONLINE", delta_color="normal")
 
     if lb_data:
         with st.expander("📊 Live Leaderboard"):
-            st.bar_chart(pd.DataFrame(lb_data).set_index("email"))
+            st.bar_chart(pd.DataFrame(lb_data).set_index("email")["score"])
+            if standing and standing['around'] and standing['rank'] > len(lb_data):
+                st.caption("Around you")
+                st.dataframe(pd.DataFrame(standing['around'])[["rank", "email", "score"]], hide_index=True)
 
     st.markdown("---")
     st.header("🎯 Active Missions")
     
     try:
-        challenges = requests.get(f"{API_URL}/challenges/list").json()
+        # Revalidate the cached catalogue; 304 means nothing changed
+        etag, challenges = st.session_state.catalogue
+        r = requests.get(f"{API_URL}/challenges/catalogue", headers={"If-None-Match": etag} if etag else {})
+        if r.status_code == 200:
+            challenges = r.json()
+            st.session_state.catalogue = (r.headers.get("ETag"), challenges)
         t1, t2, t3 = st.tabs(["🟢 Level 1", "🟡 Level 2", "🔴 Level 3"])
         
         def render_cards(lvl):
@@ -141,10 +193,19 @@ else:
                         
                         if st.button("Submit", key=f"b_{c['id']}"):
                             try:
-                                res = requests.post(f"{API_URL}/challenges/verify", 
-                                    json={"user_email": st.session_state.user_email, "challenge_id": c['id'], "flag": flag}).json()
+                                r = requests.post(f"{API_URL}/challenges/verify", 
+                                    json={"challenge_id": c['id'], "flag": flag},
+                                    headers={"Authorization": f"Bearer {st.session_state.token}"})
+                                res = r.json()
                                 
-                                if res['correct']:
+                                if r.status_code == 401:
+                                    refresh_session()
+                                    st.warning("Session renewed, please submit again.")
+                                elif r.status_code == 429:
+                                    st.warning(f"Too many submissions. Try again in {r.headers.get('Retry-After', 'a few')} seconds.")
+                                elif r.status_code != 200:
+                                    st.error(res.get('detail', "System Error"))
+                                elif res['correct']:
                                     # 4. INSTANT SCORE UPDATE
                                     st.session_state.my_score = res['new_total_score']
                                     st.balloons()
@@ -0,0 +1,48 @@
+"""Tests run offline: SQLite through aiosqlite and an in-process fake Redis
+(fakeredis, with lupa for the Lua scripts). Settings are read at import
+time, so the environment is set before anything from ``app`` is imported.
+
+    pip install -r requirements.txt -r tests/requirements.txt
+    python -m pytest tests
+"""
+import os
+import tempfile
+
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{tempfile.mkdtemp(prefix='ciphereye-test-')}/test.db"
+os.environ["CELERY_BROKER_URL"] = "memory://"
+os.environ["CELERY_RESULT_BACKEND"] = "cache+memory://"
+os.environ["METRICS_ENABLED"] = "false"
+
+import fakeredis
+import pytest
+from sqlalchemy import event
+from sqlmodel import SQLModel
+from app.db.database import engine, engine_sync
+
+# Enforce foreign keys like Postgres does
+@event.listens_for(engine.sync_engine, "connect")
+@event.listens_for(engine_sync, "connect")
+def enforce_foreign_keys(connection, record):
+    cursor = connection.cursor()
+    cursor.execute("PRAGMA foreign_keys = ON")
+    cursor.close()
+
+@pytest.fixture
+def db():
+    import app.models  # noqa: F401  (registers the tables)
+
+    SQLModel.metadata.drop_all(engine_sync)
+    SQLModel.metadata.create_all(engine_sync)
+    yield engine_sync
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    """Sync and asyncio clients backed by one fresh fake server."""
+    from app.core import redis_client
+
+    server = fakeredis.FakeServer()
+    monkeypatch.setattr(redis_client, "_client", fakeredis.FakeRedis(server=server, decode_responses=True))
+    monkeypatch.setattr(redis_client, "_async_clients", {})
+    monkeypatch.setattr(redis_client.aioredis.Redis, "from_url",
+                        lambda *args, **kwargs: fakeredis.FakeAsyncRedis(server=server, decode_responses=True))
+    return redis_client._client
@@ -0,0 +1,86 @@
+import asyncio
+import json
+import pytest
+from sqlmodel import Session
+from app.core import catalogue
+from app.models import Challenge
+
+@pytest.fixture
+def fresh(db, fake_redis, monkeypatch):
+    monkeypatch.setattr(catalogue, "_built", {})
+    monkeypatch.setattr(catalogue, "_bump_pending", False)
+    return fake_redis.connection_pool.connection_kwargs["server"]
+
+def add_challenge(db, title):
+    with Session(db) as session:
+        session.add(Challenge(title=title, description="d", resources="", flag="FLAG{x}", level=1, points=10))
+        session.commit()
+
+def titles(view="player"):
+    from app.db.database import AsyncSessionLocal
+
+    async def read():
+        async with AsyncSessionLocal() as session:
+            return await catalogue.get(session, view)
+    _, body = asyncio.run(read())
+    return [c["title"] for c in json.loads(body)]
+
+def test_served_from_memory_until_bumped(db, fresh):
+    add_challenge(db, "a")
+    assert titles() == ["a"]
+
+    add_challenge(db, "b")
+    assert titles() == ["a"]
+
+    asyncio.run(catalogue.bump())
+    assert titles() == ["a", "b"]
+
+def test_failed_bump_is_retried_once_redis_is_back(db, fresh):
+    assert titles() == []
+    version = asyncio.run(catalogue.current_version())
+
+    add_challenge(db, "a")
+    fresh.connected = False
+    assert asyncio.run(catalogue.bump()) is False
+    fresh.connected = True
+
+    assert titles() == ["a"]
+    assert asyncio.run(catalogue.current_version()) != version
+
+def test_local_copy_expires(db, fresh, monkeypatch):
+    assert titles("admin") == []
+    # As if another process's bump never reached Redis
+    add_challenge(db, "a")
+    assert titles("admin") == []
+
+    monkeypatch.setattr(catalogue.settings, "CATALOGUE_LOCAL_TTL_S", 0)
+    assert titles("admin") == ["a"]
+
+def get_list(email=None):
+    import httpx
+    from app.core.security import create_access_token
+    from app.main import app
+
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': email})}"} if email else {}
+
+    async def send():
+        async with httpx.AsyncClient(app=app, base_url="http://test", headers=headers) as client:
+            return await client.get("/challenges/list"), await client.get("/challenges/catalogue")
+    return asyncio.run(send())
+
+def test_flags_are_listed_for_admins_only(db, fresh):
+    from app.models import User
+    add_challenge(db, "a")
+    with Session(db) as session:
+        session.add_all([User(email="player@example.com", hashed_password="x"),
+                         User(email="admin@example.com", hashed_password="x", is_admin=True)])
+        session.commit()
+
+    anonymous, catalogue_page = get_list()
+    player, _ = get_list("player@example.com")
+    admin, _ = get_list("admin@example.com")
+
+    assert anonymous.status_code == 401
+    assert player.status_code == 403
+    assert admin.json()[0]["flag"] == "FLAG{x}"
+    assert "flag" not in catalogue_page.json()[0]
@@ -0,0 +1,25 @@
+import json
+from app.core import events
+
+def state(redis, run_id):
+    return json.loads(redis.get(f"run:{run_id}:state"))
+
+def test_first_terminal_event_wins(fake_redis):
+    events.record_queued(["r1", "r2"], "b")
+    events.publish_run_event("r1", "cancelled", "b")
+    # The worker finishes the cancelled run anyway
+    events.publish_run_event("r1", "success", "b", {"success": True})
+
+    assert state(fake_redis, "r1")["status"] == "cancelled"
+    assert events.is_final("r1") and not events.is_final("r2")
+    assert fake_redis.get("batch:b:done") == "1"
+
+def test_batch_done_counts_each_run_once(fake_redis):
+    events.record_queued(["r1", "r2"], "b")
+    events.publish_run_event("r1", "running", "b")
+    events.publish_run_event("r1", "success", "b")
+    events.publish_run_event("r1", "failed", "b")
+    events.publish_run_event("r2", "failed", "b")
+
+    assert fake_redis.get("batch:b:done") == "2"
+    assert state(fake_redis, "r2")["batch_done"] == 2
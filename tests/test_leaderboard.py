@@ -0,0 +1,68 @@
+import asyncio
+import pytest
+from sqlmodel import Session, select
+from app.core import leaderboard
+from app.db.database import AsyncSessionLocal
+from app.models import User
+
+@pytest.fixture
+def players(db, fake_redis):
+    with Session(db) as session:
+        session.add_all([
+            User(email="ada@example.com", hashed_password="x", score=30),
+            User(email="bob@example.com", hashed_password="x", score=10),
+            User(email="cyd@example.com", hashed_password="x", score=20),
+            User(email="root@example.com", hashed_password="x", score=99, is_admin=True),
+        ])
+        session.commit()
+    return fake_redis
+
+def with_session(fn):
+    async def go():
+        async with AsyncSessionLocal() as session:
+            return await fn(session)
+    return asyncio.run(go())
+
+def test_first_read_builds_the_set_without_admins(players):
+    top = with_session(lambda s: leaderboard.top(s, 10))
+
+    assert [(p["email"], p["score"], p["rank"]) for p in top] == [("ada", 30, 1), ("cyd", 20, 2), ("bob", 10, 3)]
+    assert players.exists(leaderboard.READY)
+    assert players.zscore(leaderboard.KEY, "root@example.com") is None
+
+def test_rebuild_after_a_flush_keeps_newer_solves(players):
+    with_session(lambda s: leaderboard.top(s, 10))
+    players.delete(leaderboard.READY, leaderboard.KEY)
+    # A solve lands in Redis before the next read rebuilds; Postgres'
+    # (older) 10 must not overwrite it
+    asyncio.run(leaderboard.record_solve("bob@example.com", 40))
+
+    top = with_session(lambda s: leaderboard.top(s, 1))
+
+    assert top == [{"rank": 1, "email": "bob", "score": 40}]
+
+def test_solves_never_lower_a_score(players):
+    with_session(lambda s: leaderboard.top(s, 10))
+    asyncio.run(leaderboard.record_solve("ada@example.com", 50))
+    asyncio.run(leaderboard.record_solve("ada@example.com", 40))
+
+    assert players.zscore(leaderboard.KEY, "ada@example.com") == 50
+
+def test_rebuild_drops_members_postgres_no_longer_has(players):
+    with_session(lambda s: leaderboard.top(s, 10))
+    players.zadd(leaderboard.KEY, {"ghost@example.com": 1000})
+
+    with_session(leaderboard.rebuild)
+
+    assert players.zscore(leaderboard.KEY, "ghost@example.com") is None
+    assert players.zcard(leaderboard.KEY) == 3
+
+def test_standing_with_neighbours(players):
+    async def standing(session):
+        cyd = (await session.execute(select(User).where(User.email == "cyd@example.com"))).scalar_one()
+        return await leaderboard.standing(session, cyd, around=1)
+
+    me = with_session(standing)
+
+    assert (me["rank"], me["score"], me["players"]) == (2, 20, 3)
+    assert [p["email"] for p in me["around"]] == ["ada", "cyd", "bob"]
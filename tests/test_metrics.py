@@ -0,0 +1,41 @@
+import asyncio
+import httpx
+import pytest
+from app.core import metrics
+from app.core.config import settings
+
+@pytest.fixture(autouse=True)
+def enabled(monkeypatch):
+    monkeypatch.setattr(settings, "METRICS_ENABLED", True)
+
+def scrape(client_host="127.0.0.1", token=None):
+    from app.main import app
+
+    async def send():
+        transport = httpx.ASGITransport(app=app, client=(client_host, 40000))
+        headers = {"Authorization": f"Bearer {token}"} if token else {}
+        async with httpx.AsyncClient(transport=transport, base_url="http://test", headers=headers) as client:
+            return await client.get("/metrics")
+    return asyncio.run(send())
+
+def test_without_a_token_only_loopback_may_scrape(monkeypatch):
+    monkeypatch.setattr(settings, "METRICS_TOKEN", "")
+
+    assert scrape().status_code == 200
+    assert scrape("203.0.113.5").status_code == 401
+
+def test_token_is_required_when_set(monkeypatch):
+    monkeypatch.setattr(settings, "METRICS_TOKEN", "s3cret")
+
+    assert scrape().status_code == 401
+    assert scrape("203.0.113.5", token="wrong").status_code == 401
+    res = scrape("203.0.113.5", token="s3cret")
+    assert res.status_code == 200 and "http_request" in res.text
+
+def test_worker_exporter_binds_the_internal_address(monkeypatch):
+    started = {}
+    monkeypatch.setattr(metrics, "start_http_server", lambda port, addr, registry: started.update(port=port, addr=addr))
+
+    metrics.start_worker_exporter()
+
+    assert started == {"port": settings.WORKER_METRICS_PORT, "addr": "127.0.0.1"}
@@ -0,0 +1,48 @@
+import asyncio
+import uuid
+import pytest
+from app.core import principals
+from app.models import User
+
+@pytest.fixture
+def fresh(fake_redis, monkeypatch):
+    monkeypatch.setattr(principals, "_local", principals.LRUTTLCache(100))
+    monkeypatch.setattr(principals, "_listener", None)
+    monkeypatch.setattr(principals.settings, "PRINCIPAL_CACHE_SHARED", True)
+    return fake_redis
+
+def user(is_admin=False):
+    return User(id=uuid.uuid4(), email="player@example.com", hashed_password="x", is_admin=is_admin)
+
+def test_other_processes_read_the_shared_entry(fresh):
+    asyncio.run(principals.put(user()))
+    principals._local.clear()  # as seen from another process
+
+    principal = asyncio.run(principals.get("player@example.com"))
+
+    assert principal["is_admin"] is False and "hashed_password" not in principal
+
+def test_invalidation_reaches_other_processes(fresh):
+    async def scenario():
+        principals.start_listener()
+        await asyncio.sleep(0.05)  # subscribed
+        await principals.put(user(is_admin=True))
+        # Another process demotes the user: its invalidate drops the shared
+        # entry and publishes; this process's listener drops the local one
+        fresh.delete(principals._key("player@example.com"))
+        fresh.publish(principals.CHANNEL, "player@example.com")
+        for _ in range(50):
+            if principals._local.get("player@example.com") is None:
+                break
+            await asyncio.sleep(0.01)
+        await principals.stop_listener()
+        return await principals.get("player@example.com")
+
+    assert asyncio.run(scenario()) is None
+
+def test_invalidate_drops_both_tiers(fresh):
+    asyncio.run(principals.put(user()))
+    asyncio.run(principals.invalidate("player@example.com"))
+
+    assert principals._local.get("player@example.com") is None
+    assert not fresh.exists(principals._key("player@example.com"))
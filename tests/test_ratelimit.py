@@ -0,0 +1,37 @@
+import asyncio
+from app.core import ratelimit
+
+def take(buckets):
+    return asyncio.run(ratelimit.take(buckets))
+
+def test_take_debits_every_bucket(fake_redis):
+    assert take({"a": (1.0, 5), "b": (1.0, 5)}) is None
+
+    assert float(fake_redis.hget("a", "tokens")) == 4
+    assert float(fake_redis.hget("b", "tokens")) == 4
+
+def test_rejection_debits_no_bucket(fake_redis):
+    assert take({"wide": (1.0, 5), "narrow": (0.1, 1)}) is None
+
+    wait_ms, key = take({"wide": (1.0, 5), "narrow": (0.1, 1)})
+
+    assert key == "narrow"
+    assert 0 < wait_ms <= 10000
+    # The refused attempt left the bucket that still had tokens untouched
+    assert float(fake_redis.hget("wide", "tokens")) == 4
+
+def test_zero_rate_bucket_is_skipped(fake_redis):
+    assert take({"off": (0, 1)}) is None
+    assert not fake_redis.exists("off")
+
+def test_fails_open_without_redis(fake_redis, monkeypatch):
+    from app.core import redis_client
+    import fakeredis
+
+    server = fakeredis.FakeServer()
+    server.connected = False
+    monkeypatch.setattr(redis_client.aioredis.Redis, "from_url",
+                        lambda *args, **kwargs: fakeredis.FakeAsyncRedis(server=server, decode_responses=True))
+    monkeypatch.setattr(redis_client, "_async_clients", {})
+
+    assert take({"a": (1.0, 1)}) is None
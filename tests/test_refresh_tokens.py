@@ -0,0 +1,39 @@
+import asyncio
+import pytest
+from app.core import refresh_tokens
+
+def run(coro):
+    return asyncio.run(coro)
+
+def test_rotation_hands_out_a_new_token_each_time(fake_redis):
+    first = run(refresh_tokens.issue("player@example.com"))
+
+    email, second = run(refresh_tokens.rotate(first))
+    email_again, third = run(refresh_tokens.rotate(second))
+
+    assert email == email_again == "player@example.com"
+    assert len({first, second, third}) == 3
+    # Same family, new secret
+    assert first.split(".")[0] == second.split(".")[0] == third.split(".")[0]
+
+def test_reusing_a_rotated_token_revokes_the_family(fake_redis):
+    first = run(refresh_tokens.issue("player@example.com"))
+    _, second = run(refresh_tokens.rotate(first))
+
+    with pytest.raises(refresh_tokens.RefreshTokenReused):
+        run(refresh_tokens.rotate(first))
+    # The thief and the owner are both logged out
+    assert run(refresh_tokens.rotate(second)) is None
+
+@pytest.mark.parametrize("token", ["", "nodot", "unknown.secret", ".secret", "family."])
+def test_unknown_or_malformed_tokens_are_rejected(fake_redis, token):
+    assert run(refresh_tokens.rotate(token)) is None
+
+def test_revoke_all_ends_every_session_of_the_user(fake_redis):
+    tokens = [run(refresh_tokens.issue("player@example.com")) for _ in range(2)]
+    other = run(refresh_tokens.issue("other@example.com"))
+
+    run(refresh_tokens.revoke_all("player@example.com"))
+
+    assert [run(refresh_tokens.rotate(t)) for t in tokens] == [None, None]
+    assert run(refresh_tokens.rotate(other))[0] == "other@example.com"
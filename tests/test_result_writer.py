@@ -0,0 +1,33 @@
+import pytest
+from sqlmodel import Session, select
+from app.core import result_writer
+from app.models import Run
+
+@pytest.fixture
+def enabled(monkeypatch):
+    monkeypatch.setattr(result_writer.settings, "RESULT_WRITER_ENABLED", True)
+    monkeypatch.setattr(result_writer, "_writer", None)
+    yield
+    result_writer.close_result_writer()
+
+def test_prefork_workers_write_directly(enabled):
+    result_writer.use_worker_pool("prefork")
+    assert result_writer.get_result_writer() is None
+
+def test_thread_workers_buffer_running_rows_only(db, enabled):
+    with Session(db) as session:
+        running = Run(module="dns", target="a.example.com", status="running")
+        cancelled = Run(module="dns", target="b.example.com", status="cancelled")
+        session.add_all([running, cancelled])
+        session.commit()
+        ids = running.id, cancelled.id
+
+    result_writer.use_worker_pool("threads")
+    writer = result_writer.get_result_writer()
+    for run_id in ids:
+        writer.submit(run_id, status="success", result={"success": True})
+    result_writer.close_result_writer()
+
+    with Session(db) as session:
+        statuses = {r.id: r.status for r in session.exec(select(Run)).all()}
+    assert statuses == {ids[0]: "success", ids[1]: "cancelled"}
@@ -0,0 +1,52 @@
+import asyncio
+import uuid
+from datetime import datetime, timedelta
+import httpx
+import pytest
+from sqlmodel import Session
+from app.models import Run
+
+@pytest.fixture
+def runs(db):
+    base = datetime(2024, 1, 1)
+    rows = [Run(module="dns" if i % 2 else "whois", target=f"host_{i}.example.com", status="success",
+                created_at=base + timedelta(minutes=i // 3))  # three runs per timestamp
+            for i in range(10)]
+    rows.append(Run(module="dns", target="hostx1.example.com", status="failed", created_at=base))
+    with Session(db) as session:
+        session.add_all(rows)
+        session.commit()
+        return sorted(((r.created_at, r.id) for r in rows), reverse=True)
+
+def get(**params):
+    from app.main import app
+
+    async def send():
+        async with httpx.AsyncClient(app=app, base_url="http://test") as client:
+            return await client.get("/api/runs", params=params)
+    return asyncio.run(send())
+
+def walk(**params):
+    ids, cursor = [], None
+    while True:
+        page = get(**params, **({"cursor": cursor} if cursor else {})).json()
+        ids += [uuid.UUID(item["id"]) for item in page["items"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return ids
+
+def test_pages_cover_every_run_once_newest_first(runs):
+    # Pages end in the middle of runs sharing a created_at
+    assert walk(limit=4) == [run_id for _, run_id in runs]
+
+def test_filters_apply_across_pages(runs):
+    ids = walk(limit=2, module="dns", status="success")
+    assert len(ids) == 5
+
+def test_target_prefix_is_literal(runs):
+    # "_" is not a wildcard: hostx1 doesn't match "host_"
+    items = get(target_prefix="host_1", limit=50).json()["items"]
+    assert [item["target"] for item in items] == ["host_1.example.com"]
+
+def test_invalid_cursor_is_400(runs):
+    assert get(cursor="not-a-cursor").status_code == 400
@@ -0,0 +1,105 @@
+import pytest
+from celery.exceptions import Retry
+from app import runner, scheduler
+from app.core import ratelimit
+from app.modules.base import OSINTModule
+from app.modules.registry import ModuleSpec
+
+class Polite(OSINTModule):
+    name = "polite"
+    rate_limit = 1.0
+    max_concurrency = 2
+
+    def run(self, target, **kwargs):
+        return {"success": True}
+
+@pytest.fixture
+def spec(fake_redis):
+    return ModuleSpec("polite", Polite, Polite())
+
+def test_waiting_runs_reserve_tokens_a_rate_apart(spec):
+    assert scheduler.try_acquire(spec, "r0", "example.com", {}) is None
+
+    etas = [scheduler.try_acquire(spec, f"r{i}", "example.com", {}) for i in range(1, 4)]
+
+    assert [reserved for _, reserved in etas] == [True] * 3
+    waits = [wait for wait, _ in etas]
+    assert waits == sorted(waits)
+    assert [round(b - a) for a, b in zip(waits, waits[1:])] == [1, 1]
+
+def test_reserved_run_only_needs_a_slot(spec):
+    scheduler.try_acquire(spec, "r0", "example.com", {})
+    scheduler.try_acquire(spec, "r1", "example.com", {})
+
+    # Bucket in debt, but r1 paid for its token when it reserved it
+    assert scheduler.try_acquire(spec, "r1", "example.com", {}, reserved=True) is None
+    # Both slots taken: the next reserved run backs off and keeps its token
+    wait, reserved = scheduler.try_acquire(spec, "r2", "example.com", {}, reserved=True)
+    assert reserved and wait >= 2
+
+def test_nothing_is_reserved_past_the_horizon(spec, monkeypatch):
+    monkeypatch.setattr(scheduler.settings, "SCHEDULER_RESERVE_HORIZON_S", 1.5)
+    scheduler.try_acquire(spec, "r0", "example.com", {})
+    assert scheduler.try_acquire(spec, "r1", "example.com", {})[1] is True
+
+    wait, reserved = scheduler.try_acquire(spec, "r2", "example.com", {})
+
+    assert not reserved and wait >= 1.5
+    # The bucket is one token in debt (r1's), not two
+    assert 1000 < ratelimit.acquire("l", "sched:polite:bucket:example.com", "x", rate=1.0, horizon_s=3) <= 2000
+
+class FakeTask:
+    def __init__(self, kwargs=None):
+        self.request = type("Request", (), {"kwargs": kwargs or {}})()
+        self.retried = None
+
+    def retry(self, countdown, kwargs):
+        self.retried = (countdown, kwargs)
+        return Retry()
+
+def test_redeferral_writes_deferred_until_only_when_it_moved_far(monkeypatch):
+    writes = []
+    monkeypatch.setattr(runner, "defer_run", lambda run_id, wait: writes.append(wait) or True)
+    now = runner.time.time()
+
+    task = FakeTask({"batch_id": "b"})
+    with pytest.raises(Retry):
+        runner.defer(task, "r", "b", {}, 10, True)
+    deferral = task.retried[1]["deferral"]
+    assert task.retried[1]["batch_id"] == "b" and deferral["reserved"] is True
+    assert len(writes) == 1
+
+    with pytest.raises(Retry):
+        runner.defer(task, "r", "b", deferral, 20, True)
+    assert len(writes) == 1
+
+    with pytest.raises(Retry):
+        runner.defer(task, "r", "b", {**deferral, "recorded": now - 400}, 20, True)
+    assert len(writes) == 2
+
+def test_gives_up_after_max_deferral(monkeypatch):
+    given_up = []
+    monkeypatch.setattr(runner, "give_up_run", lambda run_id, batch_id, waited: given_up.append(run_id))
+    task = FakeTask()
+
+    since = runner.time.time() - runner.settings.SCHEDULER_MAX_DEFER_S
+    assert runner.defer(task, "r", None, {"since": since, "recorded": since}, 10, True) is None
+
+    assert given_up == ["r"] and task.retried is None
+
+def test_dns_cache_hits_skip_the_rate_limit(fake_redis, monkeypatch):
+    from app.core import dns_cache
+    from app.modules.dns_module import DNSModule
+
+    monkeypatch.setattr(dns_cache, "_cache", None)
+    module = DNSModule()
+    answer = {"records": ["192.0.2.1"], "error": None, "ttl": 300}
+
+    assert not module.served_from_cache("example.com", {"use_cache": True, "record_types": ["A", "MX"]})
+    # Written by another worker: only the shared tier has it
+    dns_cache.DNSCache(16).put_many("example.com", {"A": answer, "MX": answer})
+
+    assert module.served_from_cache("example.com", {"use_cache": True, "record_types": ["A", "MX"]})
+    assert not module.served_from_cache("example.com", {"use_cache": True, "record_types": ["A", "TXT"]})
+    assert not module.served_from_cache("example.com", {"use_cache": False, "record_types": ["A"]})
+    assert dns_cache.get_dns_cache().stats()["hits"] == 0
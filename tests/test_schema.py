@@ -0,0 +1,71 @@
+import uuid
+import pytest
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.exc import IntegrityError
+from app.db import schema
+
+# Tables as the first release created them
+OLD_SCHEMA = [
+    'CREATE TABLE "user" (id CHAR(32) PRIMARY KEY, email VARCHAR NOT NULL UNIQUE, hashed_password VARCHAR NOT NULL, '
+    'is_active BOOLEAN NOT NULL, is_admin BOOLEAN NOT NULL, score INTEGER NOT NULL, created_at DATETIME NOT NULL)',
+    'CREATE TABLE challenge (id CHAR(32) PRIMARY KEY, title VARCHAR NOT NULL, description VARCHAR NOT NULL, '
+    'resources VARCHAR NOT NULL, flag VARCHAR NOT NULL, level INTEGER NOT NULL, points INTEGER NOT NULL, created_at DATETIME NOT NULL)',
+    'CREATE TABLE solve (id CHAR(32) PRIMARY KEY, user_id CHAR(32) NOT NULL REFERENCES "user" (id), '
+    'challenge_id CHAR(32) NOT NULL REFERENCES challenge (id), "timestamp" DATETIME NOT NULL)',
+    'CREATE TABLE run (id CHAR(32) PRIMARY KEY, module VARCHAR NOT NULL, target VARCHAR NOT NULL, status VARCHAR NOT NULL, '
+    'result JSON, created_at DATETIME NOT NULL, finished_at DATETIME)',
+]
+
+@pytest.fixture
+def old_db(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/old.db")
+    with engine.begin() as conn:
+        for ddl in OLD_SCHEMA:
+            conn.execute(text(ddl))
+    return engine
+
+def solve(user, challenge, at):
+    return {"id": uuid.uuid4().hex, "user_id": user, "challenge_id": challenge, "timestamp": at}
+
+def test_duplicate_solves_are_dropped_and_constrained(old_db):
+    user, challenge, other = uuid.uuid4().hex, uuid.uuid4().hex, uuid.uuid4().hex
+    with old_db.begin() as conn:
+        conn.execute(text('INSERT INTO "user" VALUES (:id, :id, :id, 1, 0, 0, :at)'), {"id": user, "at": "2024-01-01"})
+        for c in (challenge, other):
+            conn.execute(text("INSERT INTO challenge VALUES (:id, 't', 'd', '', 'f', 1, 10, '2024-01-01')"), {"id": c})
+        first = solve(user, challenge, "2024-01-01 10:00:00")
+        conn.execute(text("INSERT INTO solve VALUES (:id, :user_id, :challenge_id, :timestamp)"),
+                     [first, solve(user, challenge, "2024-01-01 11:00:00"), solve(user, other, "2024-01-01 12:00:00")])
+
+    with old_db.begin() as conn:
+        schema.upgrade(conn)
+    with old_db.begin() as conn:
+        # Idempotent
+        schema.upgrade(conn)
+
+    with old_db.connect() as conn:
+        rows = conn.execute(text("SELECT id, challenge_id FROM solve")).all()
+        # The earliest of the two solves for ``challenge`` is the one kept
+        assert sorted(c for _, c in rows) == sorted([challenge, other])
+        assert first["id"] in {i for i, _ in rows}
+        with pytest.raises(IntegrityError):
+            conn.execute(text("INSERT INTO solve VALUES (:id, :user_id, :challenge_id, :timestamp)"),
+                         solve(user, challenge, "2024-01-02"))
+
+def test_old_run_table_gets_new_columns_and_indexes(old_db):
+    with old_db.begin() as conn:
+        conn.execute(text("INSERT INTO run VALUES (:id, 'dns', 'example.com', 'success', NULL, '2024-01-01', NULL)"),
+                     {"id": uuid.uuid4().hex})
+
+    with old_db.begin() as conn:
+        schema.upgrade(conn)
+    with old_db.begin() as conn:
+        schema.upgrade(conn)
+
+    insp = inspect(old_db)
+    columns = {c["name"] for c in insp.get_columns("run")}
+    assert {"batch_id", "fingerprint", "deferred_until", "started_at", "deadline_at"} <= columns
+    indexes = {i["name"] for i in insp.get_indexes("run")}
+    assert {"ix_run_created", "ix_run_fingerprint_fresh", "ix_run_running_deadline", "ix_run_batch_id"} <= indexes
+    assert "ix_user_score" in {i["name"] for i in insp.get_indexes("user")}
+    assert "runitem" in insp.get_table_names()
@@ -0,0 +1,70 @@
+import asyncio
+import io
+import pytest
+from app import user_import
+
+CSV = "email,password,is_admin\n" \
+      "a@example.com,pw,\n" \
+      " a@example.com ,pw,\n" \
+      "not-an-email,pw,\n" \
+      "b@example.com,pw,yes\n" \
+      "c@example.com,,\n" \
+      "d@example.com,pw,\n"
+
+@pytest.fixture
+def importer(db, fake_redis, monkeypatch):
+    async def hash_fast(passwords):
+        return [f"hashed:{p}" for p in passwords]
+    # bcrypt in a spawned process pool is what's slow, not what's tested
+    monkeypatch.setattr(user_import, "hash_parallel", hash_fast)
+    monkeypatch.setattr(user_import.settings, "USER_IMPORT_CHUNK", 2)
+
+    def run(text, start_row=1):
+        async def collect():
+            return [o async for o in user_import.import_users(io.StringIO(text), "csv", start_row)]
+        return asyncio.run(collect())
+    return run
+
+def test_every_row_gets_an_outcome(importer):
+    outcomes = importer(CSV)
+
+    assert [(o["row"], o["status"]) for o in outcomes[:-1]] == [
+        (1, "created"), (2, "duplicate"), (3, "invalid"), (4, "created"), (5, "invalid"), (6, "created"),
+    ]
+    assert outcomes[-1] == {"summary": {"created": 3, "exists": 0, "duplicate": 1, "invalid": 2}, "next_row": 7}
+
+def test_stopped_import_resumes_from_next_row(importer, monkeypatch):
+    monkeypatch.setattr(user_import.settings, "USER_IMPORT_MAX_ROWS", 3)
+    first = importer(CSV)
+    assert [o["row"] for o in first[:3]] == [1, 2, 3]
+    assert first[3] == {"error": "import stopped at the 3 row limit", "next_row": 4}
+    assert first[-1]["next_row"] == 4
+
+    resumed = importer(CSV, start_row=4)
+
+    assert [(o["row"], o["status"]) for o in resumed[:-1]] == [(4, "created"), (5, "invalid"), (6, "created")]
+    assert resumed[-1]["next_row"] == 7
+
+def test_reimporting_is_harmless(importer):
+    importer(CSV)
+    again = importer(CSV)
+    assert again[-1]["summary"] == {"created": 0, "exists": 4, "duplicate": 0, "invalid": 2}
+
+def test_upload_is_read_off_the_event_loop(importer):
+    loop_threads = []
+
+    class Lines(io.StringIO):
+        def __next__(self):
+            try:
+                asyncio.get_running_loop()
+                loop_threads.append(True)
+            except RuntimeError:
+                pass
+            return super().__next__()
+
+    async def collect():
+        return [o async for o in user_import.import_users(Lines(CSV), "csv")]
+    outcomes = asyncio.run(collect())
+
+    assert outcomes[-1]["next_row"] == 7
+    assert not loop_threads
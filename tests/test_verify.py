@@ -0,0 +1,134 @@
+import asyncio
+import uuid
+import httpx
+import pytest
+from sqlmodel import Session, select
+from app.models import Challenge, Solve, User
+
+@pytest.fixture
+def challenge(db, fake_redis):
+    with Session(db) as session:
+        session.add(User(email="player@example.com", hashed_password="x", score=7))
+        ch = Challenge(title="t", description="d", resources="", flag="FLAG{ok}", level=1, points=50)
+        session.add(ch)
+        session.commit()
+        return str(ch.id)
+
+def submit(*bodies, email="player@example.com"):
+    from app.core.security import create_access_token
+    from app.main import app
+
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': email})}"} if email else {}
+
+    async def send():
+        async with httpx.AsyncClient(app=app, base_url="http://test", headers=headers) as client:
+            return await asyncio.gather(*(client.post("/challenges/verify", json=body) for body in bodies))
+    return asyncio.run(send())
+
+def body(challenge_id, flag="FLAG{ok}"):
+    return {"challenge_id": challenge_id, "flag": flag}
+
+def test_concurrent_double_submit_awards_points_once(db, challenge):
+    responses = submit(*[body(challenge)] * 4)
+
+    messages = sorted(r.json()["message"] for r in responses)
+    assert messages == ["Already solved!"] * 3 + ["Correct! +50 Points!"]
+    assert {r.json()["new_total_score"] for r in responses} == {57}
+    with Session(db) as session:
+        assert session.exec(select(User.score)).one() == 57
+        assert len(session.exec(select(Solve)).all()) == 1
+
+def test_repeat_submit_reports_already_solved(db, challenge):
+    first, = submit(body(challenge))
+    second, = submit(body(challenge))
+
+    assert first.json() == {"correct": True, "message": "Correct! +50 Points!", "new_total_score": 57}
+    assert second.json() == {"correct": True, "message": "Already solved!", "new_total_score": 57}
+
+def test_solves_go_to_the_caller_not_the_body(db, challenge):
+    with Session(db) as session:
+        session.add(User(email="other@example.com", hashed_password="x"))
+        session.commit()
+
+    response, = submit({**body(challenge), "user_email": "player@example.com"}, email="other@example.com")
+
+    assert response.json()["new_total_score"] == 50
+    with Session(db) as session:
+        assert session.exec(select(User.score).where(User.email == "player@example.com")).one() == 7
+
+def test_wrong_flag_leaves_score_alone(db, challenge):
+    response, = submit(body(challenge, flag="FLAG{nope}"))
+
+    assert response.json() == {"correct": False, "message": "Incorrect flag.", "new_total_score": 7}
+    with Session(db) as session:
+        assert session.exec(select(Solve)).all() == []
+
+def test_anonymous_and_unknown_callers_are_rejected(db, challenge):
+    anonymous, = submit(body(challenge), email=None)
+    unknown, = submit(body(challenge), email="nobody@example.com")
+
+    assert anonymous.status_code == 401
+    assert unknown.status_code == 401
+    with Session(db) as session:
+        assert session.exec(select(Solve)).all() == []
+        assert session.exec(select(User.score)).one() == 7
+
+def test_challenge_bucket_is_shared_by_all_players(db, challenge, monkeypatch):
+    from app.core.config import settings
+    monkeypatch.setattr(settings, "VERIFY_GLOBAL_BURST", 2)
+    monkeypatch.setattr(settings, "VERIFY_GLOBAL_RATE", 0.01)
+    with Session(db) as session:
+        session.add_all(User(email=f"p{i}@example.com", hashed_password="x") for i in range(3))
+        session.commit()
+
+    statuses = [submit(body(challenge, flag="FLAG{guess}"), email=f"p{i}@example.com")[0].status_code for i in range(3)]
+
+    assert statuses == [200, 200, 429]
+
+def test_flag_edited_elsewhere_is_picked_up(db, challenge):
+    from app.core import catalogue
+    wrong, = submit(body(challenge, flag="FLAG{new}"))  # caches FLAG{ok} in this process
+    assert wrong.json()["correct"] is False
+
+    # Another API process edits the flag: the row changes and the version moves
+    with Session(db) as session:
+        ch = session.get(Challenge, uuid.UUID(challenge))
+        ch.flag = "FLAG{new}"
+        session.add(ch)
+        session.commit()
+    asyncio.run(catalogue.bump())
+
+    old, = submit(body(challenge))
+    new, = submit(body(challenge, flag="FLAG{new}"))
+    assert old.json()["correct"] is False
+    assert new.json()["message"] == "Correct! +50 Points!"
+
+def test_solve_for_a_deleted_challenge_is_404(db, challenge):
+    submit(body(challenge, flag="FLAG{guess}"))  # caches the flag
+    # Deleted by a process whose bump hasn't been seen yet
+    with Session(db) as session:
+        session.delete(session.get(Challenge, uuid.UUID(challenge)))
+        session.commit()
+
+    response, = submit(body(challenge))
+
+    assert response.status_code == 404
+    assert response.json()["detail"] == "Challenge not found"
+    with Session(db) as session:
+        assert session.exec(select(User.score)).one() == 7
+
+def request_from(peer, forwarded=None):
+    from starlette.requests import Request
+    headers = [(b"x-forwarded-for", forwarded.encode())] if forwarded else []
+    return Request({"type": "http", "client": (peer, 1234), "headers": headers})
+
+def test_client_ip_believes_only_trusted_proxies(monkeypatch):
+    from app.api import routes_challenges
+    from app.api.routes_challenges import client_ip
+    monkeypatch.setattr(routes_challenges, "TRUSTED_PROXIES", {"10.0.0.2"})
+
+    assert client_ip(request_from("203.0.113.9", "1.2.3.4")) == "203.0.113.9"
+    assert client_ip(request_from("10.0.0.2", "1.2.3.4, 203.0.113.9, 10.0.0.2")) == "203.0.113.9"
+    # Behind a trusted proxy with nothing forwarded the player is unknown,
+    # rather than everyone sharing the proxy's bucket
+    assert client_ip(request_from("10.0.0.2")) is None